@@ -4,36 +4,63 @@ from typing import Dict
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.fsm.storage.memory import MemoryStorage
 from sqlalchemy.orm import sessionmaker
 
 from config.settings import Settings
+from bot.utils import json_codec
+from db.dal import user_dal
 from bot.middlewares.db_session import DBSessionMiddleware
+from bot.middlewares.user_context import UserContextMiddleware
 from bot.middlewares.i18n import I18nMiddleware, get_i18n_instance, JsonI18n
 from bot.middlewares.ban_check_middleware import BanCheckMiddleware
 from bot.middlewares.action_logger_middleware import ActionLoggerMiddleware
 from bot.middlewares.profile_sync import ProfileSyncMiddleware
 from bot.middlewares.channel_subscription import ChannelSubscriptionMiddleware
+from bot.services.action_log_writer import ActionLogWriter
+from bot.utils.background_tasks import BackgroundTaskSupervisor
 
 
 def build_dispatcher(settings: Settings, async_session_factory: sessionmaker) -> tuple[Dispatcher, Bot, Dict]:
     storage = MemoryStorage()
     default_props = DefaultBotProperties(parse_mode=ParseMode.HTML)
-    bot = Bot(token=settings.BOT_TOKEN, default=default_props)
+    bot_session = AiohttpSession(json_loads=json_codec.loads, json_dumps=json_codec.dumps)
+    bot = Bot(token=settings.BOT_TOKEN, default=default_props, session=bot_session)
 
     dp = Dispatcher(storage=storage, settings=settings, bot_instance=bot)
 
     i18n_instance = get_i18n_instance(path="locales", default=settings.DEFAULT_LANGUAGE)
 
+    user_dal.configure_user_attributes_cache(
+        maxsize=settings.USER_CACHE_MAX_SIZE,
+        ttl_seconds=settings.USER_CACHE_TTL_SECONDS,
+    )
+
     dp["i18n_instance"] = i18n_instance
     dp["async_session_factory"] = async_session_factory
 
+    action_log_writer = ActionLogWriter(
+        async_session_factory,
+        max_queue_size=settings.ACTION_LOG_QUEUE_SIZE,
+        batch_size=settings.ACTION_LOG_BATCH_SIZE,
+        flush_interval_ms=settings.ACTION_LOG_FLUSH_INTERVAL_MS,
+    )
+    dp["action_log_writer"] = action_log_writer
+
+    background_tasks = BackgroundTaskSupervisor(
+        max_concurrency=settings.BACKGROUND_TASKS_MAX_CONCURRENCY,
+        shutdown_timeout=settings.BACKGROUND_TASKS_SHUTDOWN_TIMEOUT_SECONDS,
+    )
+    dp["background_tasks"] = background_tasks
+
     dp.update.outer_middleware(DBSessionMiddleware(async_session_factory))
+    dp.update.outer_middleware(UserContextMiddleware())
     dp.update.outer_middleware(I18nMiddleware(i18n=i18n_instance, settings=settings))
     dp.update.outer_middleware(ProfileSyncMiddleware())
     dp.update.outer_middleware(BanCheckMiddleware(settings=settings, i18n_instance=i18n_instance))
     dp.update.outer_middleware(ChannelSubscriptionMiddleware(settings=settings, i18n_instance=i18n_instance))
-    dp.update.outer_middleware(ActionLoggerMiddleware(settings=settings))
+    dp.update.outer_middleware(ActionLoggerMiddleware(settings=settings, log_writer=action_log_writer))
 
-    return dp, bot, {"i18n_instance": i18n_instance}
+    return dp, bot, {"i18n_instance": i18n_instance, "background_tasks": background_tasks}
 
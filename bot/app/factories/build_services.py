@@ -1,3 +1,5 @@
+from typing import Optional
+
 from aiogram import Bot
 from sqlalchemy.orm import sessionmaker
 
@@ -14,6 +16,11 @@ from bot.services.panel_webhook_service import PanelWebhookService
 from bot.services.freekassa_service import FreeKassaService
 from bot.services.platega_service import PlategaService
 from bot.services.severpay_service import SeverPayService
+from bot.services.payment_webhook_inbox import PaymentWebhookInbox
+from bot.services.admin_stats_service import AdminStatsService
+from bot.services.message_log_maintenance import MessageLogMaintenance
+from bot.utils.background_tasks import BackgroundTaskSupervisor
+from bot.utils.config_link import set_config_link_panel_service
 
 
 def build_core_services(
@@ -22,8 +29,10 @@ def build_core_services(
     async_session_factory: sessionmaker,
     i18n: JsonI18n,
     bot_username_for_default_return: str,
+    background_tasks: Optional[BackgroundTaskSupervisor] = None,
 ):
     panel_service = PanelApiService(settings)
+    set_config_link_panel_service(panel_service)
     subscription_service = SubscriptionService(settings, panel_service, bot, i18n)
     referral_service = ReferralService(settings, subscription_service, bot, i18n)
     promo_code_service = PromoCodeService(settings, subscription_service, bot, i18n)
@@ -37,6 +46,7 @@ def build_core_services(
         async_session_factory,
         subscription_service,
         referral_service,
+        background_tasks=background_tasks,
     )
     freekassa_service = FreeKassaService(
         bot=bot,
@@ -45,6 +55,7 @@ def build_core_services(
         async_session_factory=async_session_factory,
         subscription_service=subscription_service,
         referral_service=referral_service,
+        background_tasks=background_tasks,
     )
     platega_service = PlategaService(
         bot=bot,
@@ -54,6 +65,7 @@ def build_core_services(
         subscription_service=subscription_service,
         referral_service=referral_service,
         default_return_url=bot_username_for_default_return,
+        background_tasks=background_tasks,
     )
     severpay_service = SeverPayService(
         bot=bot,
@@ -63,6 +75,7 @@ def build_core_services(
         subscription_service=subscription_service,
         referral_service=referral_service,
         default_return_url=bot_username_for_default_return,
+        background_tasks=background_tasks,
     )
     panel_webhook_service = PanelWebhookService(bot, settings, i18n, async_session_factory, panel_service)
     yookassa_service = YooKassaService(
@@ -73,6 +86,35 @@ def build_core_services(
         settings_obj=settings,
     )
 
+    payment_webhook_inbox = None
+    if settings.PAYMENT_WEBHOOK_INBOX_ENABLED:
+        payment_webhook_inbox = PaymentWebhookInbox(
+            async_session_factory,
+            workers=settings.PAYMENT_WEBHOOK_WORKERS,
+            max_attempts=settings.PAYMENT_WEBHOOK_MAX_ATTEMPTS,
+            retention_days=settings.PAYMENT_WEBHOOK_RETENTION_DAYS,
+        )
+
+    admin_stats_service = AdminStatsService(
+        async_session_factory,
+        panel_service,
+        refresh_interval=settings.ADMIN_STATS_REFRESH_INTERVAL_SECONDS,
+        pool_sources=[
+            panel_service,
+            freekassa_service,
+            platega_service,
+            severpay_service,
+            yookassa_service,
+        ],
+    )
+
+    message_log_maintenance = MessageLogMaintenance(
+        async_session_factory,
+        retention_days=settings.MESSAGE_LOGS_RETENTION_DAYS,
+        months_ahead=settings.MESSAGE_LOGS_PARTITIONS_AHEAD,
+        archive_dir=settings.MESSAGE_LOGS_ARCHIVE_DIR,
+    )
+
     # Wire services that depend on each other
     try:
         # Attach YooKassa to subscription service for auto-renew charges
@@ -94,4 +136,7 @@ def build_core_services(
         "yookassa_service": yookassa_service,
         "platega_service": platega_service,
         "severpay_service": severpay_service,
+        "payment_webhook_inbox": payment_webhook_inbox,
+        "admin_stats_service": admin_stats_service,
+        "message_log_maintenance": message_log_maintenance,
     }
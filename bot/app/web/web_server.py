@@ -1,4 +1,5 @@
 import asyncio
+import functools
 import logging
 from aiohttp import web
 from aiogram import Bot, Dispatcher
@@ -32,6 +33,8 @@ async def build_and_start_web_app(
         "panel_webhook_service",
         "platega_service",
         "severpay_service",
+        "payment_webhook_inbox",
+        "background_tasks",
     ):
         # Access dispatcher workflow_data directly to avoid sequence protocol issues
         if hasattr(dp, "workflow_data") and key in dp.workflow_data:  # type: ignore
@@ -48,7 +51,10 @@ async def build_and_start_web_app(
             f"Telegram webhook route configured at: [POST] {telegram_webhook_path} (relative to base URL)"
         )
 
-    from bot.handlers.user.payment import yookassa_webhook_route
+    from bot.handlers.user.payment import (
+        process_yookassa_webhook_event,
+        yookassa_webhook_route,
+    )
     from bot.services.crypto_pay_service import cryptopay_webhook_route
     from bot.services.panel_webhook_service import panel_webhook_route
     from bot.services.freekassa_service import freekassa_webhook_route
@@ -86,6 +92,22 @@ async def build_and_start_web_app(
         app.router.add_post(panel_path, panel_webhook_route)
         logging.info(f"Panel webhook route configured at: [POST] {panel_path}")
 
+    payment_webhook_inbox = app.get("payment_webhook_inbox")
+    if payment_webhook_inbox:
+        for provider, service_key in (
+            ("cryptopay", "cryptopay_service"),
+            ("freekassa", "freekassa_service"),
+            ("platega", "platega_service"),
+            ("severpay", "severpay_service"),
+        ):
+            service = app.get(service_key)
+            if service is not None:
+                payment_webhook_inbox.register_processor(provider, service.process_webhook_event)
+        payment_webhook_inbox.register_processor(
+            "yookassa", functools.partial(process_yookassa_webhook_event, app))
+        await payment_webhook_inbox.start()
+        logging.info("Payment webhook inbox started")
+
     web_app_runner = web.AppRunner(app)
     await web_app_runner.setup()
     site = web.TCPSite(
@@ -9,6 +9,7 @@ from . import sync_admin
 from . import logs_admin
 from . import payments
 from . import ads
+from . import webhook_inbox_admin
 
 admin_router_aggregate = Router(name="admin_features_router")
 
@@ -21,5 +22,6 @@ admin_router_aggregate.include_router(sync_admin.router)
 admin_router_aggregate.include_router(logs_admin.router)
 admin_router_aggregate.include_router(payments.router)
 admin_router_aggregate.include_router(ads.router)
+admin_router_aggregate.include_router(webhook_inbox_admin.router)
 
 __all__ = ("admin_router_aggregate", )
@@ -6,10 +6,11 @@ from aiogram.exceptions import TelegramRetryAfter, TelegramBadRequest
 from aiogram.fsm.context import FSMContext
 from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
 
 from config.settings import Settings
 
-from db.dal import user_dal, message_log_dal
+from db.dal import broadcast_dal
 
 from bot.states.admin_states import AdminStates
 from bot.keyboards.inline.admin_keyboards import (
@@ -18,11 +19,14 @@ from bot.keyboards.inline.admin_keyboards import (
     get_admin_panel_keyboard,
 )
 from bot.middlewares.i18n import JsonI18n
-from bot.utils.message_queue import get_queue_manager
-from bot.utils import get_message_content, send_message_by_type, send_message_via_queue, MessageContent
+from bot.services.broadcast_service import BroadcastService
+from bot.utils import get_message_content, send_message_by_type, MessageContent
 
 router = Router(name="admin_broadcast_router")
 
+BROADCAST_PROGRESS_INTERVAL_SECONDS = 3
+BROADCAST_PROGRESS_MAX_SECONDS = 3 * 60 * 60
+
 
 async def broadcast_message_prompt_handler(
     callback: types.CallbackQuery,
@@ -220,6 +224,8 @@ async def confirm_broadcast_callback_handler(
     bot: Bot,
     settings: Settings,
     session: AsyncSession,
+    async_session_factory: sessionmaker,
+    broadcast_service: Optional[BroadcastService] = None,
 ):
     current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
     i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
@@ -252,130 +258,66 @@ async def confirm_broadcast_callback_handler(
         await callback.answer()
 
         target = user_fsm_data.get("broadcast_target", "all")
-        if target == "active":
-            user_ids = await user_dal.get_user_ids_with_active_subscription(session)
-        elif target == "inactive":
-            user_ids = await user_dal.get_user_ids_without_active_subscription(session)
-        else:
-            user_ids = await user_dal.get_all_active_user_ids_for_broadcast(session)
-
-        sent_count = 0
-        failed_count = 0
         admin_user = callback.from_user
-        logging.info(
-            f"Admin {admin_user.id} broadcasting '{(content.text or '')[:50]}...' to {len(user_ids)} users."
-        )
 
-        # Get message queue manager
-        queue_manager = get_queue_manager()
-        if not queue_manager:
+        if not broadcast_service:
             await callback.message.edit_text("❌ Ошибка: система очередей не инициализирована", reply_markup=None)
             return
 
-        # Queue all messages for sending
-        for uid in user_ids:
-            try:
-                # Для медиа-сообщений используем caption_entities, для текста - entities
-                if content.content_type == "text":
-                    await send_message_via_queue(
-                        queue_manager, 
-                        uid, 
-                        content,
-                        parse_mode="HTML",
-                        entities=entities,
-                        disable_web_page_preview=True,
-                    )
-                else:
-                    await send_message_via_queue(
-                        queue_manager, 
-                        uid, 
-                        content,
-                        parse_mode="HTML",
-                        caption_entities=entities,
-                        disable_web_page_preview=True,
-                    )
-                sent_count += 1
-                
-                # Log successful queuing
-                await message_log_dal.create_message_log(
-                    session,
-                    {
-                        "user_id": admin_user.id,
-                        "telegram_username": admin_user.username,
-                        "telegram_first_name": admin_user.first_name,
-                        "event_type": "admin_broadcast_queued",
-                        "content": f"To user {uid}: [{content.content_type}] {(content.text or '')[:70]}...",
-                        "is_admin_event": True,
-                        "target_user_id": uid,
-                    },
-                )
-            except Exception as e:
-                failed_count += 1
-                logging.warning(
-                    f"Failed to queue broadcast to {uid}: {type(e).__name__} – {e}"
-                )
-                await message_log_dal.create_message_log(
-                    session,
-                    {
-                        "user_id": admin_user.id,
-                        "telegram_username": admin_user.username,
-                        "telegram_first_name": admin_user.first_name,
-                        "event_type": "admin_broadcast_failed",
-                        "content": f"For user {uid}: {type(e).__name__} – {str(e)[:70]}...",
-                        "is_admin_event": True,
-                        "target_user_id": uid,
-                    },
-                )
-
-        try:
-            await session.commit()
-        except Exception as e_commit:
-            await session.rollback()
-            logging.error(f"Error committing broadcast logs: {e_commit}")
+        # Для медиа-сообщений используем caption_entities, для текста - entities
+        entities_kwarg = "entities" if content.content_type == "text" else "caption_entities"
+        broadcast_id = await broadcast_service.start_broadcast(
+            admin_user,
+            target,
+            content,
+            parse_mode="HTML",
+            disable_web_page_preview=True,
+            **{entities_kwarg: entities},
+        )
+        logging.info(
+            f"Admin {admin_user.id} started broadcast #{broadcast_id} "
+            f"'{(content.text or '')[:50]}...' to '{target}' users."
+        )
 
-        # Prepare queue stats presentation
-        queue_stats = queue_manager.get_queue_stats()
         back_keyboard = get_back_to_admin_panel_keyboard(current_lang, i18n)
-        initial_user_failed = queue_stats.get("user_failed_messages", 0)
-        initial_group_failed = queue_stats.get("group_failed_messages", 0)
-
-        def build_queue_status(stats: dict) -> str:
-            dynamic_failed = max(
-                0, stats.get("user_failed_messages", 0) - initial_user_failed
-            ) + max(0, stats.get("group_failed_messages", 0) - initial_group_failed)
-            total_failed = failed_count + dynamic_failed
+
+        def build_progress_text(broadcast) -> str:
             return _(
-                "broadcast_queue_result",
-                sent_count=sent_count,
-                failed_count=total_failed,
-                user_queue_size=stats["user_queue_size"],
-                group_queue_size=stats["group_queue_size"],
+                "broadcast_progress",
+                broadcast_id=broadcast_id,
+                status=_(f"broadcast_status_{broadcast.status}"),
+                total=broadcast.total_recipients or broadcast.queued_count,
+                queued=broadcast.queued_count,
+                sent=broadcast.sent_count,
+                failed=broadcast.failed_count,
+                blocked=broadcast.blocked_count,
             )
 
-        result_message = build_queue_status(queue_stats)
+        async def load_broadcast():
+            async with async_session_factory() as progress_session:
+                return await broadcast_dal.get_broadcast(progress_session, broadcast_id)
 
         status_message = await callback.message.answer(
-            result_message,
+            build_progress_text(await load_broadcast()),
             reply_markup=back_keyboard,
         )
 
-        async def auto_update_queue_status() -> None:
-            """Refresh queue stats message twice per second via message edit."""
-            last_text = result_message
-            # Update for up to 2 minutes (240 iterations at 0.5s intervals)
-            max_iterations = 240
-            for _ in range(max_iterations):
-                await asyncio.sleep(0.5)
-
-                stats = queue_manager.get_queue_stats()
-                new_text = build_queue_status(stats)
-                queues_drained = (
-                    stats["user_queue_size"] == 0
-                    and stats["group_queue_size"] == 0
-                    and not stats.get("user_queue_processing")
-                    and not stats.get("group_queue_processing")
-                )
+        async def auto_update_broadcast_progress() -> None:
+            """Refresh the progress message from the broadcasts table (throttled)."""
+            last_text = status_message.text
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + BROADCAST_PROGRESS_MAX_SECONDS
+            while loop.time() < deadline:
+                await asyncio.sleep(BROADCAST_PROGRESS_INTERVAL_SECONDS)
+                try:
+                    broadcast = await load_broadcast()
+                except Exception as e:
+                    logging.debug("Broadcast progress update failed to load: %s", e)
+                    continue
+                if not broadcast:
+                    break
 
+                new_text = build_progress_text(broadcast)
                 if new_text != last_text:
                     try:
                         await status_message.edit_text(
@@ -383,27 +325,31 @@ async def confirm_broadcast_callback_handler(
                             reply_markup=back_keyboard,
                         )
                         last_text = new_text
+                    except TelegramRetryAfter as e:
+                        await asyncio.sleep(e.retry_after)
                     except TelegramBadRequest as e:
                         if "message is not modified" in str(e):
                             last_text = new_text
                         else:
                             logging.debug(
-                                "Broadcast queue auto-update stopped: %s", e
+                                "Broadcast progress auto-update stopped: %s", e
                             )
                             break
                     except Exception as e:
                         logging.debug(
-                            "Broadcast queue auto-update unexpected error: %s", e
+                            "Broadcast progress auto-update unexpected error: %s", e
                         )
                         break
 
-                if queues_drained:
-                    # Final refresh already attempted; exit loop.
+                if broadcast.status in (
+                    broadcast_dal.STATUS_COMPLETED,
+                    broadcast_dal.STATUS_FAILED,
+                ):
                     break
             else:
-                logging.debug("Broadcast queue auto-update reached time limit.")
+                logging.debug("Broadcast progress auto-update reached time limit.")
 
-        asyncio.create_task(auto_update_queue_status())
+        asyncio.create_task(auto_update_broadcast_progress())
 
     elif action == "cancel":
         await callback.message.edit_text(
@@ -6,12 +6,14 @@ from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config.settings import Settings
+from db.dal.pagination import KeysetCursor
 from bot.keyboards.inline.admin_keyboards import (
     get_admin_panel_keyboard, get_stats_monitoring_keyboard, 
     get_user_management_keyboard, get_ban_management_keyboard,
     get_promo_marketing_keyboard, get_system_functions_keyboard
 )
 from bot.middlewares.i18n import JsonI18n
+from bot.services.admin_stats_service import AdminStatsService
 from bot.services.panel_api_service import PanelApiService
 from bot.services.subscription_service import SubscriptionService
 from bot.utils.message_queue import get_queue_manager
@@ -53,7 +55,8 @@ async def admin_panel_command_handler(
 async def admin_panel_actions_callback_handler(
         callback: types.CallbackQuery, state: FSMContext, settings: Settings,
         i18n_data: dict, bot: Bot, panel_service: PanelApiService,
-        subscription_service: SubscriptionService, session: AsyncSession):
+        subscription_service: SubscriptionService, session: AsyncSession,
+        admin_stats_service: AdminStatsService):
     action_parts = callback.data.split(":")
     action = action_parts[1]
 
@@ -75,7 +78,11 @@ async def admin_panel_actions_callback_handler(
 
     if action == "stats":
         await admin_stats_handlers.show_statistics_handler(
-            callback, i18n_data, settings, session)
+            callback, i18n_data, settings, admin_stats_service)
+    elif action == "stats_refresh":
+        await admin_stats_handlers.show_statistics_handler(
+            callback, i18n_data, settings, admin_stats_service,
+            force_refresh=True)
     elif action == "broadcast":
         await admin_broadcast_handlers.broadcast_message_prompt_handler(
             callback, state, i18n_data, settings, session)
@@ -103,14 +110,11 @@ async def admin_panel_actions_callback_handler(
         await admin_user_management_handlers.user_search_prompt_handler(
             callback, state, i18n_data, settings, session)
     elif action == "users_list" and len(action_parts) > 2:
-        # Route to users list handler with page number
+        # Route to users list handler with page cursor
         from . import user_management as admin_user_management_handlers
-        try:
-            page = int(action_parts[2])
-            await admin_user_management_handlers.users_list_handler(
-                callback, i18n_data, settings, session, page)
-        except (IndexError, ValueError):
-            await callback.answer("Invalid page number", show_alert=True)
+        await admin_user_management_handlers.users_list_handler(
+            callback, i18n_data, settings, session,
+            KeysetCursor.from_token(action_parts[2]))
     elif action == "users_search_prompt":
         from . import user_management as admin_user_management_handlers
         await admin_user_management_handlers.user_search_prompt_handler(
@@ -13,6 +13,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from config.settings import Settings
 
 from db.dal import message_log_dal, user_dal
+from db.dal.pagination import KeysetCursor, KeysetPage
 from db.models import MessageLog, User
 
 from bot.states.admin_states import AdminStates
@@ -49,36 +50,40 @@ async def display_logs_menu(callback: types.CallbackQuery, i18n_data: dict,
 
 
 async def _display_formatted_logs(target_message: types.Message,
-                                  logs: List[MessageLog],
+                                  logs_page: KeysetPage,
                                   total_logs: int,
-                                  current_page_idx: int,
                                   settings: Settings,
                                   title_key: str,
                                   base_pagination_callback_data: str,
                                   i18n: JsonI18n,
                                   current_lang: str,
                                   title_kwargs: Optional[Dict[str,
-                                                              Any]] = None):
+                                                              Any]] = None,
+                                  total_is_estimate: bool = False):
     _ = lambda key, **kwargs: i18n.gettext(current_lang, key, **kwargs)
     page_size = settings.LOGS_PAGE_SIZE
     actual_title_kwargs = title_kwargs or {}
+    logs: List[MessageLog] = logs_page.items
+    current_page_idx = logs_page.cursor.page
 
-    if not logs and total_logs == 0:
+    if not logs:
         text = _(
             title_key, current_page=1, total_pages=1, **
             actual_title_kwargs) + "\n\n" + _("admin_no_logs_found")
         reply_markup = get_logs_pagination_keyboard(
-            current_page_idx,
-            1,
             base_pagination_callback_data,
             i18n,
             current_lang,
             back_to_logs_menu=True)
     else:
-        total_pages = math.ceil(total_logs / page_size) if page_size > 0 else 1
+        # The total may be a planner estimate, so never show fewer pages than
+        # the one being viewed.
+        total_pages = max(
+            math.ceil(total_logs / page_size) if page_size > 0 else 1,
+            current_page_idx + 1 + (1 if logs_page.has_next else 0))
         text = _(title_key,
                  current_page=current_page_idx + 1,
-                 total_pages=max(1, total_pages),
+                 total_pages=f"~{total_pages}" if total_is_estimate else total_pages,
                  **actual_title_kwargs) + "\n"
 
         log_entries_text = []
@@ -116,11 +121,13 @@ async def _display_formatted_logs(target_message: types.Message,
                   content_preview=content_preview).replace("\n", "\n  "))
         text += "\n\n".join(log_entries_text)
         reply_markup = get_logs_pagination_keyboard(
-            current_page_idx,
-            total_pages,
             base_pagination_callback_data,
             i18n,
             current_lang,
+            prev_token=logs_page.prev_cursor().to_token()
+            if logs_page.has_prev else None,
+            next_token=logs_page.next_cursor().to_token()
+            if logs_page.has_next else None,
             back_to_logs_menu=True)
 
     try:
@@ -157,13 +164,8 @@ async def _display_formatted_logs(target_message: types.Message,
 async def view_all_logs_handler(callback: types.CallbackQuery,
                                 settings: Settings, i18n_data: dict,
                                 session: AsyncSession):
-    page_idx = 0
     parts = callback.data.split(":")
-    if len(parts) == 3:
-        try:
-            page_idx = int(parts[2])
-        except ValueError:
-            page_idx = 0
+    cursor = KeysetCursor.from_token(parts[2] if len(parts) == 3 else None)
 
     i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
     current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
@@ -171,20 +173,21 @@ async def view_all_logs_handler(callback: types.CallbackQuery,
         await callback.answer("Error processing request.", show_alert=True)
         return
 
-    logs_models = await message_log_dal.get_all_message_logs(
-        session, settings.LOGS_PAGE_SIZE, page_idx * settings.LOGS_PAGE_SIZE)
-    total_logs_count = await message_log_dal.count_all_message_logs(session)
+    logs_page = await message_log_dal.get_message_logs_page(
+        session, cursor, settings.LOGS_PAGE_SIZE)
+    total_logs_count = await message_log_dal.estimate_message_logs_count(
+        session)
 
     await _display_formatted_logs(
         target_message=callback.message,
-        logs=logs_models,
+        logs_page=logs_page,
         total_logs=total_logs_count,
-        current_page_idx=page_idx,
         settings=settings,
         title_key="admin_all_logs_title",
         base_pagination_callback_data="admin_logs:view_all",
         i18n=i18n,
-        current_lang=current_lang)
+        current_lang=current_lang,
+        total_is_estimate=True)
     await callback.answer()
 
 
@@ -247,16 +250,15 @@ async def process_user_id_for_logs_handler(message: types.Message,
         f"@{user_model_for_logs.username}"
         if user_model_for_logs.username else f"ID {target_user_id}")
 
-    logs_models = await message_log_dal.get_user_message_logs(
-        session, target_user_id, settings.LOGS_PAGE_SIZE, 0)
+    logs_page = await message_log_dal.get_user_message_logs_page(
+        session, target_user_id, KeysetCursor(), settings.LOGS_PAGE_SIZE)
     total_user_logs_count = await message_log_dal.count_user_message_logs(
         session, target_user_id)
 
     await _display_formatted_logs(
         target_message=message,
-        logs=logs_models,
+        logs_page=logs_page,
         total_logs=total_user_logs_count,
-        current_page_idx=0,
         settings=settings,
         title_key="admin_user_logs_title",
         base_pagination_callback_data=f"admin_logs:view_user:{target_user_id}",
@@ -272,7 +274,7 @@ async def view_user_logs_paginated_handler(callback: types.CallbackQuery,
     try:
         parts = callback.data.split(":")
         target_user_id = int(parts[2])
-        page_idx = int(parts[3])
+        cursor = KeysetCursor.from_token(parts[3])
     except (IndexError, ValueError):
         await callback.answer("Invalid log request format.", show_alert=True)
         return
@@ -294,17 +296,15 @@ async def view_user_logs_paginated_handler(callback: types.CallbackQuery,
         f"@{user_model_for_logs.username}"
         if user_model_for_logs.username else f"ID {target_user_id}")
 
-    logs_models = await message_log_dal.get_user_message_logs(
-        session, target_user_id, settings.LOGS_PAGE_SIZE,
-        page_idx * settings.LOGS_PAGE_SIZE)
+    logs_page = await message_log_dal.get_user_message_logs_page(
+        session, target_user_id, cursor, settings.LOGS_PAGE_SIZE)
     total_user_logs_count = await message_log_dal.count_user_message_logs(
         session, target_user_id)
 
     await _display_formatted_logs(
         target_message=callback.message,
-        logs=logs_models,
+        logs_page=logs_page,
         total_logs=total_user_logs_count,
-        current_page_idx=page_idx,
         settings=settings,
         title_key="admin_user_logs_title",
         base_pagination_callback_data=f"admin_logs:view_user:{target_user_id}",
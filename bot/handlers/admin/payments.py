@@ -10,6 +10,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from config.settings import Settings
 from db.dal import payment_dal
+from db.dal.pagination import KeysetCursor, KeysetPage
 from db.models import Payment
 from bot.keyboards.inline.admin_keyboards import get_back_to_admin_panel_keyboard
 from aiogram.utils.keyboard import InlineKeyboardBuilder, InlineKeyboardButton
@@ -18,20 +19,18 @@ from bot.middlewares.i18n import JsonI18n
 router = Router(name="admin_payments_router")
 
 
-async def get_payments_with_pagination(session: AsyncSession, page: int = 0, 
-                                     page_size: int = 10) -> tuple[List[Payment], int]:
-    """Get payments with pagination and total count."""
-    offset = page * page_size
-    
+async def get_payments_with_pagination(session: AsyncSession, cursor: KeysetCursor,
+                                     page_size: int = 10) -> tuple[KeysetPage, int]:
+    """Get a page of payments and the total count."""
     # Get total count
     total_count = await payment_dal.get_payments_count(session)
     
     # Get payments for current page
-    payments = await payment_dal.get_recent_payment_logs_with_user(
-        session, limit=page_size, offset=offset
+    payments_page = await payment_dal.get_succeeded_payments_page(
+        session, cursor, page_size
     )
     
-    return payments, total_count
+    return payments_page, total_count
 
 
 def format_payment_text(payment: Payment, i18n: JsonI18n, lang: str, settings: Settings) -> str:
@@ -87,7 +86,8 @@ def format_payment_text(payment: Payment, i18n: JsonI18n, lang: str, settings: S
 
 
 async def view_payments_handler(callback: types.CallbackQuery, i18n_data: dict, 
-                              settings: Settings, session: AsyncSession, page: int = 0):
+                              settings: Settings, session: AsyncSession,
+                              cursor: Optional[KeysetCursor] = None):
     """Display paginated list of all payments."""
     current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
     i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
@@ -97,8 +97,11 @@ async def view_payments_handler(callback: types.CallbackQuery, i18n_data: dict,
     _ = lambda key, **kwargs: i18n.gettext(current_lang, key, **kwargs)
 
     page_size = 5  # Show 5 payments per page
-    payments, total_count = await get_payments_with_pagination(session, page, page_size)
-    total_pages = (total_count + page_size - 1) // page_size if total_count > 0 else 1
+    payments_page, total_count = await get_payments_with_pagination(
+        session, cursor or KeysetCursor(), page_size)
+    payments: List[Payment] = payments_page.items
+    page = payments_page.cursor.page
+    total_pages = max((total_count + page_size - 1) // page_size, page + 1)
 
     if not payments and page == 0:
         await callback.message.edit_text(
@@ -126,13 +129,15 @@ async def view_payments_handler(callback: types.CallbackQuery, i18n_data: dict,
     
     # Pagination buttons
     nav_buttons = []
-    if page > 0:
-        nav_buttons.append(InlineKeyboardButton(text="⬅️", callback_data=f"payments_page:{page-1}"))
+    if payments_page.has_prev:
+        nav_buttons.append(InlineKeyboardButton(
+            text="⬅️", callback_data=f"payments_page:{payments_page.prev_cursor().to_token()}"))
     
     nav_buttons.append(InlineKeyboardButton(text=f"{page + 1}/{total_pages}", callback_data="noop"))
     
-    if page < total_pages - 1:
-        nav_buttons.append(InlineKeyboardButton(text="➡️", callback_data=f"payments_page:{page+1}"))
+    if payments_page.has_next:
+        nav_buttons.append(InlineKeyboardButton(
+            text="➡️", callback_data=f"payments_page:{payments_page.next_cursor().to_token()}"))
     
     if nav_buttons:
         builder.row(*nav_buttons)
@@ -145,7 +150,7 @@ async def view_payments_handler(callback: types.CallbackQuery, i18n_data: dict,
         ),
         InlineKeyboardButton(
             text=_("admin_refresh_payments"), 
-            callback_data=f"payments_page:{page}"
+            callback_data=f"payments_page:{payments_page.cursor.to_token()}"
         )
     )
     
@@ -168,8 +173,8 @@ async def payments_pagination_handler(callback: types.CallbackQuery, i18n_data:
                                     settings: Settings, session: AsyncSession):
     """Handle pagination for payments list."""
     try:
-        page = int(callback.data.split(":")[1])
-        await view_payments_handler(callback, i18n_data, settings, session, page)
+        cursor = KeysetCursor.from_token(callback.data.split(":")[1])
+        await view_payments_handler(callback, i18n_data, settings, session, cursor)
     except (ValueError, IndexError):
         await callback.answer("Error processing pagination.", show_alert=True)
 
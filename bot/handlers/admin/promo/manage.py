@@ -10,6 +10,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from config.settings import Settings, get_settings
 from db.dal import promo_code_dal
+from db.dal.pagination import KeysetCursor
 from db.models import PromoCode, PromoCodeActivation
 from bot.states.admin_states import AdminStates
 from bot.keyboards.inline.admin_keyboards import get_back_to_admin_panel_keyboard, get_admin_panel_keyboard
@@ -207,15 +208,15 @@ async def promo_activations_handler(callback: types.CallbackQuery, i18n_data: di
     try:
         parts = callback.data.split(":")
         promo_id = int(parts[1])
-        page = int(parts[2])
+        cursor = KeysetCursor.from_token(parts[2])
         page_size = settings.LOGS_PAGE_SIZE
 
         promo = await promo_code_dal.get_promo_code_by_id(session, promo_id)
         if not promo:
             return await callback.answer(_("admin_promo_not_found"), show_alert=True)
 
-        total_activations = await promo_code_dal.count_promo_activations_by_code_id(session, promo_id)
-        activations = await promo_code_dal.get_promo_activations_by_code_id(session, promo_id, limit=page_size, offset=page * page_size)
+        activations_page = await promo_code_dal.get_promo_activations_page(session, promo_id, cursor, page_size)
+        activations = activations_page.items
         
         builder = InlineKeyboardBuilder()
         if not activations:
@@ -225,10 +226,10 @@ async def promo_activations_handler(callback: types.CallbackQuery, i18n_data: di
             text += "\n".join([_("admin_promo_activation_item", user_id=a.user_id, date=a.activated_at.strftime("%d.%m.%Y %H:%M")) for a in activations])
 
         nav_buttons = []
-        if page > 0:
-            nav_buttons.append(InlineKeyboardButton(text="⬅️", callback_data=f"promo_activations:{promo_id}:{page-1}"))
-        if (page + 1) * page_size < total_activations:
-            nav_buttons.append(InlineKeyboardButton(text="➡️", callback_data=f"promo_activations:{promo_id}:{page+1}"))
+        if activations_page.has_prev:
+            nav_buttons.append(InlineKeyboardButton(text="⬅️", callback_data=f"promo_activations:{promo_id}:{activations_page.prev_cursor().to_token()}"))
+        if activations_page.has_next:
+            nav_buttons.append(InlineKeyboardButton(text="➡️", callback_data=f"promo_activations:{promo_id}:{activations_page.next_cursor().to_token()}"))
         if nav_buttons:
             builder.row(*nav_buttons)
 
@@ -10,6 +10,7 @@ from datetime import datetime, timezone
 
 from config.settings import Settings
 from db.dal import user_dal, subscription_dal, message_log_dal
+from db.dal.pagination import KeysetCursor
 from db.models import User
 from bot.states.admin_states import AdminStates
 from bot.keyboards.inline.admin_keyboards import get_back_to_admin_panel_keyboard
@@ -35,7 +36,8 @@ USERNAME_REGEX = re.compile(r"^[a-zA-Z0-9_]{5,32}$")
 
 async def users_list_handler(callback: types.CallbackQuery,
                               i18n_data: dict, settings: Settings,
-                              session: AsyncSession, page: int = 0):
+                              session: AsyncSession,
+                              cursor: Optional[KeysetCursor] = None):
     """Display paginated list of all users"""
     current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
     i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
@@ -49,19 +51,20 @@ async def users_list_handler(callback: types.CallbackQuery,
         from bot.keyboards.inline.admin_keyboards import get_users_list_keyboard
         from db.dal import user_dal
         
-        users = await user_dal.get_all_users_paginated(session, page=page, page_size=15)
-        total_users = await user_dal.count_all_users(session)
-        total_pages = max(1, (total_users + 14) // 15)
+        users_page = await user_dal.get_users_page(session, cursor or KeysetCursor(), page_size=15)
+        total_users = await user_dal.estimate_users_count(session)
+        current_page = users_page.cursor.page + 1
+        total_pages_display = f"~{max((total_users + 14) // 15, current_page)}"
         
         # Format message
         header_text = _(
             "admin_users_list_header",
-            current=page + 1,
-            total=total_pages,
-            total_users=total_users
+            current=current_page,
+            total=total_pages_display,
+            total_users=f"~{total_users}"
         )
         
-        keyboard = get_users_list_keyboard(users, page, total_users, i18n, current_lang, page_size=15)
+        keyboard = get_users_list_keyboard(users_page, total_pages_display, i18n, current_lang)
         
         await callback.message.edit_text(
             header_text,
@@ -493,6 +496,7 @@ async def handle_toggle_ban(callback: types.CallbackQuery, user: User,
             await panel_service.update_user_status_on_panel(user.panel_user_uuid, not new_ban_status)
         
         await session.commit()
+        user_dal.invalidate_user_attributes(user.user_id)
         
         status_text = _("admin_user_ban_action_banned") if new_ban_status else _("admin_user_ban_action_unbanned")
         await callback.answer(_(
@@ -1182,6 +1186,7 @@ async def process_ban_user_handler(message: types.Message, state: FSMContext,
             await panel_service.update_user_status_on_panel(user_model.panel_user_uuid, False)
         
         await session.commit()
+        user_dal.invalidate_user_attributes(user_model.user_id)
         
         await message.answer(_(
             "admin_user_ban_success",
@@ -1249,6 +1254,7 @@ async def process_unban_user_handler(message: types.Message, state: FSMContext,
             await panel_service.update_user_status_on_panel(user_model.panel_user_uuid, True)
         
         await session.commit()
+        user_dal.invalidate_user_attributes(user_model.user_id)
         
         await message.answer(_(
             "admin_user_unban_success",
@@ -1276,7 +1282,7 @@ async def user_card_from_list_handler(callback: types.CallbackQuery,
     try:
         parts = callback.data.split(":")
         user_id = int(parts[1])
-        page = int(parts[2])
+        page_token = parts[2]
     except (IndexError, ValueError):
         await callback.answer("Invalid user data", show_alert=True)
         return
@@ -1303,7 +1309,7 @@ async def user_card_from_list_handler(callback: types.CallbackQuery,
     )
     keyboard.button(
         text=_("admin_user_back_to_list_button"),
-        callback_data=f"admin_action:users_list:{page}"
+        callback_data=f"admin_action:users_list:{page_token}"
     )
     quick_links_width = 2 if user.referred_by_id else 1
     keyboard.adjust(2, 2, 2, quick_links_width, 1, 2, 1)
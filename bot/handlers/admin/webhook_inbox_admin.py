@@ -0,0 +1,139 @@
+import logging
+from typing import List, Optional, Union
+
+from aiogram import Router, F, types
+from aiogram.filters import Command
+from aiogram.types import InlineKeyboardMarkup
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from aiogram.utils.text_decorations import html_decoration as hd
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.settings import Settings
+from db.dal import payment_webhook_inbox_dal
+from db.models import PaymentWebhookEvent
+from bot.middlewares.i18n import JsonI18n
+from bot.services.payment_webhook_inbox import PaymentWebhookInbox
+
+router = Router(name="admin_webhook_inbox_router")
+
+LISTED_EVENTS = 10
+REPLAYABLE_STATUSES = (
+    payment_webhook_inbox_dal.STATUS_FAILED,
+    payment_webhook_inbox_dal.STATUS_REJECTED,
+)
+
+
+def _inbox_keyboard(events: List[PaymentWebhookEvent], i18n: JsonI18n,
+                    lang: str) -> InlineKeyboardMarkup:
+    _ = lambda key, **kwargs: i18n.gettext(lang, key, **kwargs)
+    builder = InlineKeyboardBuilder()
+    for event in events:
+        builder.button(
+            text=_("admin_webhook_inbox_replay_button", event_id=event.event_id),
+            callback_data=f"admin_webhooks:replay:{event.event_id}")
+    builder.button(text=_("admin_stats_refresh_button"),
+                   callback_data="admin_webhooks:list")
+    builder.button(text=_("back_to_admin_panel_button"),
+                   callback_data="admin_action:main")
+    builder.adjust(*([2] * (len(events) // 2)), *([1] * (len(events) % 2)), 2)
+    return builder.as_markup()
+
+
+async def _render_inbox(session: AsyncSession, i18n: JsonI18n, lang: str):
+    _ = lambda key, **kwargs: i18n.gettext(lang, key, **kwargs)
+    counts = await payment_webhook_inbox_dal.count_webhook_events_by_status(session)
+    events = await payment_webhook_inbox_dal.list_webhook_events(
+        session, REPLAYABLE_STATUSES, LISTED_EVENTS)
+
+    parts = [_(
+        "admin_webhook_inbox_title",
+        pending=counts.get(payment_webhook_inbox_dal.STATUS_PENDING, 0),
+        processing=counts.get(payment_webhook_inbox_dal.STATUS_PROCESSING, 0),
+        failed=counts.get(payment_webhook_inbox_dal.STATUS_FAILED, 0),
+        rejected=counts.get(payment_webhook_inbox_dal.STATUS_REJECTED, 0),
+    )]
+    if not events:
+        parts.append(_("admin_webhook_inbox_empty"))
+    for event in events:
+        processed_at = event.processed_at or event.received_at
+        parts.append(_(
+            "admin_webhook_inbox_item",
+            event_id=event.event_id,
+            provider=hd.quote(event.provider),
+            status=event.status,
+            attempts=event.attempts,
+            processed_at=processed_at.strftime("%Y-%m-%d %H:%M UTC") if processed_at else "N/A",
+            event_key=hd.quote(event.event_key),
+            error=hd.quote((event.last_error or "")[:200]),
+        ))
+    return "\n\n".join(parts), _inbox_keyboard(events, i18n, lang)
+
+
+@router.message(Command("webhooks"))
+@router.callback_query(F.data == "admin_webhooks:list")
+async def webhook_inbox_handler(
+    event: Union[types.Message, types.CallbackQuery],
+    i18n_data: dict,
+    settings: Settings,
+    session: AsyncSession,
+    payment_webhook_inbox: Optional[PaymentWebhookInbox] = None,
+):
+    """List failed and rejected payment webhook events with replay buttons."""
+    current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
+    i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
+    message = event if isinstance(event, types.Message) else event.message
+    if not i18n or not message:
+        if isinstance(event, types.CallbackQuery):
+            await event.answer("Language error.", show_alert=True)
+        return
+    _ = lambda key, **kwargs: i18n.gettext(current_lang, key, **kwargs)
+
+    if payment_webhook_inbox is None:
+        text, reply_markup = _("admin_webhook_inbox_disabled"), None
+    else:
+        text, reply_markup = await _render_inbox(session, i18n, current_lang)
+
+    if isinstance(event, types.CallbackQuery):
+        try:
+            await message.edit_text(text, reply_markup=reply_markup, parse_mode="HTML")
+        except Exception as e:
+            logging.debug(f"Webhook inbox view not edited: {e}")
+        await event.answer()
+    else:
+        await message.answer(text, reply_markup=reply_markup, parse_mode="HTML")
+
+
+@router.callback_query(F.data.startswith("admin_webhooks:replay:"))
+async def webhook_inbox_replay_handler(
+    callback: types.CallbackQuery,
+    i18n_data: dict,
+    settings: Settings,
+    session: AsyncSession,
+    payment_webhook_inbox: Optional[PaymentWebhookInbox] = None,
+):
+    current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
+    i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
+    if not i18n or not callback.message or payment_webhook_inbox is None:
+        await callback.answer("Error processing request.", show_alert=True)
+        return
+    _ = lambda key, **kwargs: i18n.gettext(current_lang, key, **kwargs)
+
+    try:
+        event_id = int(callback.data.split(":")[2])
+    except (IndexError, ValueError):
+        await callback.answer("Invalid event.", show_alert=True)
+        return
+
+    if await payment_webhook_inbox.replay(event_id):
+        logging.info(
+            f"Admin {callback.from_user.id} requeued payment webhook event {event_id}.")
+        notice = _("admin_webhook_inbox_replayed", event_id=event_id)
+    else:
+        notice = _("admin_webhook_inbox_replay_failed", event_id=event_id)
+
+    text, reply_markup = await _render_inbox(session, i18n, current_lang)
+    try:
+        await callback.message.edit_text(text, reply_markup=reply_markup, parse_mode="HTML")
+    except Exception as e:
+        logging.debug(f"Webhook inbox view not edited: {e}")
+    await callback.answer(notice, show_alert=True)
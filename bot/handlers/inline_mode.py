@@ -1,11 +1,11 @@
 import logging
 from aiogram import Router, types, Bot
 from aiogram.types import InlineQuery, InlineQueryResultArticle, InputTextMessageContent
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config.settings import Settings
-from db.dal import user_dal, payment_dal
+from bot.services.admin_stats_service import AdminStatsService
 from bot.services.referral_service import ReferralService
 from bot.middlewares.i18n import JsonI18n
 
@@ -18,7 +18,8 @@ async def inline_query_handler(inline_query: InlineQuery,
                                i18n_data: dict,
                                referral_service: ReferralService,
                                bot: Bot,
-                               session: AsyncSession):
+                               session: AsyncSession,
+                               admin_stats_service: AdminStatsService):
     """Handle inline queries for referral links and admin statistics"""
     current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
     i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
@@ -52,7 +53,7 @@ async def inline_query_handler(inline_query: InlineQuery,
         # For admins: statistics
         if is_admin and (not query or "стат" in query or "stat" in query or "админ" in query or "admin" in query):
             stats_results = await create_admin_stats_results(
-                session, i18n, current_lang, settings
+                admin_stats_service, i18n, current_lang, settings
             )
             results.extend(stats_results)
         
@@ -126,24 +127,26 @@ async def create_referral_result(
         return None
 
 
-async def create_admin_stats_results(session: AsyncSession, i18n_instance, lang: str, settings: Settings) -> List[InlineQueryResultArticle]:
-    """Create admin statistics results for inline query"""
+async def create_admin_stats_results(admin_stats_service: AdminStatsService, i18n_instance, lang: str, settings: Settings) -> List[InlineQueryResultArticle]:
+    """Create admin statistics results for inline query from the cached stats snapshot"""
     _ = lambda key, **kwargs: i18n_instance.gettext(lang, key, **kwargs)
     results = []
     
     try:
+        snapshot = await admin_stats_service.get_snapshot()
+
         # Quick user stats
-        user_stats_result = await create_user_stats_result(session, i18n_instance, lang, settings)
+        user_stats_result = await create_user_stats_result(snapshot, i18n_instance, lang, settings)
         if user_stats_result:
             results.append(user_stats_result)
         
         # Quick financial stats
-        financial_stats_result = await create_financial_stats_result(session, i18n_instance, lang, settings)
+        financial_stats_result = await create_financial_stats_result(snapshot, i18n_instance, lang, settings)
         if financial_stats_result:
             results.append(financial_stats_result)
         
         # Quick system stats
-        system_stats_result = await create_system_stats_result(session, i18n_instance, lang, settings)
+        system_stats_result = await create_system_stats_result(snapshot, i18n_instance, lang, settings)
         if system_stats_result:
             results.append(system_stats_result)
             
@@ -153,13 +156,14 @@ async def create_admin_stats_results(session: AsyncSession, i18n_instance, lang:
     return results
 
 
-async def create_user_stats_result(session: AsyncSession, i18n_instance, lang: str, settings: Settings) -> Optional[InlineQueryResultArticle]:
+async def create_user_stats_result(snapshot: Dict[str, Any], i18n_instance, lang: str, settings: Settings) -> Optional[InlineQueryResultArticle]:
     """Create user statistics result"""
     _ = lambda key, **kwargs: i18n_instance.gettext(lang, key, **kwargs)
     
     try:
-        from db.dal.user_dal import get_enhanced_user_statistics
-        user_stats = await get_enhanced_user_statistics(session)
+        user_stats = snapshot.get("user_stats")
+        if not user_stats:
+            return None
         
         stats_text = _(
             "inline_user_stats_message",
@@ -194,13 +198,14 @@ async def create_user_stats_result(session: AsyncSession, i18n_instance, lang: s
         return None
 
 
-async def create_financial_stats_result(session: AsyncSession, i18n_instance, lang: str, settings: Settings) -> Optional[InlineQueryResultArticle]:
+async def create_financial_stats_result(snapshot: Dict[str, Any], i18n_instance, lang: str, settings: Settings) -> Optional[InlineQueryResultArticle]:
     """Create financial statistics result"""
     _ = lambda key, **kwargs: i18n_instance.gettext(lang, key, **kwargs)
     
     try:
-        from db.dal.payment_dal import get_financial_statistics
-        financial_stats = await get_financial_statistics(session)
+        financial_stats = snapshot.get("financial_stats")
+        if not financial_stats:
+            return None
         
         stats_text = _(
             "inline_financial_stats_message",
@@ -232,78 +237,74 @@ async def create_financial_stats_result(session: AsyncSession, i18n_instance, la
         return None
 
 
-async def create_system_stats_result(session: AsyncSession, i18n_instance, lang: str, settings: Settings) -> Optional[InlineQueryResultArticle]:
+async def create_system_stats_result(snapshot: Dict[str, Any], i18n_instance, lang: str, settings: Settings) -> Optional[InlineQueryResultArticle]:
     """Create panel statistics result with system/nodes/bandwidth info"""
     _ = lambda key, **kwargs: i18n_instance.gettext(lang, key, **kwargs)
     
     try:
-        from bot.services.panel_api_service import PanelApiService
+        system_stats = snapshot.get("system_stats")
+        bandwidth_stats = snapshot.get("bandwidth_stats")
+        nodes_stats = snapshot.get("nodes_stats")
         
-        # Get panel stats similar to main statistics
-        async with PanelApiService(settings) as panel_service:
-            system_stats = await panel_service.get_system_stats()
-            bandwidth_stats = await panel_service.get_bandwidth_stats()
-            nodes_stats = await panel_service.get_nodes_statistics()
+        if system_stats:
+            users = system_stats.get('users', {})
+            status_counts = users.get('statusCounts', {})
+            online_stats = system_stats.get('onlineStats', {})
             
-            if system_stats:
-                users = system_stats.get('users', {})
-                status_counts = users.get('statusCounts', {})
-                online_stats = system_stats.get('onlineStats', {})
-                
-                active_users = status_counts.get('ACTIVE', 0)
-                disabled_users = status_counts.get('DISABLED', 0) 
-                expired_users = status_counts.get('EXPIRED', 0)
-                limited_users = status_counts.get('LIMITED', 0)
-                total_users = users.get('totalUsers', 0)
-                online_now = online_stats.get('onlineNow', 0)
-                
-                # Memory usage
-                memory = system_stats.get('memory', {})
-                memory_usage = 0
-                if memory:
-                    memory_total = memory.get('total', 1)
-                    memory_used = memory.get('used', 0)
-                    memory_usage = (memory_used / memory_total) * 100 if memory_total > 0 else 0
-                
-                # Bandwidth
-                week_traffic = "N/A"
-                month_traffic = "N/A"
-                if bandwidth_stats:
-                    week_data = bandwidth_stats.get('bandwidthLastSevenDays', {})
-                    month_data = bandwidth_stats.get('bandwidthLast30Days', {}) or bandwidth_stats.get('bandwidthLastThirtyDays', {})
-                    
-                    week_traffic = week_data.get('current', 'N/A') if week_data else 'N/A'
-                    month_traffic = month_data.get('current', 'N/A') if month_data else 'N/A'
-                
-                # Nodes
-                active_nodes = 0
-                total_nodes = 0
-                if nodes_stats and 'lastSevenDays' in nodes_stats:
-                    unique_nodes = set()
-                    for node_data in nodes_stats.get('lastSevenDays', []):
-                        unique_nodes.add(node_data.get('nodeName', ''))
-                    total_nodes = len(unique_nodes)
-                    active_nodes = total_nodes  # Assume all are active
-                elif system_stats and 'nodes' in system_stats:
-                    active_nodes = system_stats.get('nodes', {}).get('totalOnline', 0)
-                    total_nodes = active_nodes
+            active_users = status_counts.get('ACTIVE', 0)
+            disabled_users = status_counts.get('DISABLED', 0) 
+            expired_users = status_counts.get('EXPIRED', 0)
+            limited_users = status_counts.get('LIMITED', 0)
+            total_users = users.get('totalUsers', 0)
+            online_now = online_stats.get('onlineNow', 0)
+            
+            # Memory usage
+            memory = system_stats.get('memory', {})
+            memory_usage = 0
+            if memory:
+                memory_total = memory.get('total', 1)
+                memory_used = memory.get('used', 0)
+                memory_usage = (memory_used / memory_total) * 100 if memory_total > 0 else 0
+            
+            # Bandwidth
+            week_traffic = "N/A"
+            month_traffic = "N/A"
+            if bandwidth_stats:
+                week_data = bandwidth_stats.get('bandwidthLastSevenDays', {})
+                month_data = bandwidth_stats.get('bandwidthLast30Days', {}) or bandwidth_stats.get('bandwidthLastThirtyDays', {})
                 
-                stats_text = _(
-                    "inline_system_stats_message",
-                    online=online_now,
-                    active=active_users,
-                    disabled=disabled_users,
-                    expired=expired_users,
-                    limited=limited_users,
-                    total=total_users,
-                    memory=memory_usage,
-                    week_traffic=week_traffic,
-                    month_traffic=month_traffic,
-                    active_nodes=active_nodes,
-                    total_nodes=total_nodes
-                )
-            else:
-                stats_text = _("inline_panel_stats_error")
+                week_traffic = week_data.get('current', 'N/A') if week_data else 'N/A'
+                month_traffic = month_data.get('current', 'N/A') if month_data else 'N/A'
+            
+            # Nodes
+            active_nodes = 0
+            total_nodes = 0
+            if nodes_stats and 'lastSevenDays' in nodes_stats:
+                unique_nodes = set()
+                for node_data in nodes_stats.get('lastSevenDays', []):
+                    unique_nodes.add(node_data.get('nodeName', ''))
+                total_nodes = len(unique_nodes)
+                active_nodes = total_nodes  # Assume all are active
+            elif system_stats and 'nodes' in system_stats:
+                active_nodes = system_stats.get('nodes', {}).get('totalOnline', 0)
+                total_nodes = active_nodes
+            
+            stats_text = _(
+                "inline_system_stats_message",
+                online=online_now,
+                active=active_users,
+                disabled=disabled_users,
+                expired=expired_users,
+                limited=limited_users,
+                total=total_users,
+                memory=memory_usage,
+                week_traffic=week_traffic,
+                month_traffic=month_traffic,
+                active_nodes=active_nodes,
+                total_nodes=total_nodes
+            )
+        else:
+            stats_text = _("inline_panel_stats_error")
         
         return InlineQueryResultArticle(
             id="admin_system_stats",
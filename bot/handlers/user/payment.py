@@ -2,7 +2,7 @@ import logging
 import json
 import asyncio
 from datetime import datetime, timezone, timedelta
-from typing import Optional, Dict, Any
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional
 
 from aiohttp import web
 from aiogram import Bot
@@ -24,8 +24,14 @@ from bot.services.notification_service import NotificationService
 from bot.keyboards.inline.user_keyboards import get_connect_and_main_keyboard
 from bot.utils.text_sanitizer import sanitize_display_name, username_for_display
 from bot.utils.config_link import prepare_config_links
+from bot.utils import json_codec
+from bot.utils.background_tasks import run_in_background
+from bot.utils.keyed_lock import KeyedLock
+from bot.services.payment_webhook_inbox import accept_or_process
 
-payment_processing_lock = asyncio.Lock()
+# Webhooks of the same user are processed one at a time (subscription end dates
+# are read-modify-write); different users are processed concurrently.
+payment_user_locks = KeyedLock()
 
 YOOKASSA_EVENT_PAYMENT_SUCCEEDED = 'payment.succeeded'
 YOOKASSA_EVENT_PAYMENT_CANCELED = 'payment.canceled'
@@ -37,7 +43,13 @@ async def process_successful_payment(session: AsyncSession, bot: Bot,
                                      i18n: JsonI18n, settings: Settings,
                                      panel_service: PanelApiService,
                                      subscription_service: SubscriptionService,
-                                     referral_service: ReferralService):
+                                     referral_service: ReferralService
+                                     ) -> Optional[Callable[[], Awaitable[None]]]:
+    """Apply a succeeded YooKassa payment within ``session``.
+
+    Returns a callable sending the user/admin notifications, to be run once the
+    caller has committed, or None when nothing was applied.
+    """
     metadata = payment_info_from_webhook.get("metadata", {})
     user_id_str = metadata.get("user_id")
     subscription_months_str = metadata.get("subscription_months")
@@ -61,6 +73,7 @@ async def process_successful_payment(session: AsyncSession, bot: Bot,
         return
 
     db_user = None
+    payment_ensured_for_auto_renew = False
     try:
         user_id = int(user_id_str)
         subscription_months = float(subscription_months_str or 0)
@@ -82,6 +95,13 @@ async def process_successful_payment(session: AsyncSession, bot: Bot,
                 # Create/ensure provider payment by YooKassa payment id for idempotency
                 yk_payment_id_from_hook = payment_info_from_webhook.get("id")
                 from db.dal import payment_dal as _payment_dal
+                existing_payment = await _payment_dal.get_payment_by_provider_payment_id(
+                    session, yk_payment_id_from_hook)
+                if existing_payment and existing_payment.status == "succeeded":
+                    logging.info(
+                        f"Auto-renew payment {yk_payment_id_from_hook} already processed (record {existing_payment.payment_id}). Skipping duplicate webhook."
+                    )
+                    return
                 ensured_payment = await _payment_dal.ensure_payment_with_provider_id(
                     session,
                     user_id=user_id,
@@ -94,6 +114,7 @@ async def process_successful_payment(session: AsyncSession, bot: Bot,
                     provider_payment_id=yk_payment_id_from_hook,
                 )
                 payment_db_id = ensured_payment.payment_id
+                payment_ensured_for_auto_renew = True
                 # Also persist yookassa_payment_id field if not set yet
                 try:
                     await _payment_dal.update_payment_status_by_db_id(
@@ -144,6 +165,25 @@ async def process_successful_payment(session: AsyncSession, bot: Bot,
 
     try:
         yk_payment_id_from_hook = payment_info_from_webhook.get("id")
+        if not payment_ensured_for_auto_renew:
+            # Auto-renew records are created as succeeded above; everything else is
+            # claimed here so a duplicate webhook does not activate twice.
+            claimed = await payment_dal.claim_payment_for_processing(
+                session,
+                payment_db_id,
+                new_status=payment_info_from_webhook.get("status", "succeeded"),
+                yk_payment_id=yk_payment_id_from_hook)
+            if not claimed:
+                if await payment_dal.get_payment_by_db_id(session, payment_db_id):
+                    logging.info(
+                        f"Payment record {payment_db_id} (yk_id {yk_payment_id_from_hook}) already processed. Skipping duplicate webhook."
+                    )
+                    return
+                logging.error(
+                    f"Failed to update payment record {payment_db_id} for yk_id {yk_payment_id_from_hook}"
+                )
+                raise Exception(
+                    f"DB Error: Could not update payment record {payment_db_id}")
         # Try to capture and save payment method for future charges if available
         try:
             payment_method = payment_info_from_webhook.get("payment_method")
@@ -192,17 +232,6 @@ async def process_successful_payment(session: AsyncSession, bot: Bot,
                     logging.exception("Failed to persist multi-card YooKassa method from webhook")
         except Exception:
             logging.exception("Failed to persist YooKassa payment method from webhook")
-        updated_payment_record = await payment_dal.update_payment_status_by_db_id(
-            session,
-            payment_db_id=payment_db_id,
-            new_status=payment_info_from_webhook.get("status", "succeeded"),
-            yk_payment_id=yk_payment_id_from_hook)
-        if not updated_payment_record:
-            logging.error(
-                f"Failed to update payment record {payment_db_id} for yk_id {yk_payment_id_from_hook}"
-            )
-            raise Exception(
-                f"DB Error: Could not update payment record {payment_db_id}")
 
         months_for_activation = int(subscription_months) if sale_mode != "traffic" else 0
         activation_details = await subscription_service.activate_subscription(
@@ -246,46 +275,50 @@ async def process_successful_payment(session: AsyncSession, bot: Bot,
             applied_referee_bonus_days_from_referral = referral_bonus_info.get(
                 "referee_bonus_applied_days")
 
-        # Use user's DB language for all user-facing messages
-        user_lang = db_user.language_code if db_user and db_user.language_code else settings.DEFAULT_LANGUAGE
-        _ = lambda key, **kwargs: i18n.gettext(user_lang, key, **kwargs)
+        # Only the database work above is on the webhook's critical path; the caller
+        # sends these messages after committing the session.
+        inviter = None
+        if applied_referee_bonus_days_from_referral and db_user and db_user.referred_by_id:
+            inviter = await user_dal.get_user_by_id(session, db_user.referred_by_id)
 
-        traffic_label = (
-            str(int(traffic_amount_gb)) if float(traffic_amount_gb).is_integer() else f"{traffic_amount_gb:g}"
-        )
-        config_link_display, connect_button_url = await prepare_config_links(
-            settings, activation_details.get("subscription_url") if activation_details else None
-        )
-        config_link_text = config_link_display or _("config_link_not_available")
-        # For auto-renew charges, avoid re-sending config link; send concise message
-        if sale_mode != "traffic" and is_auto_renew and final_end_date_for_user:
-            details_message = _(
-                "yookassa_auto_renewal",
-                months=int(subscription_months),
-                end_date=final_end_date_for_user.strftime('%Y-%m-%d'),
-            )
-            details_markup = None
-        elif sale_mode == "traffic":
-            details_message = _(
-                "payment_successful_traffic_full",
-                traffic_gb=traffic_label,
-                end_date=final_end_date_for_user.strftime('%Y-%m-%d') if final_end_date_for_user else "—",
-                config_link=config_link_text,
+        async def send_payment_notifications() -> None:
+            # Use user's DB language for all user-facing messages
+            user_lang = db_user.language_code if db_user and db_user.language_code else settings.DEFAULT_LANGUAGE
+            _ = lambda key, **kwargs: i18n.gettext(user_lang, key, **kwargs)
+
+            traffic_label = (
+                str(int(traffic_amount_gb)) if float(traffic_amount_gb).is_integer() else f"{traffic_amount_gb:g}"
             )
-            details_markup = get_connect_and_main_keyboard(
-                user_lang,
-                i18n,
-                settings,
-                config_link_display,
-                connect_button_url=connect_button_url,
-                preserve_message=True,
+            config_link_display, connect_button_url = await prepare_config_links(
+                settings, activation_details.get("subscription_url") if activation_details else None
             )
-        else:
-            if applied_referee_bonus_days_from_referral and final_end_date_for_user:
-                inviter_name_display = _("friend_placeholder")
-                if db_user and db_user.referred_by_id:
-                    inviter = await user_dal.get_user_by_id(
-                        session, db_user.referred_by_id)
+            config_link_text = config_link_display or _("config_link_not_available")
+            # For auto-renew charges, avoid re-sending config link; send concise message
+            if sale_mode != "traffic" and is_auto_renew and final_end_date_for_user:
+                details_message = _(
+                    "yookassa_auto_renewal",
+                    months=int(subscription_months),
+                    end_date=final_end_date_for_user.strftime('%Y-%m-%d'),
+                )
+                details_markup = None
+            elif sale_mode == "traffic":
+                details_message = _(
+                    "payment_successful_traffic_full",
+                    traffic_gb=traffic_label,
+                    end_date=final_end_date_for_user.strftime('%Y-%m-%d') if final_end_date_for_user else "—",
+                    config_link=config_link_text,
+                )
+                details_markup = get_connect_and_main_keyboard(
+                    user_lang,
+                    i18n,
+                    settings,
+                    config_link_display,
+                    connect_button_url=connect_button_url,
+                    preserve_message=True,
+                )
+            else:
+                if applied_referee_bonus_days_from_referral and final_end_date_for_user:
+                    inviter_name_display = _("friend_placeholder")
                     if inviter:
                         safe_name = sanitize_display_name(inviter.first_name) if inviter.first_name else None
                         if safe_name:
@@ -293,72 +326,73 @@ async def process_successful_payment(session: AsyncSession, bot: Bot,
                         elif inviter.username:
                             inviter_name_display = username_for_display(inviter.username, with_at=False)
 
-                details_message = _(
-                    "payment_successful_with_referral_bonus_full",
-                    months=int(subscription_months),
-                    base_end_date=base_subscription_end_date.strftime('%Y-%m-%d'),
-                    bonus_days=applied_referee_bonus_days_from_referral,
-                    final_end_date=final_end_date_for_user.strftime('%Y-%m-%d'),
-                    inviter_name=inviter_name_display,
-                    config_link=config_link_text,
-                )
-            elif applied_promo_bonus_days > 0 and final_end_date_for_user:
-                details_message = _(
-                    "payment_successful_with_promo_full",
-                    months=int(subscription_months),
-                    bonus_days=applied_promo_bonus_days,
-                    end_date=final_end_date_for_user.strftime('%Y-%m-%d'),
-                    config_link=config_link_text,
+                    details_message = _(
+                        "payment_successful_with_referral_bonus_full",
+                        months=int(subscription_months),
+                        base_end_date=base_subscription_end_date.strftime('%Y-%m-%d'),
+                        bonus_days=applied_referee_bonus_days_from_referral,
+                        final_end_date=final_end_date_for_user.strftime('%Y-%m-%d'),
+                        inviter_name=inviter_name_display,
+                        config_link=config_link_text,
+                    )
+                elif applied_promo_bonus_days > 0 and final_end_date_for_user:
+                    details_message = _(
+                        "payment_successful_with_promo_full",
+                        months=int(subscription_months),
+                        bonus_days=applied_promo_bonus_days,
+                        end_date=final_end_date_for_user.strftime('%Y-%m-%d'),
+                        config_link=config_link_text,
+                    )
+                elif final_end_date_for_user:
+                    details_message = _(
+                        "payment_successful_full",
+                        months=int(subscription_months),
+                        end_date=final_end_date_for_user.strftime('%Y-%m-%d'),
+                        config_link=config_link_text,
+                    )
+                else:
+                    logging.error(
+                        f"Critical error: final_end_date_for_user is None for user {user_id} after successful payment logic."
+                    )
+                    details_message = _("payment_successful_error_details")
+
+                details_markup = get_connect_and_main_keyboard(
+                    user_lang,
+                    i18n,
+                    settings,
+                    config_link_display,
+                    connect_button_url=connect_button_url,
+                    preserve_message=True,
                 )
-            elif final_end_date_for_user:
-                details_message = _(
-                    "payment_successful_full",
-                    months=int(subscription_months),
-                    end_date=final_end_date_for_user.strftime('%Y-%m-%d'),
-                    config_link=config_link_text,
+            try:
+                await bot.send_message(
+                    user_id,
+                    details_message,
+                    reply_markup=details_markup,
+                    parse_mode="HTML",
+                    disable_web_page_preview=True,
                 )
-            else:
+            except Exception as e_notify:
                 logging.error(
-                    f"Critical error: final_end_date_for_user is None for user {user_id} after successful payment logic."
+                    f"Failed to send payment details message to user {user_id}: {e_notify}"
                 )
-                details_message = _("payment_successful_error_details")
-
-            details_markup = get_connect_and_main_keyboard(
-                user_lang,
-                i18n,
-                settings,
-                config_link_display,
-                connect_button_url=connect_button_url,
-                preserve_message=True,
-            )
-        try:
-            await bot.send_message(
-                user_id,
-                details_message,
-                reply_markup=details_markup,
-                parse_mode="HTML",
-                disable_web_page_preview=True,
-            )
-        except Exception as e_notify:
-            logging.error(
-                f"Failed to send payment details message to user {user_id}: {e_notify}"
-            )
 
-        # Send notification about payment
-        try:
-            notification_service = NotificationService(bot, settings, i18n)
-            user = await user_dal.get_user_by_id(session, user_id)
-            await notification_service.notify_payment_received(
-                user_id=user_id,
-                amount=payment_value,
-                currency=settings.DEFAULT_CURRENCY_SYMBOL,
-                months=int(subscription_months) if sale_mode != "traffic" else 0,
-                payment_provider="yookassa",  # This is specifically for YooKassa webhook
-                username=user.username if user else None,
-                traffic_gb=traffic_amount_gb if sale_mode == "traffic" else None,
-            )
-        except Exception as e:
-            logging.error(f"Failed to send payment notification: {e}")
+            # Send notification about payment
+            try:
+                notification_service = NotificationService(bot, settings, i18n)
+                await notification_service.notify_payment_received(
+                    user_id=user_id,
+                    amount=payment_value,
+                    currency=settings.DEFAULT_CURRENCY_SYMBOL,
+                    months=int(subscription_months) if sale_mode != "traffic" else 0,
+                    payment_provider="yookassa",  # This is specifically for YooKassa webhook
+                    username=db_user.username if db_user else None,
+                    traffic_gb=traffic_amount_gb if sale_mode == "traffic" else None,
+                )
+            except Exception as e:
+                logging.error(f"Failed to send payment notification: {e}")
+
+        return send_payment_notifications
 
     except Exception as e_process:
         logging.error(
@@ -419,28 +453,156 @@ async def process_cancelled_payment(session: AsyncSession, bot: Bot,
         raise
 
 
-async def yookassa_webhook_route(request: web.Request):
+async def process_yookassa_webhook_event(app: Mapping[str, Any],
+                                        event: Dict[str, Any]) -> web.Response:
+    """Apply a parsed YooKassa notification (inline or from the webhook inbox).
 
+    Returns 500 when the DB transaction failed so the event is retried; payment
+    claiming in process_successful_payment keeps retries idempotent.
+    """
     try:
-        bot: Bot = request.app['bot']
-        i18n_instance: JsonI18n = request.app['i18n']
-        settings: Settings = request.app['settings']
-        panel_service: PanelApiService = request.app['panel_service']
-        subscription_service: SubscriptionService = request.app[
+        bot: Bot = app['bot']
+        i18n_instance: JsonI18n = app['i18n']
+        settings: Settings = app['settings']
+        panel_service: PanelApiService = app['panel_service']
+        subscription_service: SubscriptionService = app[
             'subscription_service']
-        referral_service: ReferralService = request.app['referral_service']
-        async_session_factory: sessionmaker = request.app[
+        referral_service: ReferralService = app['referral_service']
+        async_session_factory: sessionmaker = app[
             'async_session_factory']
     except KeyError as e_app_ctx:
         logging.error(
-            f"KeyError accessing app context in yookassa_webhook_route: {e_app_ctx}.",
+            f"KeyError accessing app context in process_yookassa_webhook_event: {e_app_ctx}.",
             exc_info=True)
         return web.Response(
             status=500,
             text="Internal Server Error: Missing app context component")
 
+    event_name = event["event"]
+    payment_dict_for_processing = event["payment"]
+
+    lock_key = payment_dict_for_processing["metadata"].get("user_id") or payment_dict_for_processing["id"]
+    async with payment_user_locks(lock_key):
+        async with async_session_factory() as session:
+            try:
+                if event_name == YOOKASSA_EVENT_PAYMENT_SUCCEEDED:
+                    if payment_dict_for_processing.get(
+                            "paid") and payment_dict_for_processing.get(
+                                "status") == "succeeded":
+                        send_notifications = await process_successful_payment(
+                            session, bot, payment_dict_for_processing,
+                            i18n_instance, settings, panel_service,
+                            subscription_service, referral_service)
+                        await session.commit()
+                        if send_notifications:
+                            await run_in_background(
+                                app.get('background_tasks'),
+                                send_notifications(),
+                                name=f"yookassa-payment-{payment_dict_for_processing['id']}",
+                            )
+                    else:
+                        logging.warning(
+                            f"Payment Succeeded event for {payment_dict_for_processing.get('id')} "
+                            f"but data not as expected: status='{payment_dict_for_processing.get('status')}', "
+                            f"paid='{payment_dict_for_processing.get('paid')}'"
+                        )
+                elif event_name == YOOKASSA_EVENT_PAYMENT_CANCELED:
+                    await process_cancelled_payment(
+                        session, bot, payment_dict_for_processing,
+                        i18n_instance, settings)
+                    await session.commit()
+                elif event_name == YOOKASSA_EVENT_PAYMENT_WAITING_FOR_CAPTURE:
+                    # Bind-only flow: save method and cancel auth if metadata has bind_only
+                    metadata = payment_dict_for_processing.get("metadata", {}) or {}
+                    if settings.yookassa_autopayments_active and metadata.get("bind_only") == "1":
+                        try:
+                            user_id_str = metadata.get("user_id")
+                            if user_id_str and user_id_str.isdigit():
+                                user_id = int(user_id_str)
+                                payment_method = payment_dict_for_processing.get("payment_method")
+                                if isinstance(payment_method, dict) and payment_method.get("id"):
+                                    pm_type = payment_method.get("type")
+                                    title = payment_method.get("title")
+                                    card = payment_method.get("card") or {}
+                                    account_number = payment_method.get("account_number") or payment_method.get("account")
+                                    display_network = None
+                                    display_last4 = None
+                                    if (pm_type or "").lower() in {"bank_card", "bank-card", "card"}:
+                                        display_network = card.get("card_type") or title or "Card"
+                                        display_last4 = card.get("last4")
+                                    elif (pm_type or "").lower() in {"yoo_money", "yoomoney", "yoo-money", "wallet"}:
+                                        # Normalize wallet display name to avoid leaking full account from title
+                                        display_network = "YooMoney"
+                                        if isinstance(account_number, str) and len(account_number) >= 4:
+                                            display_last4 = account_number[-4:]
+                                        else:
+                                            display_last4 = None
+                                    else:
+                                        display_network = title or (pm_type.upper() if pm_type else "Payment method")
+                                        display_last4 = None
+                                    await user_billing_dal.upsert_yk_payment_method(
+                                        session,
+                                        user_id=user_id,
+                                        payment_method_id=payment_method.get("id"),
+                                        card_last4=display_last4,
+                                        card_network=display_network,
+                                    )
+                                    await session.commit()
+                                    # Save multi-card entry and mark default if first
+                                    try:
+                                        from db.dal import user_billing_dal as ub
+                                        await ub.upsert_user_payment_method(
+                                            session,
+                                            user_id=user_id,
+                                            provider_payment_method_id=payment_method.get("id"),
+                                            provider="yookassa",
+                                            card_last4=display_last4,
+                                            card_network=display_network,
+                                            set_default=True,
+                                        )
+                                        await session.commit()
+                                    except Exception:
+                                        await session.rollback()
+                                    # Notify user about successful binding with Back button
+                                    try:
+                                        # Use user's DB language for bind success notification
+                                        i18n_lang = settings.DEFAULT_LANGUAGE
+                                        from db.dal import user_dal
+                                        db_user = await user_dal.get_user_by_id(session, user_id)
+                                        if db_user and db_user.language_code:
+                                            i18n_lang = db_user.language_code
+                                        _ = lambda key, **kwargs: i18n_instance.gettext(i18n_lang, key, **kwargs)
+                                        from bot.keyboards.inline.user_keyboards import get_back_to_payment_methods_keyboard
+                                        await bot.send_message(
+                                            chat_id=user_id,
+                                            text=_("payment_method_bound_success"),
+                                            reply_markup=get_back_to_payment_methods_keyboard(i18n_lang, i18n_instance)
+                                        )
+                                    except Exception:
+                                        pass
+                                    # Attempt to cancel the authorization to avoid charge hold
+                                    try:
+                                        yk: YooKassaService = app.get('yookassa_service')
+                                        if yk:
+                                            await yk.cancel_payment(payment_dict_for_processing.get("id"))
+                                    except Exception:
+                                        logging.exception("Failed to cancel bind-only payment auth")
+                        except Exception:
+                            logging.exception("Failed to handle bind-only waiting_for_capture webhook")
+            except Exception as e_webhook_db_processing:
+                await session.rollback()
+                logging.error(
+                    f"Error processing YooKassa webhook event '{event_name}' "
+                    f"for YK Payment ID {payment_dict_for_processing.get('id')} in DB transaction: {e_webhook_db_processing}",
+                    exc_info=True)
+                return web.Response(status=500, text="processing_error")
+
+    return web.Response(status=200, text="ok")
+
+
+async def yookassa_webhook_route(request: web.Request):
     try:
-        event_json = await request.json()
+        event_json = await request.json(loads=json_codec.loads)
 
         notification_object = WebhookNotification(event_json)
         payment_data_from_notification = notification_object.object
@@ -511,117 +673,18 @@ async def yookassa_webhook_route(request: web.Request):
             "payment_method": pm_dict,
         }
 
-        async with payment_processing_lock:
-            async with async_session_factory() as session:
-                try:
-                    if notification_object.event == YOOKASSA_EVENT_PAYMENT_SUCCEEDED:
-                        if payment_dict_for_processing.get(
-                                "paid") and payment_dict_for_processing.get(
-                                    "status") == "succeeded":
-                            await process_successful_payment(
-                                session, bot, payment_dict_for_processing,
-                                i18n_instance, settings, panel_service,
-                                subscription_service, referral_service)
-                            await session.commit()
-                        else:
-                            logging.warning(
-                                f"Payment Succeeded event for {payment_dict_for_processing.get('id')} "
-                                f"but data not as expected: status='{payment_dict_for_processing.get('status')}', "
-                                f"paid='{payment_dict_for_processing.get('paid')}'"
-                            )
-                    elif notification_object.event == YOOKASSA_EVENT_PAYMENT_CANCELED:
-                        await process_cancelled_payment(
-                            session, bot, payment_dict_for_processing,
-                            i18n_instance, settings)
-                        await session.commit()
-                    elif notification_object.event == YOOKASSA_EVENT_PAYMENT_WAITING_FOR_CAPTURE:
-                        # Bind-only flow: save method and cancel auth if metadata has bind_only
-                        metadata = payment_dict_for_processing.get("metadata", {}) or {}
-                        if settings.yookassa_autopayments_active and metadata.get("bind_only") == "1":
-                            try:
-                                user_id_str = metadata.get("user_id")
-                                if user_id_str and user_id_str.isdigit():
-                                    user_id = int(user_id_str)
-                                    payment_method = payment_dict_for_processing.get("payment_method")
-                                    if isinstance(payment_method, dict) and payment_method.get("id"):
-                                        pm_type = payment_method.get("type")
-                                        title = payment_method.get("title")
-                                        card = payment_method.get("card") or {}
-                                        account_number = payment_method.get("account_number") or payment_method.get("account")
-                                        display_network = None
-                                        display_last4 = None
-                                        if (pm_type or "").lower() in {"bank_card", "bank-card", "card"}:
-                                            display_network = card.get("card_type") or title or "Card"
-                                            display_last4 = card.get("last4")
-                                        elif (pm_type or "").lower() in {"yoo_money", "yoomoney", "yoo-money", "wallet"}:
-                                            # Normalize wallet display name to avoid leaking full account from title
-                                            display_network = "YooMoney"
-                                            if isinstance(account_number, str) and len(account_number) >= 4:
-                                                display_last4 = account_number[-4:]
-                                            else:
-                                                display_last4 = None
-                                        else:
-                                            display_network = title or (pm_type.upper() if pm_type else "Payment method")
-                                            display_last4 = None
-                                        await user_billing_dal.upsert_yk_payment_method(
-                                            session,
-                                            user_id=user_id,
-                                            payment_method_id=payment_method.get("id"),
-                                            card_last4=display_last4,
-                                            card_network=display_network,
-                                        )
-                                        await session.commit()
-                                        # Save multi-card entry and mark default if first
-                                        try:
-                                            from db.dal import user_billing_dal as ub
-                                            await ub.upsert_user_payment_method(
-                                                session,
-                                                user_id=user_id,
-                                                provider_payment_method_id=payment_method.get("id"),
-                                                provider="yookassa",
-                                                card_last4=display_last4,
-                                                card_network=display_network,
-                                                set_default=True,
-                                            )
-                                            await session.commit()
-                                        except Exception:
-                                            await session.rollback()
-                                        # Notify user about successful binding with Back button
-                                        try:
-                                            # Use user's DB language for bind success notification
-                                            i18n_lang = settings.DEFAULT_LANGUAGE
-                                            from db.dal import user_dal
-                                            db_user = await user_dal.get_user_by_id(session, user_id)
-                                            if db_user and db_user.language_code:
-                                                i18n_lang = db_user.language_code
-                                            _ = lambda key, **kwargs: i18n_instance.gettext(i18n_lang, key, **kwargs)
-                                            from bot.keyboards.inline.user_keyboards import get_back_to_payment_methods_keyboard
-                                            await bot.send_message(
-                                                chat_id=user_id,
-                                                text=_("payment_method_bound_success"),
-                                                reply_markup=get_back_to_payment_methods_keyboard(i18n_lang, i18n_instance)
-                                            )
-                                        except Exception:
-                                            pass
-                                        # Attempt to cancel the authorization to avoid charge hold
-                                        try:
-                                            yk: YooKassaService = request.app.get('yookassa_service')
-                                            if yk:
-                                                await yk.cancel_payment(payment_dict_for_processing.get("id"))
-                                        except Exception:
-                                            logging.exception("Failed to cancel bind-only payment auth")
-                            except Exception:
-                                logging.exception("Failed to handle bind-only waiting_for_capture webhook")
-                except Exception as e_webhook_db_processing:
-                    await session.rollback()
-                    logging.error(
-                        f"Error processing YooKassa webhook event '{notification_object.event}' "
-                        f"for YK Payment ID {payment_dict_for_processing.get('id')} in DB transaction: {e_webhook_db_processing}",
-                        exc_info=True)
-                    return web.Response(
-                        status=200, text="ok_internal_processing_error_logged")
-
-        return web.Response(status=200, text="ok")
+        event = {
+            "event": notification_object.event,
+            "payment": payment_dict_for_processing,
+        }
+        return await accept_or_process(
+            request,
+            "yookassa",
+            f"{payment_dict_for_processing['id']}:{notification_object.event}",
+            event,
+            lambda queued_event: process_yookassa_webhook_event(request.app, queued_event),
+            lambda: web.Response(status=200, text="ok"),
+        )
 
     except json.JSONDecodeError:
         logging.error("YooKassa Webhook: Invalid JSON received.")
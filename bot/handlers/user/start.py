@@ -198,7 +198,7 @@ async def ensure_required_channel_subscription(
 
     if db_user is None:
         try:
-            db_user = await user_dal.get_user_by_id(session, user_id)
+            db_user = await user_dal.get_session_user(session, user_id)
         except Exception as fetch_error:
             logging.error(
                 "Channel subscription check: failed to fetch user %s: %s",
@@ -394,7 +394,7 @@ async def start_command_handler(message: types.Message,
     sanitized_first_name = sanitize_display_name(user.first_name)
     sanitized_last_name = sanitize_display_name(user.last_name)
 
-    db_user = await user_dal.get_user_by_id(session, user_id)
+    db_user = await user_dal.get_session_user(session, user_id)
     if not db_user:
         user_data_to_create = {
             "user_id": user_id,
@@ -568,7 +568,7 @@ async def verify_channel_subscription_callback(
     current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
     i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
 
-    db_user = await user_dal.get_user_by_id(session, callback.from_user.id)
+    db_user = await user_dal.get_session_user(session, callback.from_user.id)
 
     verified = await ensure_required_channel_subscription(
         callback, settings, i18n, current_lang, session, db_user)
@@ -6,6 +6,7 @@ import math
 from config.settings import Settings
 from bot.middlewares.i18n import JsonI18n
 from db.models import User
+from db.dal.pagination import KeysetPage
 
 
 def get_admin_panel_keyboard(i18n_instance, lang: str,
@@ -115,10 +116,12 @@ def get_system_functions_keyboard(i18n_instance, lang: str) -> InlineKeyboardMar
                    callback_data="admin_action:sync_panel")
     builder.button(text=_(key="admin_queue_status_button"),
                    callback_data="admin_action:queue_status")
+    builder.button(text=_(key="admin_webhook_inbox_button"),
+                   callback_data="admin_webhooks:list")
     
     builder.button(text=_(key="back_to_admin_panel_button"),
                    callback_data="admin_action:main")
-    builder.adjust(2, 1, 1)
+    builder.adjust(2, 2, 1)
     return builder.as_markup()
 
 
@@ -215,25 +218,25 @@ def get_logs_menu_keyboard(i18n_instance, lang: str) -> InlineKeyboardMarkup:
 
 
 def get_logs_pagination_keyboard(
-        current_page: int,
-        total_pages: int,
         base_callback_data: str,
         i18n_instance,
         lang: str,
+        prev_token: Optional[str] = None,
+        next_token: Optional[str] = None,
         back_to_logs_menu: bool = False) -> InlineKeyboardMarkup:
     _ = lambda key, **kwargs: i18n_instance.gettext(lang, key, **kwargs)
     builder = InlineKeyboardBuilder()
     row_buttons = []
-    if current_page > 0:
+    if prev_token is not None:
         row_buttons.append(
             InlineKeyboardButton(
                 text="⬅️ " + _("prev_page_button"),
-                callback_data=f"{base_callback_data}:{current_page - 1}"))
-    if current_page < total_pages - 1:
+                callback_data=f"{base_callback_data}:{prev_token}"))
+    if next_token is not None:
         row_buttons.append(
             InlineKeyboardButton(
                 text=_("next_page_button") + " ➡️",
-                callback_data=f"{base_callback_data}:{current_page + 1}"))
+                callback_data=f"{base_callback_data}:{next_token}"))
 
     if row_buttons: builder.row(*row_buttons)
 
@@ -307,15 +310,15 @@ def get_banned_users_keyboard(banned_users: List[User], current_page: int,
     return builder.as_markup()
 
 
-def get_users_list_keyboard(users: List[User], current_page: int,
-                            total_users: int, i18n_instance, lang: str,
-                            page_size: int = 15) -> InlineKeyboardMarkup:
+def get_users_list_keyboard(users_page: KeysetPage, total_pages_display: str,
+                            i18n_instance, lang: str) -> InlineKeyboardMarkup:
     """Generate keyboard for paginated user list"""
     _ = lambda key, **kwargs: i18n_instance.gettext(lang, key, **kwargs)
     builder = InlineKeyboardBuilder()
+    page_token = users_page.cursor.to_token()
     
     # Add user buttons
-    for user in users:
+    for user in users_page.items:
         user_display_parts = []
         if user.username:
             user_display_parts.append(f"@{user.username}")
@@ -327,36 +330,34 @@ def get_users_list_keyboard(users: List[User], current_page: int,
         builder.row(
             InlineKeyboardButton(
                 text=button_text,
-                callback_data=f"admin_user_card_from_list:{user.user_id}:{current_page}"
+                callback_data=f"admin_user_card_from_list:{user.user_id}:{page_token}"
             )
         )
     
     # Pagination buttons
-    if total_users > page_size:
-        total_pages = math.ceil(total_users / page_size)
+    if users_page.has_prev or users_page.has_next:
         pagination_buttons = []
-        if current_page > 0:
+        if users_page.has_prev:
             pagination_buttons.append(
                 InlineKeyboardButton(
                     text=_("prev_page_button"),
-                    callback_data=f"admin_action:users_list:{current_page - 1}"
+                    callback_data=f"admin_action:users_list:{users_page.prev_cursor().to_token()}"
                 )
             )
         pagination_buttons.append(
             InlineKeyboardButton(
-                text=f"{current_page + 1}/{total_pages}",
+                text=f"{users_page.cursor.page + 1}/{total_pages_display}",
                 callback_data="stub_page_display"
             )
         )
-        if current_page < total_pages - 1:
+        if users_page.has_next:
             pagination_buttons.append(
                 InlineKeyboardButton(
                     text=_("next_page_button"),
-                    callback_data=f"admin_action:users_list:{current_page + 1}"
+                    callback_data=f"admin_action:users_list:{users_page.next_cursor().to_token()}"
                 )
             )
-        if pagination_buttons:
-            builder.row(*pagination_buttons)
+        builder.row(*pagination_buttons)
     
     # Back button
     builder.row(
@@ -453,6 +454,18 @@ def get_broadcast_confirmation_keyboard(lang: str,
     return builder.as_markup()
 
 
+def get_admin_stats_keyboard(lang: str,
+                             i18n_instance) -> InlineKeyboardMarkup:
+    _ = lambda key, **kwargs: i18n_instance.gettext(lang, key, **kwargs)
+    builder = InlineKeyboardBuilder()
+    builder.button(text=_(key="admin_stats_refresh_button"),
+                   callback_data="admin_action:stats_refresh")
+    builder.button(text=_(key="back_to_admin_panel_button"),
+                   callback_data="admin_action:main")
+    builder.adjust(1)
+    return builder.as_markup()
+
+
 def get_back_to_admin_panel_keyboard(lang: str,
                                      i18n_instance) -> InlineKeyboardMarkup:
     _ = lambda key, **kwargs: i18n_instance.gettext(lang, key, **kwargs)
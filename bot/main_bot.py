@@ -15,6 +15,7 @@ from sqlalchemy.orm import sessionmaker
 from config.settings import Settings
 
 from db.database_setup import init_db_connection
+from db.dal import user_dal
 
 from bot.middlewares.i18n import I18nMiddleware, get_i18n_instance, JsonI18n
 from bot.middlewares.db_session import DBSessionMiddleware
@@ -38,6 +39,8 @@ from bot.services.crypto_pay_service import CryptoPayService, cryptopay_webhook_
 from bot.handlers.user import payment as user_payment_webhook_module
 from bot.handlers.admin.sync_admin import perform_sync
 from bot.utils.message_queue import init_queue_manager
+from bot.services.persistent_message_queue import PersistentMessageQueue
+from bot.services.broadcast_service import BroadcastService
 
 
 async def register_all_routers(dp: Dispatcher, settings: Settings):
@@ -141,11 +144,47 @@ async def on_startup_configured(dispatcher: Dispatcher):
         except Exception as e:
             logging.error(f"STARTUP: Failed to set bot commands: {e}", exc_info=True)
 
+    action_log_writer = dispatcher.get("action_log_writer")
+    if action_log_writer:
+        action_log_writer.start()
+        logging.info("STARTUP: Action log writer started")
+
+    admin_stats_service = dispatcher.get("admin_stats_service")
+    if admin_stats_service:
+        admin_stats_service.start()
+        logging.info("STARTUP: Admin statistics refresh started")
+
+    message_log_maintenance = dispatcher.get("message_log_maintenance")
+    if message_log_maintenance:
+        message_log_maintenance.start()
+        logging.info("STARTUP: Message log partition maintenance started")
+
     # Initialize message queue manager
     try:
-        queue_manager = init_queue_manager(bot)
+        async def mark_users_bot_blocked(user_ids: list) -> None:
+            async with async_session_factory() as session:
+                marked = await user_dal.mark_users_bot_blocked(session, user_ids)
+                await session.commit()
+            logging.info(f"Marked {marked} users as having blocked the bot.")
+
+        queue_manager = init_queue_manager(bot, mark_users_bot_blocked)
         dispatcher["queue_manager"] = queue_manager
         logging.info("STARTUP: Message queue manager initialized")
+
+        if settings.MESSAGE_QUEUE_PERSISTENT:
+            persistent_queue = PersistentMessageQueue(
+                async_session_factory,
+                queue_manager,
+                claim_batch_size=settings.MESSAGE_QUEUE_CLAIM_BATCH_SIZE,
+                lease_seconds=settings.MESSAGE_QUEUE_LEASE_SECONDS,
+            )
+            await persistent_queue.start()
+            dispatcher["persistent_message_queue"] = persistent_queue
+            logging.info("STARTUP: Persistent message queue started")
+
+        broadcast_service = BroadcastService(async_session_factory, queue_manager)
+        broadcast_service.start()
+        dispatcher["broadcast_service"] = broadcast_service
     except Exception as e:
         logging.error(f"STARTUP: Failed to initialize message queue manager: {e}", exc_info=True)
 
@@ -196,6 +235,14 @@ async def on_shutdown_configured(dispatcher: Dispatcher):
                     logging.warning(f"Failed to close session for {key}: {e}")
 
     for service_key in (
+        "payment_webhook_inbox",
+        "background_tasks",
+        "action_log_writer",
+        "broadcast_service",
+        "persistent_message_queue",
+        "queue_manager",
+        "admin_stats_service",
+        "message_log_maintenance",
         "panel_service",
         "cryptopay_service",
         "freekassa_service",
@@ -210,6 +257,10 @@ async def on_shutdown_configured(dispatcher: Dispatcher):
     ):
         await close_service(service_key)
 
+    logging.info(
+        f"SHUTDOWN: User attributes cache stats: {user_dal.get_user_attributes_cache_stats()}"
+    )
+
     bot: Bot = dispatcher["bot_instance"]
     if bot and bot.session:
         try:
@@ -255,6 +306,7 @@ async def run_bot(settings_param: Settings):
         local_async_session_factory,
         i18n_instance,
         actual_bot_username,
+        background_tasks=extra["background_tasks"],
     )
     for key, service in services.items():
         dp[key] = service
@@ -8,13 +8,15 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.dal import message_log_dal, user_dal
 from config.settings import Settings
+from bot.services.action_log_writer import ActionLogWriter
 
 
 class ActionLoggerMiddleware(BaseMiddleware):
 
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings, log_writer: Optional[ActionLogWriter] = None):
         super().__init__()
         self.settings = settings
+        self.log_writer = log_writer
 
     async def __call__(self, handler: Callable[[Update, Dict[str, Any]],
                                                Awaitable[Any]], event: Update,
@@ -39,15 +41,6 @@ class ActionLoggerMiddleware(BaseMiddleware):
             if user_id in self.settings.ADMIN_IDS:
                 is_admin_event_flag = True
 
-        raw_update_snippet = None
-        try:
-            raw_update_snippet = event.model_dump_json(exclude_none=True,
-                                                       indent=None)[:1000]
-        except AttributeError:
-            raw_update_snippet = str(event)[:1000]
-        except Exception:
-            raw_update_snippet = str(event)[:1000]
-
         current_event_type = event.event_type
 
         if event.message:
@@ -69,9 +62,37 @@ class ActionLoggerMiddleware(BaseMiddleware):
 
         if user_id or current_event_type not in ["update"]:
 
+            if self.log_writer is not None:
+                # Persistence (user FK check, JSON preview, INSERT) happens in the
+                # background writer, outside of this update's transaction.
+                self.log_writer.enqueue({
+                    "user_id": user_id,
+                    "telegram_username": telegram_username,
+                    "telegram_first_name": telegram_first_name,
+                    "event_type": current_event_type,
+                    "content": content[:1000] if content else "N/A",
+                    "raw_update": event,
+                    "is_admin_event": is_admin_event_flag,
+                    "target_user_id": target_user_id_for_log,
+                    "timestamp": datetime.now(timezone.utc)
+                })
+                return result
+
+            raw_update_snippet = None
+            try:
+                raw_update_snippet = event.model_dump_json(exclude_none=True,
+                                                           indent=None)[:1000]
+            except AttributeError:
+                raw_update_snippet = str(event)[:1000]
+            except Exception:
+                raw_update_snippet = str(event)[:1000]
+
             log_user_id_for_db = user_id
             if user_id:
-                user_exists = await user_dal.get_user_by_id(session, user_id)
+                # The handler may have just created the user (e.g. /start), so fall
+                # back to the session identity map when no attributes were resolved.
+                user_exists = data.get("user_attributes") or await user_dal.get_session_user(
+                    session, user_id)
                 if not user_exists:
                     logging.warning(
                         f"ActionLoggerMiddleware: User {user_id} not found in DB. Logging action with user_id=NULL."
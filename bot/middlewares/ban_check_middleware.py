@@ -34,15 +34,17 @@ class BanCheckMiddleware(BaseMiddleware):
             return await handler(event, data)
 
         try:
-            db_user_model = await user_dal.get_user_by_id(
-                session, event_user.id)
+            user_attributes = data.get("user_attributes")
+            if user_attributes is None and "user_attributes" not in data:
+                user_attributes = await user_dal.get_user_attributes(
+                    session, event_user.id)
         except Exception as e_db:
             logging.error(
                 f"BanCheckMiddleware: DB error fetching user {event_user.id}: {e_db}",
                 exc_info=True)
             return await handler(event, data)
 
-        if db_user_model and db_user_model.is_banned:
+        if user_attributes and user_attributes.is_banned:
             logging.info(
                 f"User {event_user.id} ({event_user.username or 'NoUsername'}) is banned. Blocking access."
             )
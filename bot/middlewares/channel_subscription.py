@@ -59,7 +59,9 @@ class ChannelSubscriptionMiddleware(BaseMiddleware):
 
         session: AsyncSession = data["session"]
         try:
-            db_user = await user_dal.get_user_by_id(session, event_user.id)
+            db_user = data.get("user_attributes")
+            if db_user is None and "user_attributes" not in data:
+                db_user = await user_dal.get_user_attributes(session, event_user.id)
         except Exception as db_error:
             logging.error(
                 "ChannelSubscriptionMiddleware: failed to fetch user %s: %s",
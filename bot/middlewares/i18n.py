@@ -8,6 +8,7 @@ from aiogram.types import User, Update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.dal import user_dal
+from bot.utils import json_codec
 from config.settings import Settings
 
 
@@ -33,8 +34,8 @@ class JsonI18n:
                 lang_code = item.split(".")[0]
                 file_path = os.path.join(self.path, item)
                 try:
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        self.locales_data[lang_code] = json.load(f)
+                    with open(file_path, "rb") as f:
+                        self.locales_data[lang_code] = json_codec.loads(f.read())
                 except json.JSONDecodeError as e_json_load:
                     logging.error(
                         f"Error loading locale {lang_code} from {file_path} (JSON Decode Error): {e_json_load}"
@@ -131,17 +132,19 @@ class I18nMiddleware(BaseMiddleware):
     async def __call__(self, handler: Callable[[Update, Dict[str, Any]],
                                                Awaitable[Any]], event: Update,
                        data: Dict[str, Any]) -> Any:
-        session: AsyncSession = data["session"]
+        session: Optional[AsyncSession] = data.get("session")
         event_user: Optional[User] = data.get("event_from_user")
 
         current_language = self.i18n.default_lang
 
         if event_user:
             try:
-                user_db_model = await user_dal.get_user_by_id(
-                    session, event_user.id)
-                if user_db_model and user_db_model.language_code and user_db_model.language_code in self.i18n.locales_data:
-                    current_language = user_db_model.language_code
+                user_attributes = data.get("user_attributes")
+                if user_attributes is None and session is not None and "user_attributes" not in data:
+                    user_attributes = await user_dal.get_user_attributes(
+                        session, event_user.id)
+                if user_attributes and user_attributes.language_code and user_attributes.language_code in self.i18n.locales_data:
+                    current_language = user_attributes.language_code
                 elif event_user.language_code:
                     lang_prefix = event_user.language_code.split(
                         '-')[0].lower()
@@ -22,22 +22,24 @@ class ProfileSyncMiddleware(BaseMiddleware):
 
         if session and tg_user:
             try:
-                db_user = await user_dal.get_user_by_id(session, tg_user.id)
-                if db_user:
+                user_attributes = data.get("user_attributes")
+                if user_attributes is None and "user_attributes" not in data:
+                    user_attributes = await user_dal.get_user_attributes(session, tg_user.id)
+                if user_attributes:
                     update_payload: Dict[str, Any] = {}
                     sanitized_username = sanitize_username(tg_user.username)
                     sanitized_first_name = sanitize_display_name(tg_user.first_name)
                     sanitized_last_name = sanitize_display_name(tg_user.last_name)
 
-                    if db_user.username != sanitized_username:
+                    if user_attributes.username != sanitized_username:
                         update_payload["username"] = sanitized_username
-                    if db_user.first_name != sanitized_first_name:
+                    if user_attributes.first_name != sanitized_first_name:
                         update_payload["first_name"] = sanitized_first_name
-                    if db_user.last_name != sanitized_last_name:
+                    if user_attributes.last_name != sanitized_last_name:
                         update_payload["last_name"] = sanitized_last_name
 
                     if update_payload:
-                        await user_dal.update_user(session, tg_user.id, update_payload)
+                        db_user = await user_dal.update_user(session, tg_user.id, update_payload)
                         logging.info(
                             f"ProfileSyncMiddleware: Updated user {tg_user.id} profile fields: {list(update_payload.keys())}"
                         )
@@ -45,7 +47,7 @@ class ProfileSyncMiddleware(BaseMiddleware):
                         # Also update description on panel if linked
                         try:
                             panel_service = data.get("panel_service")
-                            if panel_service and db_user.panel_user_uuid:
+                            if panel_service and db_user and db_user.panel_user_uuid:
                                 description_text = "\n".join([
                                     username_for_display(tg_user.username, with_at=False) if sanitized_username is not None else "",
                                     sanitized_first_name or "",
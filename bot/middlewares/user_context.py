@@ -0,0 +1,45 @@
+import logging
+from dataclasses import replace
+from typing import Callable, Dict, Any, Awaitable, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update, User as TgUser
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.dal import user_dal
+
+
+class UserContextMiddleware(BaseMiddleware):
+    """
+    Resolves the hot attributes of the event author once per update and exposes them
+    as ``data["user_attributes"]`` (None for unknown users). Attributes come from the
+    process-wide cache in ``user_dal``; on a miss the row is loaded into the session
+    identity map, so later ``user_dal.get_session_user`` calls during the same update
+    are served without SQL. A user previously marked as having blocked the bot is
+    reachable again once they send us anything.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        session: Optional[AsyncSession] = data.get("session")
+        tg_user: Optional[TgUser] = data.get("event_from_user")
+
+        data["user_attributes"] = None
+        if session and tg_user:
+            try:
+                attributes = await user_dal.get_user_attributes(session, tg_user.id)
+                if attributes and attributes.is_bot_blocked:
+                    await user_dal.clear_user_bot_blocked(session, tg_user.id)
+                    attributes = replace(attributes, is_bot_blocked=False)
+                data["user_attributes"] = attributes
+            except Exception as e:
+                logging.error(
+                    f"UserContextMiddleware: Failed to load user {tg_user.id}: {e}",
+                    exc_info=True,
+                )
+
+        return await handler(event, data)
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from aiogram.types import Update
+from sqlalchemy.orm import sessionmaker
+
+from db.dal import message_log_dal
+
+_STOP = object()
+
+
+class ActionLogWriter:
+    """
+    Background sink for action logs.
+
+    Records are put into a bounded asyncio queue without touching the database and
+    a single writer task persists them in batches (one multi-row INSERT per batch)
+    every ``flush_interval_ms`` or as soon as ``batch_size`` records are pending.
+    When the queue is full new records are dropped and counted instead of slowing
+    down update handling.
+    """
+
+    def __init__(
+        self,
+        async_session_factory: sessionmaker,
+        max_queue_size: int = 10000,
+        batch_size: int = 200,
+        flush_interval_ms: int = 500,
+    ):
+        self.async_session_factory = async_session_factory
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = max(flush_interval_ms, 1) / 1000
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(max_queue_size, 1))
+        self._writer_task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        self.total_enqueued = 0
+        self.total_written = 0
+        self.total_dropped = 0
+        self.total_failed = 0
+        self.flushes = 0
+
+    def start(self) -> None:
+        if self._writer_task is None or self._writer_task.done():
+            self._closing = False
+            self._writer_task = asyncio.create_task(
+                self._run(), name="ActionLogWriterTask")
+
+    def enqueue(self, record: Dict[str, Any]) -> bool:
+        """Queue a log record; returns False if it was dropped."""
+        if self._closing:
+            self.total_dropped += 1
+            return False
+        try:
+            self.queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.total_dropped += 1
+            if self.total_dropped % 1000 == 1:
+                logging.warning(
+                    f"ActionLogWriter: queue is full, dropping log records (dropped so far: {self.total_dropped})"
+                )
+            return False
+        self.total_enqueued += 1
+        return True
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stop_requested = False
+        while not stop_requested:
+            first = await self.queue.get()
+            if first is _STOP:
+                return
+            batch: List[Dict[str, Any]] = [first]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stop_requested = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        rows = [self._materialize(record) for record in batch]
+        try:
+            async with self.async_session_factory() as session:
+                await message_log_dal.bulk_create_message_logs_no_commit(session, rows)
+                await session.commit()
+            self.total_written += len(rows)
+            self.flushes += 1
+        except Exception as e:
+            self.total_failed += len(rows)
+            logging.error(
+                f"ActionLogWriter: failed to persist {len(rows)} log records: {e}",
+                exc_info=True)
+
+    @staticmethod
+    def _materialize(record: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the DB row, serializing the raw update preview off the request path."""
+        row = dict(record)
+        raw_update = row.pop("raw_update", None)
+        if "raw_update_preview" not in row:
+            preview = None
+            if isinstance(raw_update, Update):
+                try:
+                    preview = raw_update.model_dump_json(exclude_none=True)[:1000]
+                except Exception:
+                    preview = str(raw_update)[:1000]
+            elif raw_update is not None:
+                preview = str(raw_update)[:1000]
+            row["raw_update_preview"] = preview
+        return row
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """Stop accepting records and flush everything still queued."""
+        self._closing = True
+        if self._writer_task and not self._writer_task.done():
+            await self.queue.put(_STOP)
+            try:
+                await asyncio.wait_for(self._writer_task, timeout)
+            except asyncio.TimeoutError:
+                logging.warning(
+                    "ActionLogWriter: writer did not finish flushing in time, cancelling.")
+            except Exception as e:
+                logging.error(f"ActionLogWriter: writer task failed: {e}", exc_info=True)
+        self._writer_task = None
+
+        pending: List[Dict[str, Any]] = []
+        while not self.queue.empty():
+            item = self.queue.get_nowait()
+            if item is not _STOP:
+                pending.append(item)
+        for start in range(0, len(pending), self.batch_size):
+            await self._flush(pending[start:start + self.batch_size])
+        logging.info(f"ActionLogWriter closed. Stats: {self.get_stats()}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "queue_size": self.queue.qsize(),
+            "enqueued": self.total_enqueued,
+            "written": self.total_written,
+            "dropped": self.total_dropped,
+            "failed": self.total_failed,
+            "flushes": self.flushes,
+        }
@@ -0,0 +1,181 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import sessionmaker
+
+from bot.services.panel_api_service import PanelApiService
+from db.dal import panel_sync_dal, payment_dal, user_dal
+
+
+class AdminStatsService:
+    """
+    Periodically computed snapshot of the admin statistics.
+
+    The user aggregates, financial rollup, recent payments, sync status and the
+    three panel statistics calls run concurrently (each DB query on its own
+    session) every ``refresh_interval`` seconds. Admin screens and inline results
+    read the cached snapshot, which carries ``generated_at`` so the age is
+    visible; ``get_snapshot(force=True)`` recomputes it on demand. Concurrent
+    refresh requests share one computation.
+
+    Connection pool counters of the outbound HTTP clients (``pool_sources``, any
+    object with ``get_pool_stats()``) are cheap and always read live; each
+    refresh also logs them so saturation shows up in the log over time.
+    """
+
+    def __init__(
+        self,
+        async_session_factory: sessionmaker,
+        panel_service: PanelApiService,
+        refresh_interval: float = 300.0,
+        recent_payments_limit: int = 5,
+        pool_sources: Optional[List[Any]] = None,
+    ):
+        self.async_session_factory = async_session_factory
+        self.panel_service = panel_service
+        self.refresh_interval = refresh_interval
+        self.recent_payments_limit = recent_payments_limit
+        self.pool_sources = [source for source in (pool_sources or []) if source is not None]
+
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._loop_task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self.refresh_interval > 0 and (self._loop_task is None or self._loop_task.done()):
+            self._loop_task = asyncio.create_task(
+                self._refresh_loop(), name="AdminStatsRefreshTask")
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"AdminStatsService: refresh failed: {e}", exc_info=True)
+            pool_stats = self.get_http_pool_stats()
+            if pool_stats:
+                logging.info("HTTP pools: " + "; ".join(
+                    f"{stats['name']} acquired={stats['acquired']}/{stats['limit']} "
+                    f"idle={stats['idle']} waiting={stats['waiting']} "
+                    f"waits={stats['waits_total']} max_wait_ms={stats['max_wait_ms']}"
+                    for stats in pool_stats))
+            await asyncio.sleep(self.refresh_interval)
+
+    def get_http_pool_stats(self) -> List[Dict[str, Any]]:
+        """Live pool counters of the HTTP clients that have sent anything yet."""
+        pool_stats = []
+        for source in self.pool_sources:
+            try:
+                stats = source.get_pool_stats()
+            except Exception as e:
+                logging.warning(f"AdminStatsService: pool stats of {type(source).__name__} unavailable: {e}")
+                continue
+            if stats and stats.get("requests"):
+                pool_stats.append(stats)
+        return pool_stats
+
+    async def get_snapshot(self, force: bool = False) -> Dict[str, Any]:
+        if self._snapshot is None or force:
+            return await self.refresh()
+        return self._snapshot
+
+    async def refresh(self) -> Dict[str, Any]:
+        """Recompute the snapshot, joining a refresh that is already running."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(
+                self._compute_snapshot(), name="AdminStatsComputeTask")
+        self._snapshot = await asyncio.shield(self._refresh_task)
+        return self._snapshot
+
+    async def _compute_snapshot(self) -> Dict[str, Any]:
+        started = asyncio.get_running_loop().time()
+        (
+            user_stats,
+            financial_stats,
+            recent_payments,
+            sync_status,
+            system_stats,
+            bandwidth_stats,
+            nodes_stats,
+        ) = await asyncio.gather(
+            self._with_session(user_dal.get_enhanced_user_statistics),
+            self._with_session(payment_dal.get_financial_statistics),
+            self._with_session(self._load_recent_payments),
+            self._with_session(self._load_sync_status),
+            self.panel_service.get_system_stats(),
+            self.panel_service.get_bandwidth_stats(),
+            self.panel_service.get_nodes_statistics(),
+            return_exceptions=True,
+        )
+
+        panel_error = next(
+            (str(result) for result in (system_stats, bandwidth_stats, nodes_stats)
+             if isinstance(result, BaseException)),
+            None,
+        )
+        snapshot = {
+            "generated_at": datetime.now(timezone.utc),
+            "user_stats": self._result_or_none("user statistics", user_stats),
+            "financial_stats": self._result_or_none("financial statistics", financial_stats),
+            "recent_payments": self._result_or_none("recent payments", recent_payments) or [],
+            "sync_status": self._result_or_none("sync status", sync_status),
+            "system_stats": self._result_or_none("panel system stats", system_stats),
+            "bandwidth_stats": self._result_or_none("panel bandwidth stats", bandwidth_stats),
+            "nodes_stats": self._result_or_none("panel nodes stats", nodes_stats),
+            "panel_error": panel_error,
+        }
+        logging.info(
+            f"AdminStatsService: snapshot refreshed in {asyncio.get_running_loop().time() - started:.2f}s"
+        )
+        return snapshot
+
+    async def _with_session(self, loader):
+        async with self.async_session_factory() as session:
+            return await loader(session)
+
+    @staticmethod
+    def _result_or_none(label: str, result: Any) -> Any:
+        if isinstance(result, BaseException):
+            logging.error(f"AdminStatsService: failed to load {label}: {result}",
+                          exc_info=(type(result), result, result.__traceback__))
+            return None
+        return result
+
+    async def _load_recent_payments(self, session) -> List[Dict[str, Any]]:
+        payments = await payment_dal.get_recent_payment_logs_with_user(
+            session, limit=self.recent_payments_limit)
+        return [{
+            "user_id": payment.user_id,
+            "username": payment.user.username if payment.user else None,
+            "first_name": payment.user.first_name if payment.user else None,
+            "amount": payment.amount,
+            "currency": payment.currency,
+            "status": payment.status,
+            "created_at": payment.created_at,
+        } for payment in payments]
+
+    @staticmethod
+    async def _load_sync_status(session) -> Optional[Dict[str, Any]]:
+        sync_status = await panel_sync_dal.get_panel_sync_status(session)
+        if not sync_status:
+            return None
+        return {
+            "status": sync_status.status,
+            "last_sync_time": sync_status.last_sync_time,
+            "details": sync_status.details,
+            "users_processed_from_panel": sync_status.users_processed_from_panel,
+            "subscriptions_synced": sync_status.subscriptions_synced,
+        }
+
+    async def close(self) -> None:
+        for task in (self._loop_task, self._refresh_task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
@@ -0,0 +1,230 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set
+
+from aiogram import types
+from sqlalchemy.orm import sessionmaker
+
+from bot.utils import MessageContent, build_queue_call
+from bot.utils.message_queue import MessageQueueManager, QueuedMessage
+from db.dal import broadcast_dal, message_log_dal, user_dal
+
+
+class BroadcastService:
+    """
+    Queues broadcasts and keeps their progress in the ``broadcasts`` table.
+
+    Recipients are streamed from the database through a server-side cursor and
+    enqueued chunk by chunk; every chunk writes its delivery log rows with a single
+    INSERT. Delivery outcomes reported by the message queue are aggregated in memory
+    and added to the per-broadcast counters every ``flush_interval`` seconds, so the
+    admin progress view only needs to read one row.
+    """
+
+    def __init__(
+        self,
+        async_session_factory: sessionmaker,
+        queue_manager: MessageQueueManager,
+        chunk_size: int = 1000,
+        flush_interval: float = 2.0,
+    ):
+        self.async_session_factory = async_session_factory
+        self.queue_manager = queue_manager
+        self.chunk_size = max(chunk_size, 1)
+        self.flush_interval = flush_interval
+
+        # broadcast_id -> [sent, failed, blocked] not yet written to the table
+        self._pending_counters: Dict[int, List[int]] = {}
+        self._queuing_tasks: Set[asyncio.Task] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self.queue_manager.add_result_listener(self._on_message_done)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(
+                self._flush_loop(), name="BroadcastCountersFlushTask")
+
+    async def start_broadcast(
+        self,
+        admin_user: types.User,
+        target: str,
+        content: MessageContent,
+        **send_kwargs: Any,
+    ) -> int:
+        """Register a broadcast and start queuing it in the background."""
+        async with self.async_session_factory() as session:
+            broadcast = await broadcast_dal.create_broadcast(
+                session,
+                {
+                    "admin_id": admin_user.id,
+                    "target": target,
+                    "content_type": content.content_type,
+                    "content_preview": (content.text or "")[:200],
+                    "status": broadcast_dal.STATUS_QUEUING,
+                },
+            )
+            await session.commit()
+            broadcast_id = broadcast.broadcast_id
+
+        task = asyncio.create_task(
+            self._queue_audience(broadcast_id, admin_user, target, content, send_kwargs),
+            name=f"BroadcastQueuing-{broadcast_id}",
+        )
+        self._queuing_tasks.add(task)
+        task.add_done_callback(self._queuing_tasks.discard)
+        return broadcast_id
+
+    async def _queue_audience(
+        self,
+        broadcast_id: int,
+        admin_user: types.User,
+        target: str,
+        content: MessageContent,
+        send_kwargs: Dict[str, Any],
+    ) -> None:
+        method_name, call_kwargs = build_queue_call(content, **send_kwargs)
+        log_content = f"[{content.content_type}] {(content.text or '')[:70]}..."
+        total = 0
+        try:
+            async with self.async_session_factory() as stream_session:
+                async for user_ids in user_dal.iter_broadcast_user_ids(
+                        stream_session, target, self.chunk_size):
+                    total += len(user_ids)
+                    await self._queue_chunk(
+                        broadcast_id, admin_user, user_ids, method_name,
+                        call_kwargs, log_content)
+
+            async with self.async_session_factory() as session:
+                await broadcast_dal.finish_queuing(session, broadcast_id, total)
+                await broadcast_dal.complete_if_delivered(session, broadcast_id)
+                await session.commit()
+            logging.info(
+                f"Broadcast {broadcast_id} by admin {admin_user.id}: {total} recipients queued ({target})."
+            )
+        except (Exception, asyncio.CancelledError) as e:
+            logging.error(f"Broadcast {broadcast_id} queuing stopped after {total} recipients: {e!r}", exc_info=True)
+            async with self.async_session_factory() as session:
+                await broadcast_dal.finish_queuing(session, broadcast_id, total)
+                await broadcast_dal.set_broadcast_status(
+                    session, broadcast_id, broadcast_dal.STATUS_FAILED)
+                await session.commit()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+
+    async def _queue_chunk(
+        self,
+        broadcast_id: int,
+        admin_user: types.User,
+        user_ids: List[int],
+        method_name: str,
+        call_kwargs: Dict[str, Any],
+        log_content: str,
+    ) -> None:
+        messages = [
+            QueuedMessage(
+                chat_id=uid,
+                method_name=method_name,
+                kwargs=call_kwargs,
+                broadcast_id=broadcast_id,
+            )
+            for uid in user_ids
+        ]
+        queue_error: Optional[Exception] = None
+        try:
+            await self.queue_manager.enqueue_many(messages)
+        except Exception as e:
+            queue_error = e
+            logging.warning(
+                f"Failed to queue broadcast {broadcast_id} chunk of {len(user_ids)}: {type(e).__name__} – {e}"
+            )
+
+        if queue_error is None:
+            event_type = "admin_broadcast_queued"
+            content = f"Broadcast #{broadcast_id} {log_content}"
+        else:
+            event_type = "admin_broadcast_failed"
+            content = f"Broadcast #{broadcast_id}: {type(queue_error).__name__} – {str(queue_error)[:70]}..."
+        log_rows = [
+            {
+                "user_id": admin_user.id,
+                "telegram_username": admin_user.username,
+                "telegram_first_name": admin_user.first_name,
+                "event_type": event_type,
+                "content": content,
+                "is_admin_event": True,
+                "target_user_id": uid,
+            }
+            for uid in user_ids
+        ]
+        async with self.async_session_factory() as session:
+            await message_log_dal.bulk_create_message_logs_no_commit(session, log_rows)
+            if queue_error is None:
+                await broadcast_dal.increment_broadcast_counters(
+                    session, broadcast_id, queued=len(user_ids))
+            else:
+                await broadcast_dal.increment_broadcast_counters(
+                    session, broadcast_id, queued=len(user_ids), failed=len(user_ids))
+            await session.commit()
+
+    def _on_message_done(
+        self, message: QueuedMessage, sent: bool, error: Optional[str]
+    ) -> None:
+        if message.broadcast_id is None:
+            return
+        counters = self._pending_counters.setdefault(message.broadcast_id, [0, 0, 0])
+        if sent:
+            counters[0] += 1
+        elif error and error.startswith("forbidden"):
+            counters[2] += 1
+        else:
+            counters[1] += 1
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self._flush_counters()
+            except Exception as e:
+                logging.error(f"Failed to store broadcast counters: {e}", exc_info=True)
+
+    async def _flush_counters(self) -> None:
+        if not self._pending_counters:
+            return
+        pending, self._pending_counters = self._pending_counters, {}
+        try:
+            async with self.async_session_factory() as session:
+                for broadcast_id, (sent, failed, blocked) in pending.items():
+                    await broadcast_dal.increment_broadcast_counters(
+                        session, broadcast_id, sent=sent, failed=failed, blocked=blocked)
+                    await broadcast_dal.complete_if_delivered(session, broadcast_id)
+                await session.commit()
+        except Exception:
+            for broadcast_id, counters in pending.items():
+                current = self._pending_counters.setdefault(broadcast_id, [0, 0, 0])
+                for index, value in enumerate(counters):
+                    current[index] += value
+            raise
+
+    async def close(self, drain_timeout: float = 5.0) -> None:
+        """Stop queuing new chunks and store outcomes of messages sent so far."""
+        for task in list(self._queuing_tasks):
+            task.cancel()
+        if self._queuing_tasks:
+            await asyncio.gather(*self._queuing_tasks, return_exceptions=True)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + drain_timeout
+        while (
+            self.queue_manager.user_queue.is_processing
+            or self.queue_manager.group_queue.is_processing
+        ) and loop.time() < deadline:
+            await asyncio.sleep(0.1)
+
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        self._flush_task = None
+        try:
+            await self._flush_counters()
+        except Exception as e:
+            logging.error(f"Failed to store broadcast counters on shutdown: {e}", exc_info=True)
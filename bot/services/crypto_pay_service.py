@@ -1,12 +1,13 @@
 import logging
 import json
-from typing import Optional
+from typing import Any, Dict, Optional
 
 from aiogram import Bot
 from aiohttp import web
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import sessionmaker
 from aiocryptopay import AioCryptoPay, Networks
+from aiocryptopay.models.invoice import Invoice
 from aiocryptopay.models.update import Update
 
 from config.settings import Settings
@@ -16,8 +17,12 @@ from bot.services.referral_service import ReferralService
 from bot.keyboards.inline.user_keyboards import get_connect_and_main_keyboard
 from bot.services.notification_service import NotificationService
 from db.dal import payment_dal, user_dal
+from db.models import User
 from bot.utils.text_sanitizer import sanitize_display_name, username_for_display
 from bot.utils.config_link import prepare_config_links
+from bot.utils import json_codec
+from bot.utils.background_tasks import BackgroundTaskSupervisor, run_in_background
+from bot.services.payment_webhook_inbox import accept_or_process
 
 
 class CryptoPayService:
@@ -31,6 +36,7 @@ class CryptoPayService:
         async_session_factory: sessionmaker,
         subscription_service: SubscriptionService,
         referral_service: ReferralService,
+        background_tasks: Optional[BackgroundTaskSupervisor] = None,
     ):
         self.bot = bot
         self.settings = settings
@@ -38,10 +44,10 @@ class CryptoPayService:
         self.async_session_factory = async_session_factory
         self.subscription_service = subscription_service
         self.referral_service = referral_service
+        self.background_tasks = background_tasks
         if token:
             net = Networks.TEST_NET if str(network).lower() == "testnet" else Networks.MAIN_NET
             self.client = AioCryptoPay(token=token, network=net)
-            self.client.register_pay_handler(self._invoice_paid_handler)
             self.configured = True
         else:
             logging.warning("CryptoPay token not provided. CryptoPay disabled")
@@ -128,11 +134,11 @@ class CryptoPayService:
             logging.error(f"CryptoPay invoice creation failed: {e}", exc_info=True)
             return None
 
-    async def _invoice_paid_handler(self, update: Update, app: web.Application):
+    async def _invoice_paid_handler(self, update: Update) -> web.Response:
         invoice = update.payload
         if not invoice.payload:
             logging.warning("CryptoPay webhook without payload")
-            return
+            return web.Response(text="ok_no_payload")
         try:
             meta = json.loads(invoice.payload)
             user_id = int(meta["user_id"])
@@ -142,16 +148,20 @@ class CryptoPayService:
             traffic_gb = float(meta.get("traffic_gb")) if meta.get("traffic_gb") else months
         except Exception as e:
             logging.error(f"Failed to parse CryptoPay payload: {e}")
-            return
+            return web.Response(status=400, text="bad_payload")
 
-        async_session_factory: sessionmaker = app["async_session_factory"]
-        bot: Bot = app["bot"]
-        settings: Settings = app["settings"]
-        i18n: JsonI18n = app["i18n"]
-        subscription_service: SubscriptionService = app["subscription_service"]
-        referral_service: ReferralService = app["referral_service"]
+        async_session_factory = self.async_session_factory
+        bot = self.bot
+        settings = self.settings
+        i18n = self.i18n
+        subscription_service = self.subscription_service
+        referral_service = self.referral_service
 
         async with async_session_factory() as session:
+            existing_payment = await payment_dal.get_payment_by_db_id(session, payment_db_id)
+            if existing_payment and existing_payment.status == "succeeded":
+                logging.info(f"CryptoPay invoice {invoice.invoice_id}: payment {payment_db_id} already succeeded")
+                return web.Response(text="ok")
             try:
                 await payment_dal.update_provider_payment_and_status(
                     session,
@@ -182,89 +192,132 @@ class CryptoPayService:
             except Exception as e:
                 await session.rollback()
                 logging.error(f"Failed to process CryptoPay invoice: {e}", exc_info=True)
-                return
+                return web.Response(status=500, text="processing_error")
 
             db_user = await user_dal.get_user_by_id(session, user_id)
-            # Use DB language for user-facing messages
-            lang = db_user.language_code if db_user and db_user.language_code else settings.DEFAULT_LANGUAGE
-            _ = lambda k, **kw: i18n.gettext(lang, k, **kw)
+            await run_in_background(
+                self.background_tasks,
+                self._notify_payment_success(
+                    user_id, db_user, invoice, activation, referral_bonus, months, traffic_gb, sale_mode),
+                name=f"cryptopay-payment-{payment_db_id}",
+            )
+        return web.Response(text="ok")
 
-            raw_config_link = activation.get("subscription_url") if activation else None
-            display_link, button_link = await prepare_config_links(settings, raw_config_link)
-            config_link_text = display_link or _("config_link_not_available")
-            final_end = activation.get("end_date")
-            applied_days = 0
-            if referral_bonus and referral_bonus.get("referee_new_end_date"):
-                final_end = referral_bonus["referee_new_end_date"]
-                applied_days = referral_bonus.get("referee_bonus_applied_days", 0)
+    async def _notify_payment_success(
+        self,
+        user_id: int,
+        db_user: Optional[User],
+        invoice: Invoice,
+        activation: Optional[Dict[str, Any]],
+        referral_bonus: Optional[Dict[str, Any]],
+        months: float,
+        traffic_gb: float,
+        sale_mode: str,
+    ) -> None:
+        """Send the payment confirmation to the user and the admin log (runs after the commit)."""
+        # Use DB language for user-facing messages
+        lang = db_user.language_code if db_user and db_user.language_code else self.settings.DEFAULT_LANGUAGE
+        _ = lambda k, **kw: self.i18n.gettext(lang, k, **kw)
 
-            if sale_mode == "traffic":
-                text = _("payment_successful_traffic_full",
-                         traffic_gb=str(int(traffic_gb)) if float(traffic_gb).is_integer() else f"{traffic_gb:g}",
-                         end_date=final_end.strftime('%Y-%m-%d') if final_end else "—",
-                         config_link=config_link_text)
-            elif applied_days:
-                inviter_name_display = _("friend_placeholder")
-                if db_user and db_user.referred_by_id:
+        raw_config_link = activation.get("subscription_url") if activation else None
+        display_link, button_link = await prepare_config_links(self.settings, raw_config_link)
+        config_link_text = display_link or _("config_link_not_available")
+        final_end = activation.get("end_date")
+        applied_days = 0
+        if referral_bonus and referral_bonus.get("referee_new_end_date"):
+            final_end = referral_bonus["referee_new_end_date"]
+            applied_days = referral_bonus.get("referee_bonus_applied_days", 0)
+
+        if sale_mode == "traffic":
+            text = _("payment_successful_traffic_full",
+                     traffic_gb=str(int(traffic_gb)) if float(traffic_gb).is_integer() else f"{traffic_gb:g}",
+                     end_date=final_end.strftime('%Y-%m-%d') if final_end else "—",
+                     config_link=config_link_text)
+        elif applied_days:
+            inviter_name_display = _("friend_placeholder")
+            if db_user and db_user.referred_by_id:
+                async with self.async_session_factory() as session:
                     inviter = await user_dal.get_user_by_id(session, db_user.referred_by_id)
-                    if inviter:
-                        safe_name = sanitize_display_name(inviter.first_name) if inviter.first_name else None
-                        if safe_name:
-                            inviter_name_display = safe_name
-                        elif inviter.username:
-                            inviter_name_display = username_for_display(inviter.username, with_at=False)
-                text = _("payment_successful_with_referral_bonus_full",
-                         months=int(months),
-                         base_end_date=activation["end_date"].strftime('%Y-%m-%d'),
-                         bonus_days=applied_days,
-                         final_end_date=final_end.strftime('%Y-%m-%d'),
-                         inviter_name=inviter_name_display,
-                         config_link=config_link_text)
-            else:
-                text = _("payment_successful_full",
-                         months=int(months),
-                         end_date=final_end.strftime('%Y-%m-%d') if final_end else "—",
-                         config_link=config_link_text)
+                if inviter:
+                    safe_name = sanitize_display_name(inviter.first_name) if inviter.first_name else None
+                    if safe_name:
+                        inviter_name_display = safe_name
+                    elif inviter.username:
+                        inviter_name_display = username_for_display(inviter.username, with_at=False)
+            text = _("payment_successful_with_referral_bonus_full",
+                     months=int(months),
+                     base_end_date=activation["end_date"].strftime('%Y-%m-%d'),
+                     bonus_days=applied_days,
+                     final_end_date=final_end.strftime('%Y-%m-%d'),
+                     inviter_name=inviter_name_display,
+                     config_link=config_link_text)
+        else:
+            text = _("payment_successful_full",
+                     months=int(months),
+                     end_date=final_end.strftime('%Y-%m-%d') if final_end else "—",
+                     config_link=config_link_text)
 
-            markup = get_connect_and_main_keyboard(
-                lang,
-                i18n,
-                settings,
-                display_link,
-                connect_button_url=button_link,
-                preserve_message=True,
+        markup = get_connect_and_main_keyboard(
+            lang,
+            self.i18n,
+            self.settings,
+            display_link,
+            connect_button_url=button_link,
+            preserve_message=True,
+        )
+        try:
+            await self.bot.send_message(
+                user_id,
+                text,
+                reply_markup=markup,
+                parse_mode="HTML",
+                disable_web_page_preview=True,
             )
-            try:
-                await bot.send_message(
-                    user_id,
-                    text,
-                    reply_markup=markup,
-                    parse_mode="HTML",
-                    disable_web_page_preview=True,
-                )
-            except Exception as e:
-                logging.error(f"Failed to send CryptoPay success message: {e}")
+        except Exception as e:
+            logging.error(f"Failed to send CryptoPay success message: {e}")
 
-            # Send notification about payment
-            try:
-                notification_service = NotificationService(bot, settings, i18n)
-                user = await user_dal.get_user_by_id(session, user_id)
-                await notification_service.notify_payment_received(
-                    user_id=user_id,
-                    amount=float(invoice.amount),
-                    currency=invoice.asset or settings.DEFAULT_CURRENCY_SYMBOL,
-                    months=int(months) if sale_mode != "traffic" else 0,
-                    traffic_gb=traffic_gb if sale_mode == "traffic" else None,
-                    payment_provider="crypto_pay",
-                    username=user.username if user else None
-                )
-            except Exception as e:
-                logging.error(f"Failed to send crypto_pay payment notification: {e}")
+        # Send notification about payment
+        try:
+            notification_service = NotificationService(self.bot, self.settings, self.i18n)
+            await notification_service.notify_payment_received(
+                user_id=user_id,
+                amount=float(invoice.amount),
+                currency=invoice.asset or self.settings.DEFAULT_CURRENCY_SYMBOL,
+                months=int(months) if sale_mode != "traffic" else 0,
+                traffic_gb=traffic_gb if sale_mode == "traffic" else None,
+                payment_provider="crypto_pay",
+                username=db_user.username if db_user else None
+            )
+        except Exception as e:
+            logging.error(f"Failed to send crypto_pay payment notification: {e}")
+
+    async def process_webhook_event(self, event: Dict[str, Any]) -> web.Response:
+        """Apply a verified Crypto Pay update (inline or from the webhook inbox)."""
+        update = Update(**event)
+        if update.update_type != "invoice_paid":
+            return web.Response(text="ok_ignored")
+        return await self._invoice_paid_handler(update)
 
     async def webhook_route(self, request: web.Request) -> web.Response:
         if not self.configured or not self.client:
             return web.Response(status=503, text="cryptopay_disabled")
-        return await self.client.get_updates(request)
+        body_text = await request.text()
+        signature = request.headers.get("Crypto-Pay-Api-Signature", "")
+        if not self.client.check_signature(body_text=body_text, crypto_pay_signature=signature):
+            logging.error("CryptoPay webhook: invalid signature")
+            return web.Response(status=403, text="invalid_signature")
+        try:
+            event = json_codec.loads(body_text)
+        except ValueError:
+            return web.Response(status=400, text="bad_request")
+        return await accept_or_process(
+            request,
+            "cryptopay",
+            str(event.get("update_id")),
+            event,
+            self.process_webhook_event,
+            lambda: web.Response(text="Status OK!"),
+        )
 
 
 async def cryptopay_webhook_route(request: web.Request) -> web.Response:
@@ -2,13 +2,12 @@ import asyncio
 from datetime import datetime
 import hashlib
 import hmac
-import json
 import logging
 import time
 from decimal import Decimal, ROUND_HALF_UP
 from typing import Optional, Dict, Any, Tuple
 
-from aiohttp import ClientSession, ClientTimeout, web
+from aiohttp import ClientSession, web
 from aiogram import Bot
 from sqlalchemy.orm import sessionmaker
 
@@ -19,7 +18,12 @@ from bot.services.referral_service import ReferralService
 from bot.keyboards.inline.user_keyboards import get_connect_and_main_keyboard
 from bot.services.notification_service import NotificationService
 from db.dal import payment_dal, user_dal
+from db.models import Payment, User
 from bot.utils.text_sanitizer import sanitize_display_name, username_for_display
+from bot.utils import json_codec
+from bot.utils.background_tasks import BackgroundTaskSupervisor, run_in_background
+from bot.utils.http_client import HttpClientPool
+from bot.services.payment_webhook_inbox import accept_or_process
 from bot.utils.config_link import prepare_config_links
 
 
@@ -33,6 +37,7 @@ class FreeKassaService:
         async_session_factory: sessionmaker,
         subscription_service: SubscriptionService,
         referral_service: ReferralService,
+        background_tasks: Optional[BackgroundTaskSupervisor] = None,
     ):
         self.bot = bot
         self.settings = settings
@@ -40,6 +45,7 @@ class FreeKassaService:
         self.async_session_factory = async_session_factory
         self.subscription_service = subscription_service
         self.referral_service = referral_service
+        self.background_tasks = background_tasks
 
         self.shop_id: Optional[str] = settings.FREEKASSA_MERCHANT_ID
         self.api_key: Optional[str] = settings.FREEKASSA_API_KEY
@@ -49,8 +55,7 @@ class FreeKassaService:
         self.payment_method_id: Optional[int] = settings.FREEKASSA_PAYMENT_METHOD_ID
 
         self.api_base_url: str = "https://api.fk.life/v1"
-        self._timeout = ClientTimeout(total=15)
-        self._session: Optional[ClientSession] = None
+        self._http = HttpClientPool(settings, "freekassa", total_timeout=15)
         self._nonce_lock = asyncio.Lock()
         self._last_nonce = int(time.time() * 1000)
 
@@ -120,8 +125,8 @@ class FreeKassaService:
             async with session.post(url, json=payload) as response:
                 response_text = await response.text()
                 try:
-                    response_data = json.loads(response_text) if response_text else {}
-                except json.JSONDecodeError:
+                    response_data = json_codec.loads(response_text) if response_text else {}
+                except ValueError:
                     logging.error("FreeKassa create_order: failed to decode JSON: %s", response_text)
                     return False, {"status": response.status, "message": "invalid_json", "raw": response_text}
 
@@ -139,9 +144,10 @@ class FreeKassaService:
             return False, {"message": str(exc)}
 
     async def _get_session(self) -> ClientSession:
-        if self._session is None or self._session.closed:
-            self._session = ClientSession(timeout=self._timeout)
-        return self._session
+        return await self._http.get_session()
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        return self._http.get_stats()
 
     async def _generate_nonce(self) -> int:
         async with self._nonce_lock:
@@ -164,8 +170,7 @@ class FreeKassaService:
         return hmac.new(self.api_key.encode("utf-8"), message.encode("utf-8"), hashlib.sha256).hexdigest()
 
     async def close(self) -> None:
-        if self._session and not self._session.closed:
-            await self._session.close()
+        await self._http.close()
 
     def _validate_signature(
         self,
@@ -212,7 +217,7 @@ class FreeKassaService:
             payload_dict = {str(k): v for k, v in data.items()}
         else:
             try:
-                json_payload = await request.json()
+                json_payload = await request.json(loads=json_codec.loads)
                 payload_dict = {str(k): v for k, v in json_payload.items()} if isinstance(json_payload, dict) else {}
                 data = json_payload
             except Exception:
@@ -246,6 +251,25 @@ class FreeKassaService:
             logging.error("FreeKassa webhook: invalid signature")
             return web.Response(status=403, text="invalid_signature")
 
+        event = {
+            "order_id": str(order_id_str),
+            "amount": str(amount_str),
+            "provider_payment_id": str(provider_payment_id) if provider_payment_id else None,
+        }
+        return await accept_or_process(
+            request,
+            "freekassa",
+            f"{order_id_str}:{provider_payment_id or ''}",
+            event,
+            self.process_webhook_event,
+            lambda: web.Response(text="YES"),
+        )
+
+    async def process_webhook_event(self, event: Dict[str, Any]) -> web.Response:
+        """Apply a verified FreeKassa notification (inline or from the webhook inbox)."""
+        order_id_str = event["order_id"]
+        amount_str = event["amount"]
+        provider_payment_id = event.get("provider_payment_id")
         try:
             payment_db_id = int(order_id_str)
         except (TypeError, ValueError):
@@ -315,105 +339,121 @@ class FreeKassaService:
                 return web.Response(status=500, text="processing_error")
 
             db_user = payment.user or await user_dal.get_user_by_id(session, payment.user_id)
-            lang = db_user.language_code if db_user and db_user.language_code else self.settings.DEFAULT_LANGUAGE
-            _ = lambda k, **kw: self.i18n.gettext(lang, k, **kw) if self.i18n else k
-
-            raw_config_link = activation.get("subscription_url") if activation else None
-            config_link_display, connect_button_url = await prepare_config_links(self.settings, raw_config_link)
-            config_link_text = config_link_display or _("config_link_not_available")
-            final_end = activation.get("end_date") if activation else None
-            months = payment.subscription_duration_months or 1
-            sale_mode = "traffic" if self.settings.traffic_sale_mode else "subscription"
-
-            applied_days = 0
-            if referral_bonus and referral_bonus.get("referee_new_end_date"):
-                final_end = referral_bonus["referee_new_end_date"]
-                applied_days = referral_bonus.get("referee_bonus_applied_days", 0)
-
-            if not final_end and activation and activation.get("end_date"):
-                final_end = activation["end_date"]
-
-            if final_end:
-                end_date_str = final_end.strftime("%Y-%m-%d")
-            else:
-                end_date_str = _("config_link_not_available")
-
-            traffic_label = str(int(months)) if float(months).is_integer() else f"{months:g}"
-
-            if sale_mode == "traffic":
-                text = _("payment_successful_traffic_full",
-                         traffic_gb=traffic_label,
-                         end_date=end_date_str if final_end else "",
-                         config_link=config_link_text)
-            elif applied_days:
-                inviter_name_display = _("friend_placeholder")
-                if db_user and db_user.referred_by_id:
-                    inviter = await user_dal.get_user_by_id(session, db_user.referred_by_id)
-                    if inviter:
-                        safe_name = sanitize_display_name(inviter.first_name) if inviter.first_name else None
-                        if safe_name:
-                            inviter_name_display = safe_name
-                        elif inviter.username:
-                            inviter_name_display = username_for_display(inviter.username, with_at=False)
-                text = _(
-                    "payment_successful_with_referral_bonus_full",
-                    months=months,
-                    base_end_date=activation["end_date"].strftime("%Y-%m-%d") if activation and activation.get("end_date") else end_date_str,
-                    bonus_days=applied_days,
-                    final_end_date=end_date_str,
-                    inviter_name=inviter_name_display,
-                    config_link=config_link_text,
-                )
-            else:
-                text = _(
-                    "payment_successful_full",
-                    months=months,
-                    end_date=end_date_str,
-                    config_link=config_link_text,
-                )
-            if provider_payment_id:
-                order_info_text = _(
-                    "free_kassa_order_full",
-                    order_id=provider_payment_id,
-                    date=datetime.now().strftime("%Y-%m-%d"),
-                )
-                text = f"{order_info_text}\n{text}"
-
-            markup = get_connect_and_main_keyboard(
-                lang,
-                self.i18n,
-                self.settings,
-                config_link_display,
-                connect_button_url=connect_button_url,
-                preserve_message=True,
+            await run_in_background(
+                self.background_tasks,
+                self._notify_payment_success(payment, db_user, activation, referral_bonus, provider_payment_id),
+                name=f"freekassa-payment-{payment.payment_id}",
             )
-            try:
-                await self.bot.send_message(
-                    payment.user_id,
-                    text,
-                    reply_markup=markup,
-                    parse_mode="HTML",
-                    disable_web_page_preview=True,
-                )
-            except Exception as e:
-                logging.error(f"FreeKassa notification: failed to send message to user {payment.user_id}: {e}")
-
-            try:
-                notification_service = NotificationService(self.bot, self.settings, self.i18n)
-                await notification_service.notify_payment_received(
-                    user_id=payment.user_id,
-                    amount=float(payment.amount),
-                    currency=self.default_currency,
-                    months=int(months) if sale_mode != "traffic" else 0,
-                    traffic_gb=months if sale_mode == "traffic" else None,
-                    payment_provider="freekassa",
-                    username=db_user.username if db_user else None,
-                )
-            except Exception as e:
-                logging.error(f"FreeKassa notification: failed to notify admins: {e}")
 
         return web.Response(text="YES")
 
+    async def _notify_payment_success(
+        self,
+        payment: Payment,
+        db_user: Optional[User],
+        activation: Optional[Dict[str, Any]],
+        referral_bonus: Optional[Dict[str, Any]],
+        provider_payment_id: Optional[str],
+    ) -> None:
+        """Send the payment confirmation to the user and the admin log (runs after the commit)."""
+        lang = db_user.language_code if db_user and db_user.language_code else self.settings.DEFAULT_LANGUAGE
+        _ = lambda k, **kw: self.i18n.gettext(lang, k, **kw) if self.i18n else k
+
+        raw_config_link = activation.get("subscription_url") if activation else None
+        config_link_display, connect_button_url = await prepare_config_links(self.settings, raw_config_link)
+        config_link_text = config_link_display or _("config_link_not_available")
+        final_end = activation.get("end_date") if activation else None
+        months = payment.subscription_duration_months or 1
+        sale_mode = "traffic" if self.settings.traffic_sale_mode else "subscription"
+
+        applied_days = 0
+        if referral_bonus and referral_bonus.get("referee_new_end_date"):
+            final_end = referral_bonus["referee_new_end_date"]
+            applied_days = referral_bonus.get("referee_bonus_applied_days", 0)
+
+        if not final_end and activation and activation.get("end_date"):
+            final_end = activation["end_date"]
+
+        if final_end:
+            end_date_str = final_end.strftime("%Y-%m-%d")
+        else:
+            end_date_str = _("config_link_not_available")
+
+        traffic_label = str(int(months)) if float(months).is_integer() else f"{months:g}"
+
+        if sale_mode == "traffic":
+            text = _("payment_successful_traffic_full",
+                     traffic_gb=traffic_label,
+                     end_date=end_date_str if final_end else "",
+                     config_link=config_link_text)
+        elif applied_days:
+            inviter_name_display = _("friend_placeholder")
+            if db_user and db_user.referred_by_id:
+                async with self.async_session_factory() as session:
+                    inviter = await user_dal.get_user_by_id(session, db_user.referred_by_id)
+                if inviter:
+                    safe_name = sanitize_display_name(inviter.first_name) if inviter.first_name else None
+                    if safe_name:
+                        inviter_name_display = safe_name
+                    elif inviter.username:
+                        inviter_name_display = username_for_display(inviter.username, with_at=False)
+            text = _(
+                "payment_successful_with_referral_bonus_full",
+                months=months,
+                base_end_date=activation["end_date"].strftime("%Y-%m-%d") if activation and activation.get("end_date") else end_date_str,
+                bonus_days=applied_days,
+                final_end_date=end_date_str,
+                inviter_name=inviter_name_display,
+                config_link=config_link_text,
+            )
+        else:
+            text = _(
+                "payment_successful_full",
+                months=months,
+                end_date=end_date_str,
+                config_link=config_link_text,
+            )
+        if provider_payment_id:
+            order_info_text = _(
+                "free_kassa_order_full",
+                order_id=provider_payment_id,
+                date=datetime.now().strftime("%Y-%m-%d"),
+            )
+            text = f"{order_info_text}\n{text}"
+
+        markup = get_connect_and_main_keyboard(
+            lang,
+            self.i18n,
+            self.settings,
+            config_link_display,
+            connect_button_url=connect_button_url,
+            preserve_message=True,
+        )
+        try:
+            await self.bot.send_message(
+                payment.user_id,
+                text,
+                reply_markup=markup,
+                parse_mode="HTML",
+                disable_web_page_preview=True,
+            )
+        except Exception as e:
+            logging.error(f"FreeKassa notification: failed to send message to user {payment.user_id}: {e}")
+
+        try:
+            notification_service = NotificationService(self.bot, self.settings, self.i18n)
+            await notification_service.notify_payment_received(
+                user_id=payment.user_id,
+                amount=float(payment.amount),
+                currency=self.default_currency,
+                months=int(months) if sale_mode != "traffic" else 0,
+                traffic_gb=months if sale_mode == "traffic" else None,
+                payment_provider="freekassa",
+                username=db_user.username if db_user else None,
+            )
+        except Exception as e:
+            logging.error(f"FreeKassa notification: failed to notify admins: {e}")
+
 
 async def freekassa_webhook_route(request: web.Request) -> web.Response:
     service: FreeKassaService = request.app["freekassa_service"]
@@ -0,0 +1,142 @@
+import asyncio
+import csv
+import gzip
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import sessionmaker
+
+from db import message_log_partitions
+from db.dal import message_log_dal
+
+
+class MessageLogMaintenance:
+    """
+    Keeps the monthly ``message_logs`` partitions in shape.
+
+    Every ``interval_seconds`` (and once at startup) it creates the partitions
+    for the next ``months_ahead`` months and, when ``retention_days`` is set,
+    drops partitions whose whole range is older than the retention window. With
+    ``archive_dir`` set, each expired partition is first written there as a
+    gzipped CSV; a partition whose export fails is kept for the next run.
+    """
+
+    def __init__(
+        self,
+        async_session_factory: sessionmaker,
+        retention_days: int = 0,
+        months_ahead: int = 3,
+        archive_dir: Optional[str] = None,
+        interval_seconds: float = 6 * 3600,
+    ):
+        self.async_session_factory = async_session_factory
+        self.retention_days = max(retention_days, 0)
+        self.months_ahead = max(months_ahead, 1)
+        self.archive_dir = archive_dir
+        self.interval_seconds = max(interval_seconds, 60.0)
+
+        self._loop_task: Optional[asyncio.Task] = None
+        self.total_created = 0
+        self.total_dropped = 0
+        self.total_archived_rows = 0
+
+    def start(self) -> None:
+        if self._loop_task is None or self._loop_task.done():
+            self._loop_task = asyncio.create_task(
+                self._maintenance_loop(), name="MessageLogMaintenanceTask")
+
+    async def _maintenance_loop(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"MessageLogMaintenance: run failed: {e}", exc_info=True)
+            await asyncio.sleep(self.interval_seconds)
+
+    async def run_once(self) -> None:
+        async with self.async_session_factory() as session:
+            connection = await session.connection()
+            created = await connection.run_sync(
+                message_log_partitions.ensure_message_log_partitions, self.months_ahead)
+            await session.commit()
+        if created:
+            self.total_created += len(created)
+            logging.info(f"MessageLogMaintenance: created partitions {', '.join(created)}.")
+
+        if self.retention_days <= 0:
+            return
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.retention_days)
+
+        async with self.async_session_factory() as session:
+            connection = await session.connection()
+            partitions = await connection.run_sync(
+                message_log_partitions.list_message_log_partitions)
+            purged = await connection.run_sync(
+                message_log_partitions.purge_default_partition, cutoff)
+            await session.commit()
+        if purged:
+            logging.info(f"MessageLogMaintenance: removed {purged} expired rows from the default partition.")
+
+        for name, upper_bound in partitions:
+            if upper_bound is None or upper_bound > cutoff:
+                continue
+            if self.archive_dir:
+                try:
+                    await self._archive_partition(name)
+                except Exception as e:
+                    logging.error(
+                        f"MessageLogMaintenance: archiving {name} failed, keeping it: {e}",
+                        exc_info=True,
+                    )
+                    continue
+            async with self.async_session_factory() as session:
+                connection = await session.connection()
+                await connection.run_sync(
+                    message_log_partitions.drop_message_log_partition, name)
+                await session.commit()
+            self.total_dropped += 1
+            logging.info(f"MessageLogMaintenance: dropped expired partition {name}.")
+
+    async def _archive_partition(self, name: str) -> str:
+        """Write a partition to ``<archive_dir>/<name>.csv.gz`` and return the path."""
+        await asyncio.to_thread(os.makedirs, self.archive_dir, exist_ok=True)
+        path = os.path.join(self.archive_dir, f"{name}.csv.gz")
+        partial_path = f"{path}.part"
+
+        archive = await asyncio.to_thread(
+            gzip.open, partial_path, "wt", encoding="utf-8", newline="")
+        rows_written = 0
+        try:
+            writer = csv.writer(archive)
+            await asyncio.to_thread(writer.writerow, message_log_dal.ARCHIVE_COLUMNS)
+            async with self.async_session_factory() as session:
+                async for chunk in message_log_dal.stream_message_log_partition(session, name):
+                    await asyncio.to_thread(writer.writerows, chunk)
+                    rows_written += len(chunk)
+        finally:
+            await asyncio.to_thread(archive.close)
+
+        await asyncio.to_thread(os.replace, partial_path, path)
+        self.total_archived_rows += rows_written
+        logging.info(f"MessageLogMaintenance: archived {rows_written} rows of {name} to {path}.")
+        return path
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "partitions_created": self.total_created,
+            "partitions_dropped": self.total_dropped,
+            "archived_rows": self.total_archived_rows,
+        }
+
+    async def close(self) -> None:
+        if self._loop_task and not self._loop_task.done():
+            self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except (asyncio.CancelledError, Exception):
+                pass
+        logging.info(f"MessageLogMaintenance stopped. Stats: {self.get_stats()}")
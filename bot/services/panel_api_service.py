@@ -1,27 +1,60 @@
 import aiohttp
 import logging
-import json
 import re
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator
 from datetime import datetime, timedelta, timezone
 import asyncio
+import random
 from urllib.parse import urlencode
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from bot.utils import json_codec
+from bot.utils.circuit_breaker import CircuitBreaker, backoff_delay
+from bot.utils.http_client import HttpClientPool
+from bot.utils.ttl_cache import AsyncTTLCache
 from config.settings import Settings
 from db.dal import panel_sync_dal
 from db.models import PanelSyncStatus
 
 
+def _truncate(text: str, limit: int) -> str:
+    return text if len(text) <= limit else f"{text[:limit]}..."
+
+
+class PanelUsersFetchError(Exception):
+    """Raised when a page of panel users could not be fetched after retries."""
+
+
 class PanelApiService:
 
     def __init__(self, settings: Settings):
         self.settings = settings
         self.base_url = settings.PANEL_API_URL
         self.api_key = settings.PANEL_API_KEY
-        self._session: Optional[aiohttp.ClientSession] = None
+        self._http = HttpClientPool(settings, "panel", total_timeout=settings.PANEL_API_TIMEOUT_SECONDS)
+        self._circuit = CircuitBreaker(
+            "panel",
+            failure_threshold=settings.PANEL_API_CIRCUIT_FAILURE_THRESHOLD,
+            recovery_timeout=settings.PANEL_API_CIRCUIT_RECOVERY_SECONDS,
+        )
+        self.hedged_requests = 0
         self.default_client_ip = "127.0.0.1"
+        # raw subscription link -> happ crypt4 link; the panel output is stable per link
+        self._encrypted_links: AsyncTTLCache[str] = AsyncTTLCache(
+            maxsize=settings.CRYPT4_CACHE_MAX_SIZE,
+            ttl_seconds=settings.CRYPT4_CACHE_TTL_SECONDS,
+        )
+        # Short-lived per-uuid snapshots so menu navigation does not hit the panel
+        # on every tap. Cached objects are shared: callers must not mutate them.
+        self._user_cache: AsyncTTLCache[Dict[str, Any]] = AsyncTTLCache(
+            maxsize=settings.PANEL_USER_CACHE_MAX_SIZE,
+            ttl_seconds=settings.PANEL_USER_CACHE_TTL_SECONDS,
+        )
+        self._devices_cache: AsyncTTLCache[List[Dict[str, Any]]] = AsyncTTLCache(
+            maxsize=settings.PANEL_USER_CACHE_MAX_SIZE,
+            ttl_seconds=settings.PANEL_USER_CACHE_TTL_SECONDS,
+        )
 
     async def __aenter__(self):
         """Context manager entry"""
@@ -32,16 +65,23 @@ class PanelApiService:
         await self.close_session()
 
     async def _get_session(self) -> aiohttp.ClientSession:
-        if self._session is None or self._session.closed:
-            timeout = aiohttp.ClientTimeout(total=30)
-            self._session = aiohttp.ClientSession(timeout=timeout)
-        return self._session
+        return await self._http.get_session()
 
     async def close_session(self):
-        if self._session and not self._session.closed:
-            await self._session.close()
-            self._session = None
-            logging.debug("Panel API service HTTP session closed.")
+        await self._http.close()
+
+    def _should_log_full_response(self) -> bool:
+        """Sample full response bodies so bulk calls (e.g. /sync) do not flood the log."""
+        if not logging.root.isEnabledFor(logging.INFO):
+            return False
+        rate = self.settings.PANEL_API_LOG_FULL_RESPONSE_SAMPLE_RATE
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        stats = self._http.get_stats()
+        stats["circuit"] = self._circuit.get_stats()
+        stats["hedged_requests"] = self.hedged_requests
+        return stats
 
     async def close(self):
         """Alias for close_session for API consistency."""
@@ -63,7 +103,21 @@ class PanelApiService:
                        method: str,
                        endpoint: str,
                        log_full_response: bool = False,
+                       *,
+                       max_retries: Optional[int] = None,
+                       idempotent: Optional[bool] = None,
+                       hedge: Optional[bool] = None,
                        **kwargs) -> Optional[Dict[str, Any]]:
+        """Call the panel API with retries, a circuit breaker and optional hedging.
+
+        Transient failures (connection errors, timeouts, 5xx, 429) are retried with
+        jittered exponential backoff. Only idempotent requests (every method except
+        POST unless ``idempotent=True``) are retried after the request may have
+        reached the panel; failed connection attempts are always safe to retry.
+        While the circuit is open calls fail fast with status_code -5. Hedging
+        (GET only by default, PANEL_API_HEDGE_DELAY_MS > 0) sends a second copy of
+        a slow request and uses whichever answers first.
+        """
         if not self.base_url:
             logging.error(
                 "Panel API URL (PANEL_API_URL) not configured in settings.")
@@ -73,92 +127,178 @@ class PanelApiService:
                 "message": "Panel API URL not configured."
             }
 
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method != "POST"
+        if max_retries is None:
+            max_retries = self.settings.PANEL_API_MAX_RETRIES
+        if hedge is None:
+            hedge = method == "GET"
+        hedge_delay = self.settings.PANEL_API_HEDGE_DELAY_MS / 1000 if hedge else 0
+
+        attempt = 0
+        while True:
+            if not self._circuit.allow_request():
+                logging.warning(
+                    f"Panel API circuit is open, failing fast: {method} {endpoint}")
+                return {
+                    "error": True,
+                    "status_code": -5,
+                    "message": "Panel API temporarily unavailable (circuit open)"
+                }
+
+            if hedge_delay > 0:
+                response = await self._send_hedged_request(
+                    hedge_delay, method, endpoint, log_full_response, **kwargs)
+            else:
+                response = await self._send_request(
+                    method, endpoint, log_full_response, **kwargs)
+
+            status_code = response.get("status_code") if response and response.get("error") else None
+            if status_code in (-1, -2, -3) or (status_code is not None and status_code >= 500):
+                self._circuit.record_failure()
+            else:
+                self._circuit.record_success()
+
+            retryable = status_code in (-1, -2, -3, 429) or (
+                status_code is not None and status_code >= 500)
+            if not retryable or attempt >= max_retries:
+                return response
+            if not idempotent and status_code != -1:
+                return response
+
+            attempt += 1
+            delay = backoff_delay(
+                attempt,
+                self.settings.PANEL_API_RETRY_BASE_DELAY_SECONDS,
+                self.settings.PANEL_API_RETRY_MAX_DELAY_SECONDS,
+            )
+            logging.warning(
+                f"Panel API {method} {endpoint} failed (status {status_code}), retry {attempt}/{max_retries} in {delay:.2f}s."
+            )
+            await asyncio.sleep(delay)
+
+    async def _send_hedged_request(self,
+                                   hedge_delay: float,
+                                   method: str,
+                                   endpoint: str,
+                                   log_full_response: bool,
+                                   **kwargs) -> Optional[Dict[str, Any]]:
+        primary = asyncio.ensure_future(
+            self._send_request(method, endpoint, log_full_response, **kwargs))
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=hedge_delay)
+            if done:
+                return primary.result()
+            self.hedged_requests += 1
+            pending.add(asyncio.ensure_future(
+                self._send_request(method, endpoint, log_full_response, **kwargs)))
+            response: Optional[Dict[str, Any]] = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    response = task.result()
+                    if not (response and response.get("error")):
+                        return response
+            return response
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _send_request(self,
+                            method: str,
+                            endpoint: str,
+                            log_full_response: bool = False,
+                            **kwargs) -> Optional[Dict[str, Any]]:
+        """Perform a single panel API request and normalize failures to error dicts."""
         aiohttp_session = await self._get_session()
         headers = await self._prepare_headers()
 
         url_for_request = f"{self.base_url.rstrip('/')}/{endpoint.lstrip('/')}"
 
-        current_params = kwargs.get("params")
-        url_with_params_for_log = url_for_request
-        if current_params:
-            try:
-                url_with_params_for_log += "?" + urlencode(current_params)
-            except Exception:
-                pass
-
-        json_payload_for_log = kwargs.get('json') if method.upper() in [
-            "POST", "PATCH", "PUT"
-        ] else None
-        log_prefix = f"Panel API Req: {method.upper()} {url_with_params_for_log}"
-        if json_payload_for_log:
-            try:
-                payload_str = json.dumps(json_payload_for_log)
-                log_prefix += f" | Payload: {payload_str[:300]}{'...' if len(payload_str) > 300 else ''}"
-            except Exception:
-                log_prefix += f" | Payload: {str(json_payload_for_log)[:300]}..."
+        def log_prefix() -> str:
+            # Built only when something is actually logged.
+            prefix = f"Panel API Req: {method.upper()} {url_for_request}"
+            current_params = kwargs.get("params")
+            if current_params:
+                try:
+                    prefix += "?" + urlencode(current_params)
+                except Exception:
+                    pass
+            payload = kwargs.get("json") if method.upper() in ("POST", "PATCH", "PUT") else None
+            if payload:
+                try:
+                    payload_str = json_codec.dumps(payload)
+                except Exception:
+                    payload_str = str(payload)
+                prefix += f" | Payload: {_truncate(payload_str, 300)}"
+            return prefix
+
         try:
             async with aiohttp_session.request(method.upper(),
                                                url_for_request,
                                                headers=headers,
                                                **kwargs) as response:
                 response_status = response.status
-                response_text = await response.text()
+                body = await response.read()
+                is_json = 'application/json' in response.headers.get(
+                    'Content-Type', '').lower()
+                is_ok = 200 <= response_status < 300
+
+                data: Any = None
+                parse_error: Optional[Exception] = None
+                if is_json:
+                    try:
+                        data = json_codec.loads(body)
+                    except ValueError as e_json:
+                        parse_error = e_json
 
-                log_suffix = f"| Status: {response_status}"
+                def body_text() -> str:
+                    return body.decode(response.get_encoding() if not is_json else "utf-8",
+                                       errors="replace")
 
-                if log_full_response or not (200 <= response_status < 300):
-                    try:
-                        parsed_json_for_log = json.loads(response_text)
-                        pretty_response_text = json.dumps(parsed_json_for_log,
-                                                          indent=2,
-                                                          ensure_ascii=False)
-                        logging.info(
-                            f"{log_prefix} {log_suffix} | Full Response Body:\n{pretty_response_text}"
-                        )
-                    except json.JSONDecodeError:
+                if not is_ok:
+                    if logging.root.isEnabledFor(logging.INFO):
                         logging.info(
-                            f"{log_prefix} {log_suffix} | Full Response Text (not JSON):\n{response_text[:2000]}{'...' if len(response_text) > 2000 else ''}"
+                            f"{log_prefix()} | Status: {response_status} | Response Body: {_truncate(body_text(), 2000)}"
                         )
-                else:
+                elif log_full_response and self._should_log_full_response():
+                    logging.info(
+                        f"{log_prefix()} | Status: {response_status} | Full Response Body: {_truncate(body_text(), 20000)}"
+                    )
+                elif logging.root.isEnabledFor(logging.DEBUG):
                     logging.debug(
-                        f"{log_prefix} {log_suffix} | OK. Response Body Preview: {response_text[:200]}{'...' if len(response_text) > 200 else ''}"
+                        f"{log_prefix()} | Status: {response_status} | OK. Response Body Preview: {_truncate(body_text(), 200)}"
                     )
 
-                if 200 <= response_status < 300:
-                    try:
-                        if 'application/json' in response.headers.get(
-                                'Content-Type', '').lower():
-                            data = json.loads(response_text)
-                            return data
-                        else:
-                            return {
-                                "status": "success",
-                                "code": response_status,
-                                "data_text": response_text
-                            }
-                    except json.JSONDecodeError as e_json_ok:
+                if is_ok:
+                    if not is_json:
+                        return {
+                            "status": "success",
+                            "code": response_status,
+                            "data_text": body_text()
+                        }
+                    if parse_error is not None:
                         logging.error(
-                            f"{log_prefix} {log_suffix} | OK but JSON Parse Error. Error: {e_json_ok}. Body was logged above."
+                            f"{log_prefix()} | Status: {response_status} | OK but JSON Parse Error. Error: {parse_error}."
                         )
                         return {
                             "status": "success_parse_error",
                             "code": response_status,
-                            "data_text": response_text,
-                            "parse_error": str(e_json_ok)
+                            "data_text": body_text(),
+                            "parse_error": str(parse_error)
                         }
+                    return data
                 else:
                     error_details = {
                         "message":
                         f"Request failed with status {response_status}",
-                        "raw_response_text": response_text
+                        "raw_response_text": body_text()
                     }
-                    try:
-                        if 'application/json' in response.headers.get(
-                                'Content-Type', '').lower():
-                            error_json_data = json.loads(response_text)
-                            error_details.update(error_json_data)
-                    except json.JSONDecodeError:
-                        pass
+                    if isinstance(data, dict):
+                        error_details.update(data)
                     return {
                         "error": True,
                         "status_code": response_status,
@@ -197,38 +337,133 @@ class PanelApiService:
                 "message": f"Unexpected error: {str(e)}"
             }
 
+    async def _fetch_users_page(
+            self,
+            start_offset: int,
+            page_size: int,
+            max_retries: int,
+            log_responses: bool) -> Dict[str, Any]:
+        """Fetch one /users page (retried by _request) or raise PanelUsersFetchError."""
+        params = {"size": page_size, "start": start_offset}
+        response_data = await self._request(
+            "GET",
+            "/users",
+            params=params,
+            log_full_response=log_responses,
+            max_retries=max_retries)
+        if response_data and not response_data.get("error"):
+            return response_data.get("response", {}) or {}
+        logging.error(
+            f"Failed to fetch panel users batch (start: {start_offset}) after {max_retries + 1} attempts. Response: {response_data}"
+        )
+        raise PanelUsersFetchError(
+            f"Failed to fetch panel users batch (start: {start_offset})")
+
+    async def iter_panel_users_batches(
+            self,
+            page_size: int = 100,
+            concurrency: int = 4,
+            max_retries: int = 2,
+            log_responses: bool = False) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yield panel users page by page as pages arrive.
+
+        The first page tells the total; the remaining pages are then fetched with up
+        to ``concurrency`` requests in flight and yielded in completion order. Every
+        page is retried separately; if one still fails PanelUsersFetchError is raised.
+        Panels that do not report a total are paged sequentially.
+        """
+        first_page = await self._fetch_users_page(
+            0, page_size, max_retries, log_responses)
+        users_batch = first_page.get("users", []) or []
+        if not users_batch:
+            return
+        yield users_batch
+
+        total = first_page.get("total")
+        if not isinstance(total, int):
+            start_offset = page_size
+            while len(users_batch) >= page_size:
+                page = await self._fetch_users_page(
+                    start_offset, page_size, max_retries, log_responses)
+                users_batch = page.get("users", []) or []
+                if not users_batch:
+                    break
+                yield users_batch
+                start_offset += page_size
+            return
+
+        offsets = iter(range(page_size, total, page_size))
+        in_flight = set()
+
+        def schedule_next() -> bool:
+            offset = next(offsets, None)
+            if offset is None:
+                return False
+            in_flight.add(asyncio.create_task(
+                self._fetch_users_page(offset, page_size, max_retries, log_responses)))
+            return True
+
+        for _ in range(max(concurrency, 1)):
+            if not schedule_next():
+                break
+        try:
+            while in_flight:
+                done, _ = await asyncio.wait(
+                    in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    in_flight.discard(task)
+                    page = task.result()
+                    schedule_next()
+                    users_batch = page.get("users", []) or []
+                    if users_batch:
+                        yield users_batch
+        finally:
+            for task in in_flight:
+                task.cancel()
+            if in_flight:
+                await asyncio.gather(*in_flight, return_exceptions=True)
+
     async def get_all_panel_users(
             self,
             page_size: int = 100,
-            log_responses: bool = False) -> Optional[List[Dict[str, Any]]]:
+            log_responses: bool = False,
+            concurrency: int = 4) -> Optional[List[Dict[str, Any]]]:
         all_users = []
-        start_offset = 0
-        while True:
-            params = {"size": page_size, "start": start_offset}
-            response_data = await self._request(
-                "GET",
-                "/users",
-                params=params,
-                log_full_response=log_responses)
-
-            if not response_data or response_data.get("error"):
-                logging.error(
-                    f"Failed to fetch panel users batch (start: {start_offset}). Response: {response_data}"
-                )
-                return None
-            users_batch = response_data.get("response", {}).get("users", [])
-            if not users_batch: break
-            all_users.extend(users_batch)
-            if len(users_batch) < page_size: break
-            start_offset += page_size
-            await asyncio.sleep(0.1)
+        try:
+            async for users_batch in self.iter_panel_users_batches(
+                    page_size=page_size,
+                    concurrency=concurrency,
+                    log_responses=log_responses):
+                all_users.extend(users_batch)
+        except PanelUsersFetchError:
+            return None
         logging.info(f"Fetched {len(all_users)} users from panel API.")
         return all_users
 
+    def invalidate_user_cache(self, user_uuid: Optional[str]) -> None:
+        """Drop cached user and device snapshots after the user changed on the panel."""
+        if not user_uuid:
+            return
+        self._user_cache.invalidate(user_uuid)
+        self._devices_cache.invalidate(user_uuid)
+
     async def get_user_by_uuid(
             self,
             user_uuid: str,
-            log_response: bool = True) -> Optional[Dict[str, Any]]:
+            log_response: bool = True,
+            use_cache: bool = True) -> Optional[Dict[str, Any]]:
+        if not use_cache:
+            self._user_cache.invalidate(user_uuid)
+        return await self._user_cache.get_or_load(
+            user_uuid,
+            lambda: self._fetch_user_by_uuid(user_uuid, log_response),
+        )
+
+    async def _fetch_user_by_uuid(
+            self,
+            user_uuid: str,
+            log_response: bool) -> Optional[Dict[str, Any]]:
         endpoint = f"/users/{user_uuid}"
         full_response = await self._request("GET",
                                             endpoint,
@@ -420,6 +655,7 @@ class PanelApiService:
                                             "/users",
                                             json=update_payload,
                                             log_full_response=log_response)
+        self.invalidate_user_cache(user_uuid)
         if full_response and not full_response.get(
                 "error") and "response" in full_response:
             logging.info(f"User {user_uuid} details updated on panel.")
@@ -439,6 +675,7 @@ class PanelApiService:
         response_data = await self._request("POST",
                                             endpoint,
                                             log_full_response=log_response)
+        self.invalidate_user_cache(user_uuid)
 
         if response_data and not response_data.get(
                 "error") and "response" in response_data:
@@ -468,6 +705,7 @@ class PanelApiService:
         response_data = await self._request(
             "DELETE", endpoint, log_full_response=log_response
         )
+        self.invalidate_user_cache(user_uuid)
 
         if not response_data:
             logging.error(
@@ -504,7 +742,17 @@ class PanelApiService:
             return f"{base_sub_url}/{client_type.lower()}"
         return base_sub_url
 
-    async def get_user_devices(self, user_uuid: str) -> Optional[List[Dict[str, Any]]]:
+    async def get_user_devices(
+            self,
+            user_uuid: str,
+            use_cache: bool = True) -> Optional[List[Dict[str, Any]]]:
+        if not use_cache:
+            self._devices_cache.invalidate(user_uuid)
+        return await self._devices_cache.get_or_load(
+            user_uuid, lambda: self._fetch_user_devices(user_uuid)
+        )
+
+    async def _fetch_user_devices(self, user_uuid: str) -> Optional[List[Dict[str, Any]]]:
         endpoint = f"/hwid/devices/{user_uuid}"
         response_data = await self._request("GET", endpoint, log_full_response=False)
         if response_data and not response_data.get("error") and "response" in response_data:
@@ -521,6 +769,7 @@ class PanelApiService:
             "hwid": hwid
         }
         response_data = await self._request("POST", endpoint, json=payload, log_full_response=False)
+        self.invalidate_user_cache(user_uuid)
         if response_data and not response_data.get("error") and "response" in response_data:
             return True
         logging.error(
@@ -566,8 +815,15 @@ class PanelApiService:
     async def encrypt_happ_link(self, link_to_encrypt: str) -> Optional[str]:
         """Encrypt a subscription link using the panel's happ crypt4 API.
 
-        Returns the encrypted link string or None if encryption failed.
+        Results are cached per raw link and concurrent requests for the same link
+        share one panel call. Returns the encrypted link string or None if
+        encryption failed (failures are not cached).
         """
+        return await self._encrypted_links.get_or_load(
+            link_to_encrypt, lambda: self._encrypt_happ_link_uncached(link_to_encrypt)
+        )
+
+    async def _encrypt_happ_link_uncached(self, link_to_encrypt: str) -> Optional[str]:
         payload = {"linkToEncrypt": link_to_encrypt}
         response_data = await self._request(
             "POST",
@@ -0,0 +1,617 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from contextlib import aclosing
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.settings import Settings
+from bot.middlewares.i18n import JsonI18n
+from bot.services.panel_api_service import PanelApiService, PanelUsersFetchError
+from db.dal import user_dal, subscription_dal, panel_sync_dal
+from db.models import User, Subscription
+
+# Panel users are streamed page by page and reconciled in chunks of this size.
+SYNC_CHUNK_SIZE = 1000
+
+# Panel user fields that affect local state; a change in any of them makes an
+# incremental sync re-apply the user. Bump the version when the list changes.
+CONTENT_HASH_VERSION = 1
+CONTENT_HASH_FIELDS = (
+    "uuid",
+    "telegramId",
+    "expireAt",
+    "status",
+    "subscriptionUuid",
+    "shortUuid",
+    "description",
+    "trafficLimitBytes",
+    "trafficLimitStrategy",
+)
+
+
+def panel_user_content_hash(panel_user_dict: Dict[str, Any]) -> str:
+    payload = [CONTENT_HASH_VERSION] + [
+        panel_user_dict.get(field) for field in CONTENT_HASH_FIELDS
+    ]
+    encoded = json.dumps(payload, default=str, separators=(",", ":")).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+class PanelSyncEngine:
+    """
+    Reconciles the local users/subscriptions tables with the panel in bulk.
+
+    Panel users are streamed from the API (several pages in flight) and every chunk
+    of SYNC_CHUNK_SIZE users goes through:
+      1. fetch    – wait for the next pages of panel users;
+      2. prefetch – load matching local users and subscriptions with a few
+                    chunked queries and index them in dicts;
+      3. diff     – compare in memory and collect row-level changes;
+      4. write    – apply changes with chunked bulk INSERT/UPSERT/UPDATE.
+    Afterwards description fixes collected for all chunks are pushed to the panel
+    with bounded concurrency (phase "panel").
+
+    In incremental mode every panel user is hashed over CONTENT_HASH_FIELDS and
+    only users whose hash differs from the one stored by the previous run (table
+    panel_user_sync_state) are reconciled. A full reconcile runs when requested,
+    when there is no previous full sync, or when the last one is older than
+    PANEL_FULL_SYNC_INTERVAL_HOURS; it also drops hashes of users gone from the panel.
+
+    Per-phase timings are appended to PanelSyncStatus.details.
+    """
+
+    def __init__(
+        self,
+        panel_service: PanelApiService,
+        session: AsyncSession,
+        settings: Settings,
+        i18n_instance: JsonI18n,
+        full_sync: Optional[bool] = None,
+    ):
+        self.panel_service = panel_service
+        self.session = session
+        self.settings = settings
+        self.i18n = i18n_instance
+        self.full_sync = full_sync
+        self.started_at = datetime.now(timezone.utc)
+
+        self.panel_records_checked = 0
+        self.users_found_in_db = 0
+        self.users_updated = 0
+        self.subscriptions_synced_count = 0
+        self.users_without_telegram_id = 0
+        self.users_not_found_in_db = 0
+        self.users_created = 0
+        self.users_uuid_updated = 0
+        self.subscriptions_created = 0
+        self.subscriptions_updated = 0
+        self.descriptions_updated = 0
+        self.users_unchanged = 0
+        self.sync_errors: List[str] = []
+        self.phase_timings: Dict[str, float] = {}
+
+        self._users_by_id: Dict[int, User] = {}
+        self._users_by_panel_uuid: Dict[str, User] = {}
+        self._subs_by_sub_uuid: Dict[str, Subscription] = {}
+        self._subs_by_panel_uuid: Dict[str, List[Subscription]] = {}
+
+        self._new_users: Dict[int, Dict[str, Any]] = {}
+        self._user_updates: Dict[int, Dict[str, Any]] = {}
+        self._sub_updates: Dict[int, Dict[str, Any]] = {}
+        self._sub_inserts: Dict[str, Dict[str, Any]] = {}
+        self._failed_panel_uuids: set = set()
+        self._description_updates: List[Tuple[str, str, int]] = []
+
+    async def _timed(self, phase: str, coro):
+        started = time.monotonic()
+        try:
+            return await coro
+        finally:
+            self.phase_timings[phase] = (
+                self.phase_timings.get(phase, 0.0) + time.monotonic() - started)
+
+    async def _iter_chunks(self) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Regroup streamed panel pages into chunks of SYNC_CHUNK_SIZE users."""
+        batches = self.panel_service.iter_panel_users_batches(
+            concurrency=self.settings.PANEL_SYNC_CONCURRENCY)
+        buffer: List[Dict[str, Any]] = []
+        try:
+            while True:
+                try:
+                    users_batch = await self._timed("fetch", anext(batches))
+                except StopAsyncIteration:
+                    break
+                buffer.extend(users_batch)
+                if len(buffer) >= SYNC_CHUNK_SIZE:
+                    yield buffer
+                    buffer = []
+            if buffer:
+                yield buffer
+        finally:
+            await batches.aclose()
+
+    def _reset_chunk_state(self) -> None:
+        self._users_by_id = {}
+        self._users_by_panel_uuid = {}
+        self._subs_by_sub_uuid = {}
+        self._subs_by_panel_uuid = {}
+        self._new_users = {}
+        self._user_updates = {}
+        self._sub_updates = {}
+        self._sub_inserts = {}
+        self._failed_panel_uuids = set()
+
+    async def _resolve_full_sync(self) -> bool:
+        if self.full_sync is not None:
+            return self.full_sync
+        if not self.settings.PANEL_SYNC_INCREMENTAL:
+            return True
+        status_record = await panel_sync_dal.get_panel_sync_status(self.session)
+        if not status_record or not status_record.last_full_sync_time:
+            return True
+        full_sync_interval = timedelta(
+            hours=max(self.settings.PANEL_FULL_SYNC_INTERVAL_HOURS, 0))
+        return status_record.last_full_sync_time + full_sync_interval <= self.started_at
+
+    async def _process_chunk(self, panel_users_data: List[Dict[str, Any]]) -> None:
+        self._reset_chunk_state()
+        content_hashes = {
+            panel_user_dict["uuid"]: panel_user_content_hash(panel_user_dict)
+            for panel_user_dict in panel_users_data
+            if panel_user_dict.get("uuid")
+        }
+        if not self.full_sync:
+            stored_hashes = await self._timed(
+                "prefetch",
+                panel_sync_dal.get_user_content_hashes(
+                    self.session, list(content_hashes)))
+            changed = [
+                panel_user_dict for panel_user_dict in panel_users_data
+                if not panel_user_dict.get("uuid")
+                or stored_hashes.get(panel_user_dict["uuid"]) != content_hashes[panel_user_dict["uuid"]]
+            ]
+            unchanged_count = len(panel_users_data) - len(changed)
+            self.users_unchanged += unchanged_count
+            self.panel_records_checked += unchanged_count
+            for panel_uuid, content_hash in list(content_hashes.items()):
+                if stored_hashes.get(panel_uuid) == content_hash:
+                    del content_hashes[panel_uuid]
+            panel_users_data = changed
+
+        if panel_users_data:
+            await self._timed("prefetch", self._prefetch(panel_users_data))
+            await self._timed("diff", self._diff(panel_users_data))
+            await self._timed("write", self._write())
+
+        for panel_uuid in self._failed_panel_uuids:
+            content_hashes.pop(panel_uuid, None)
+        await self._timed(
+            "write",
+            panel_sync_dal.upsert_user_content_hashes(
+                self.session, content_hashes, self.started_at))
+
+    async def run(self) -> dict:
+        session = self.session
+        try:
+            self.full_sync = await self._resolve_full_sync()
+            logging.info(
+                f"Starting panel sync ({'full' if self.full_sync else 'incremental'}).")
+            try:
+                async with aclosing(self._iter_chunks()) as chunks:
+                    async for panel_users_chunk in chunks:
+                        await self._process_chunk(panel_users_chunk)
+            except PanelUsersFetchError:
+                await session.rollback()
+                error_msg = "Failed to fetch users from panel or panel API issue."
+                self.sync_errors.append(error_msg)
+                await panel_sync_dal.update_panel_sync_status(session, "failed", error_msg)
+                await session.commit()
+                return {"status": "failed", "details": error_msg, "errors": self.sync_errors}
+
+            if self.panel_records_checked == 0:
+                status_msg = "No users found in the panel to sync."
+                await panel_sync_dal.update_panel_sync_status(
+                    session, "success", status_msg, 0, 0
+                )
+                await session.commit()
+                return {
+                    "status": "success",
+                    "details": status_msg,
+                    "users_synced": 0,
+                    "subs_synced": 0,
+                }
+
+            await self._timed("panel", self._push_descriptions())
+
+            return await self._finish()
+
+        except Exception as e_sync_global:
+            await session.rollback()
+            logging.error(f"Global error during sync: {e_sync_global}", exc_info=True)
+            error_detail = f"Unexpected error during sync: {str(e_sync_global)}"
+
+            await panel_sync_dal.update_panel_sync_status(
+                session,
+                "failed",
+                error_detail,
+                self.panel_records_checked,
+                self.subscriptions_synced_count,
+            )
+
+            return {
+                "status": "failed",
+                "details": error_detail,
+                "errors": [str(e_sync_global)],
+            }
+
+    @staticmethod
+    def _subscription_uuid(panel_user_dict: Dict[str, Any]) -> Optional[str]:
+        return panel_user_dict.get("subscriptionUuid") or panel_user_dict.get("shortUuid")
+
+    def _index_subscription(self, sub: Subscription) -> None:
+        if sub.panel_subscription_uuid:
+            self._subs_by_sub_uuid[sub.panel_subscription_uuid] = sub
+        if sub.panel_user_uuid:
+            self._subs_by_panel_uuid.setdefault(sub.panel_user_uuid, []).append(sub)
+
+    async def _prefetch(self, panel_users_data: List[Dict[str, Any]]) -> None:
+        telegram_ids = {u.get("telegramId") for u in panel_users_data if u.get("telegramId")}
+        panel_uuids = {u.get("uuid") for u in panel_users_data if u.get("uuid")}
+        sub_uuids = {
+            sub_uuid
+            for sub_uuid in (self._subscription_uuid(u) for u in panel_users_data)
+            if sub_uuid
+        }
+
+        users = await user_dal.get_users_for_sync(
+            self.session, list(telegram_ids), list(panel_uuids))
+        for user in users:
+            self._users_by_id[user.user_id] = user
+            if user.panel_user_uuid:
+                self._users_by_panel_uuid[user.panel_user_uuid] = user
+
+        subs = await subscription_dal.get_subscriptions_for_sync(
+            self.session, list(panel_uuids), list(sub_uuids))
+        for sub in subs:
+            self._index_subscription(sub)
+
+        logging.info(
+            f"Sync prefetch: {len(users)} local users, {len(subs)} subscriptions indexed."
+        )
+
+    def _queue_user_update(self, user_id: int, values: Dict[str, Any]) -> None:
+        self._user_updates.setdefault(user_id, {"user_id": user_id}).update(values)
+
+    def _queue_sub_update(self, sub: Subscription, values: Dict[str, Any]) -> bool:
+        """Record only the columns that actually differ; returns True if anything changed."""
+        pending = self._sub_updates.get(sub.subscription_id, {})
+        changed = {
+            key: value
+            for key, value in values.items()
+            if pending.get(key, getattr(sub, key)) != value
+        }
+        if not changed:
+            return False
+        self._sub_updates.setdefault(
+            sub.subscription_id, {"subscription_id": sub.subscription_id}
+        ).update(changed)
+        return True
+
+    async def _diff(self, panel_users_data: List[Dict[str, Any]]) -> None:
+        now = datetime.now(timezone.utc)
+        for panel_user_dict in panel_users_data:
+            try:
+                self._diff_one(panel_user_dict, now)
+            except Exception as e_user:
+                self._failed_panel_uuids.add(panel_user_dict.get("uuid"))
+                self.sync_errors.append(
+                    f"Error processing panel user {panel_user_dict.get('uuid', 'unknown')}: {str(e_user)}"
+                )
+                logging.error(f"Error syncing user: {e_user}")
+            # Keep the event loop responsive on very large panels.
+            if self.panel_records_checked % 5000 == 0:
+                await asyncio.sleep(0)
+
+    def _diff_one(self, panel_user_dict: Dict[str, Any], now: datetime) -> None:
+        self.panel_records_checked += 1
+        panel_uuid = panel_user_dict.get("uuid")
+        telegram_id_from_panel = panel_user_dict.get("telegramId")
+
+        if not panel_uuid:
+            self.sync_errors.append(f"Panel user missing UUID: {panel_user_dict}")
+            logging.warning(f"Skipping panel user without UUID: {panel_user_dict}")
+            return
+
+        if not telegram_id_from_panel:
+            self.users_without_telegram_id += 1
+
+        existing_user: Optional[User] = None
+        if telegram_id_from_panel:
+            existing_user = self._users_by_id.get(telegram_id_from_panel)
+        if not existing_user:
+            existing_user = self._users_by_panel_uuid.get(panel_uuid)
+            if existing_user and telegram_id_from_panel and existing_user.user_id != telegram_id_from_panel:
+                logging.warning(
+                    f"TelegramId mismatch: panel={telegram_id_from_panel}, local={existing_user.user_id}"
+                )
+
+        is_new_user = False
+        if existing_user:
+            actual_user_id = existing_user.user_id
+        else:
+            self.users_not_found_in_db += 1
+            if not telegram_id_from_panel:
+                logging.debug(
+                    f"Panel user with UUID {panel_uuid} (no telegramId) not found in local DB - skipping"
+                )
+                return
+            actual_user_id = telegram_id_from_panel
+            is_new_user = True
+            self._new_users[actual_user_id] = {
+                "user_id": actual_user_id,
+                "username": None,
+                "first_name": None,
+                "last_name": None,
+                "language_code": "ru",
+                "panel_user_uuid": panel_uuid,
+                "is_banned": False,
+                "referred_by_id": None,
+            }
+
+        self.users_found_in_db += 1
+        user_was_updated = False
+
+        if existing_user and existing_user.panel_user_uuid != panel_uuid:
+            self._queue_user_update(actual_user_id, {"panel_user_uuid": panel_uuid})
+            user_was_updated = True
+            self.users_uuid_updated += 1
+
+        if existing_user:
+            description_text = "\n".join(
+                [
+                    existing_user.username or "",
+                    existing_user.first_name or "",
+                    existing_user.last_name or "",
+                ]
+            )
+            current_panel_description = (panel_user_dict.get("description") or "").strip()
+            desired_description = description_text.strip()
+            if desired_description and desired_description != current_panel_description:
+                self._description_updates.append((panel_uuid, description_text, actual_user_id))
+
+        panel_expire_at_iso = panel_user_dict.get("expireAt")
+        panel_status = panel_user_dict.get("status", "UNKNOWN")
+        if not panel_expire_at_iso:
+            if user_was_updated:
+                self.users_updated += 1
+            return
+
+        try:
+            panel_expire_at = datetime.fromisoformat(panel_expire_at_iso.replace("Z", "+00:00"))
+            is_active = panel_status == "ACTIVE"
+            subscription_uuid_from_panel = self._subscription_uuid(panel_user_dict)
+
+            if subscription_uuid_from_panel:
+                if is_active:
+                    for other_sub in self._subs_by_panel_uuid.get(panel_uuid, []):
+                        if other_sub.is_active and other_sub.panel_subscription_uuid != subscription_uuid_from_panel:
+                            self._queue_sub_update(
+                                other_sub, {"is_active": False, "status_from_panel": "INACTIVE"})
+
+                existing_sub_by_uuid = self._subs_by_sub_uuid.get(subscription_uuid_from_panel)
+                if existing_sub_by_uuid and not is_new_user:
+                    self._queue_sub_update(
+                        existing_sub_by_uuid,
+                        {
+                            "user_id": actual_user_id,
+                            "panel_user_uuid": panel_uuid,
+                            "end_date": panel_expire_at,
+                            "is_active": is_active,
+                            "status_from_panel": panel_status,
+                        },
+                    )
+                    self.subscriptions_synced_count += 1
+                    self.subscriptions_updated += 1
+                    user_was_updated = True
+                else:
+                    self._sub_inserts[subscription_uuid_from_panel] = {
+                        "user_id": actual_user_id,
+                        "panel_user_uuid": panel_uuid,
+                        "panel_subscription_uuid": subscription_uuid_from_panel,
+                        "start_date": None,
+                        "end_date": panel_expire_at,
+                        "duration_months": None,
+                        "is_active": is_active,
+                        "status_from_panel": panel_status,
+                        "traffic_limit_bytes": self.settings.user_traffic_limit_bytes,
+                        "auto_renew_enabled": False,
+                    }
+                    self.subscriptions_synced_count += 1
+                    self.subscriptions_created += 1
+                    user_was_updated = True
+            else:
+                candidates = [
+                    sub for sub in self._subs_by_panel_uuid.get(panel_uuid, [])
+                    if sub.user_id == actual_user_id and sub.is_active
+                    and sub.end_date and sub.end_date > now
+                ]
+                active_sub = max(candidates, key=lambda s: s.end_date) if candidates else None
+                if active_sub:
+                    self._queue_sub_update(
+                        active_sub,
+                        {
+                            "end_date": panel_expire_at,
+                            "is_active": is_active,
+                            "status_from_panel": panel_status,
+                        },
+                    )
+                    self.subscriptions_synced_count += 1
+                    self.subscriptions_updated += 1
+                    user_was_updated = True
+                else:
+                    logging.debug(
+                        f"No subscriptionUuid for panel user {panel_uuid}; skipped creation for user {actual_user_id}"
+                    )
+        except Exception as e:
+            self._failed_panel_uuids.add(panel_uuid)
+            self.sync_errors.append(
+                f"Error syncing subscription for user {actual_user_id}: {str(e)}"
+            )
+            logging.error(f"Error syncing subscription for user {actual_user_id}: {e}")
+
+        if user_was_updated:
+            self.users_updated += 1
+
+    async def _write(self) -> None:
+        session = self.session
+
+        if self._new_users:
+            inserted_ids = set(
+                await user_dal.bulk_insert_users_ignore_conflicts(
+                    session, list(self._new_users.values()))
+            )
+            self.users_created += len(inserted_ids)
+            skipped = set(self._new_users) - inserted_ids
+            if skipped:
+                # Rows skipped by ON CONFLICT: only keep subscriptions of users that exist.
+                existing = await user_dal.get_users_for_sync(session, list(skipped), [])
+                missing = skipped - {u.user_id for u in existing}
+                if missing:
+                    self._failed_panel_uuids.update(
+                        self._new_users[user_id]["panel_user_uuid"] for user_id in missing)
+                    self.sync_errors.append(
+                        f"Error creating users {sorted(missing)[:20]}: insert conflict"
+                    )
+                    self._sub_inserts = {
+                        key: row for key, row in self._sub_inserts.items()
+                        if row["user_id"] not in missing
+                    }
+            logging.info(f"Sync write: created {len(inserted_ids)} users.")
+
+        await user_dal.bulk_update_users(session, list(self._user_updates.values()))
+        await subscription_dal.bulk_update_subscriptions(session, list(self._sub_updates.values()))
+        await subscription_dal.bulk_upsert_subscriptions_by_panel_uuid(
+            session, list(self._sub_inserts.values()))
+        logging.info(
+            f"Sync write: {len(self._user_updates)} user updates, "
+            f"{len(self._sub_updates)} subscription updates, "
+            f"{len(self._sub_inserts)} subscription upserts."
+        )
+
+    async def _push_descriptions(self) -> None:
+        if not self._description_updates:
+            return
+        semaphore = asyncio.Semaphore(max(self.settings.PANEL_SYNC_CONCURRENCY, 1))
+        failed_uuids: List[str] = []
+
+        async def worker(panel_uuid: str, description_text: str, user_id: int) -> None:
+            async with semaphore:
+                try:
+                    result = await self.panel_service.update_user_details_on_panel(
+                        panel_uuid, {"description": description_text}, log_response=False
+                    )
+                    if result is not None:
+                        self.descriptions_updated += 1
+                    else:
+                        failed_uuids.append(panel_uuid)
+                except Exception as e_desc:
+                    failed_uuids.append(panel_uuid)
+                    logging.warning(
+                        f"Sync: Failed to update description for panel user {panel_uuid} (tg {user_id}): {e_desc}"
+                    )
+
+        await asyncio.gather(*(worker(*item) for item in self._description_updates))
+        # The content hashes were stored per chunk before the pushes; drop them for
+        # failed users so the next incremental run retries the description.
+        if failed_uuids:
+            await panel_sync_dal.delete_user_content_hashes(self.session, failed_uuids)
+            logging.warning(
+                f"Sync: {len(failed_uuids)} panel descriptions not updated; they will be retried on the next sync."
+            )
+
+    def _format_timings(self) -> str:
+        return " | ".join(
+            f"{phase} {seconds:.2f}s" for phase, seconds in self.phase_timings.items()
+        )
+
+    def _format_mode(self) -> str:
+        if self.full_sync:
+            return "full"
+        return f"incremental, {self.users_unchanged} unchanged skipped"
+
+    async def _finish(self) -> dict:
+        status = "completed_with_errors" if self.sync_errors else "completed"
+        default_lang = self.settings.DEFAULT_LANGUAGE
+        additional_stats = ""
+        if self.users_without_telegram_id > 0:
+            additional_stats += self.i18n.gettext(
+                default_lang, "admin_sync_no_telegram_id", count=self.users_without_telegram_id)
+        if self.users_not_found_in_db > 0:
+            additional_stats += self.i18n.gettext(
+                default_lang, "admin_sync_not_found_in_db", count=self.users_not_found_in_db)
+        if self.sync_errors:
+            additional_stats += self.i18n.gettext(
+                default_lang, "admin_sync_errors", count=len(self.sync_errors))
+
+        details = self.i18n.gettext(
+            default_lang,
+            "admin_sync_details",
+            panel_records_checked=self.panel_records_checked,
+            users_found_in_db=self.users_found_in_db,
+            users_created=self.users_created,
+            users_updated=self.users_updated,
+            subscriptions_synced_count=self.subscriptions_synced_count,
+            subscriptions_created=self.subscriptions_created,
+            subscriptions_updated=self.subscriptions_updated,
+            additional_stats=additional_stats,
+        )
+        details += f"\n⏱ {self._format_mode()} | {self._format_timings()}"
+
+        last_full_sync_time = None
+        if self.full_sync:
+            last_full_sync_time = self.started_at
+            stale_count = await panel_sync_dal.delete_stale_user_content_hashes(
+                self.session, self.started_at)
+            if stale_count:
+                logging.info(f"Sync: forgot {stale_count} panel users no longer present.")
+
+        await panel_sync_dal.update_panel_sync_status(
+            self.session,
+            status,
+            details,
+            self.panel_records_checked,
+            self.subscriptions_synced_count,
+            last_full_sync_time=last_full_sync_time,
+        )
+        await self.session.commit()
+
+        logging.info(f"Sync completed - Summary:")
+        logging.info(f"  Mode: {self._format_mode()}")
+        logging.info(f"  Panel records checked: {self.panel_records_checked}")
+        logging.info(f"  Users without telegramId: {self.users_without_telegram_id}")
+        logging.info(f"  Users not found in local DB: {self.users_not_found_in_db}")
+        logging.info(f"  Users found in local DB: {self.users_found_in_db}")
+        logging.info(f"  Users created: {self.users_created}")
+        logging.info(f"  Users with UUID updated: {self.users_uuid_updated}")
+        logging.info(f"  Users updated overall: {self.users_updated}")
+        logging.info(f"  Subscriptions total synced: {self.subscriptions_synced_count}")
+        logging.info(f"  Subscriptions created: {self.subscriptions_created}")
+        logging.info(f"  Subscriptions updated: {self.subscriptions_updated}")
+        logging.info(f"  Panel descriptions updated: {self.descriptions_updated}")
+        logging.info(f"  Phase timings: {self._format_timings()}")
+        logging.info(f"  Sync errors: {len(self.sync_errors)}")
+
+        return {
+            "status": status,
+            "details": details,
+            "users_processed": self.panel_records_checked,
+            "users_synced": self.users_found_in_db,
+            "users_created": self.users_created,
+            "subs_synced": self.subscriptions_synced_count,
+            "errors": self.sync_errors,
+        }
@@ -1,4 +1,3 @@
-import json
 import logging
 import hmac
 import hashlib
@@ -12,6 +11,7 @@ from .panel_api_service import PanelApiService
 from bot.middlewares.i18n import JsonI18n
 from bot.keyboards.inline.user_keyboards import get_subscribe_only_markup, get_autorenew_cancel_keyboard
 from db.dal import user_dal
+from bot.utils import json_codec
 
 EVENT_MAP = {
     "user.expires_in_72_hours": (3, "subscription_72h_notification"),
@@ -148,7 +148,7 @@ class PanelWebhookService:
                 return web.Response(status=403, text="invalid_signature")
 
         try:
-            payload = json.loads(raw_body.decode())
+            payload = json_codec.loads(raw_body)
         except Exception:
             return web.Response(status=400, text="bad_request")
 
@@ -158,6 +158,8 @@ class PanelWebhookService:
             user_data = user_data.get("user") or user_data
 
         telegram_id = user_data.get("telegramId") if isinstance(user_data, dict) else None
+        if isinstance(user_data, dict):
+            self.panel_service.invalidate_user_cache(user_data.get("uuid"))
 
         if not event_name:
             return web.Response(status=200, text="ok_no_event")
@@ -0,0 +1,275 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from aiohttp import web
+from sqlalchemy.orm import sessionmaker
+
+from bot.utils import json_codec
+from db.dal import payment_webhook_inbox_dal
+
+WebhookProcessor = Callable[[Dict[str, Any]], Awaitable[web.Response]]
+
+
+class PaymentWebhookInbox:
+    """
+    Acknowledge-then-process pipeline for payment provider webhooks.
+
+    Webhook routes verify the request, store the normalized event in the
+    ``payment_webhook_inbox`` table (unique per provider and event key, so repeated
+    deliveries are stored once) and answer the provider right away. A pool of
+    workers claims due events with SELECT ... FOR UPDATE SKIP LOCKED and hands
+    them to the provider's processor, which returns the HTTP response it would
+    have sent inline: 2xx marks the event done, 4xx rejects it, 5xx or an
+    exception schedules a retry with exponential backoff until ``max_attempts``.
+
+    Handled events stay in the table for ``retention_days``; failed and rejected
+    ones can be replayed by an admin with ``/webhooks`` (see ``replay``).
+    """
+
+    def __init__(
+        self,
+        async_session_factory: sessionmaker,
+        workers: int = 4,
+        max_attempts: int = 8,
+        poll_interval: float = 2.0,
+        lease_seconds: int = 300,
+        retention_days: int = 30,
+        retry_base_delay: float = 5.0,
+        retry_max_delay: float = 600.0,
+    ):
+        self.async_session_factory = async_session_factory
+        self.workers = max(workers, 1)
+        self.max_attempts = max(max_attempts, 1)
+        self.poll_interval = max(poll_interval, 0.05)
+        self.lease_seconds = max(lease_seconds, 1)
+        self.retention_days = retention_days
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+
+        self._processors: Dict[str, WebhookProcessor] = {}
+        self._worker_tasks: Set[asyncio.Task] = set()
+        self._wakeup = asyncio.Event()
+        self._claimed_ids: Set[int] = set()
+
+        self.total_accepted = 0
+        self.total_duplicates = 0
+        self.total_done = 0
+        self.total_retried = 0
+        self.total_failed = 0
+
+    def register_processor(self, provider: str, processor: WebhookProcessor) -> None:
+        self._processors[provider] = processor
+        self._wakeup.set()
+
+    async def start(self) -> None:
+        if self.retention_days > 0:
+            try:
+                async with self.async_session_factory() as session:
+                    removed = await payment_webhook_inbox_dal.delete_processed_webhook_events(
+                        session,
+                        datetime.now(timezone.utc) - timedelta(days=self.retention_days),
+                    )
+                    counts = await payment_webhook_inbox_dal.count_webhook_events_by_status(session)
+                    await session.commit()
+                logging.info(
+                    f"PaymentWebhookInbox: {counts.get(payment_webhook_inbox_dal.STATUS_PENDING, 0)} events to process, "
+                    f"{removed} old events removed."
+                )
+            except Exception as e:
+                logging.error(f"PaymentWebhookInbox: startup cleanup failed: {e}", exc_info=True)
+        for index in range(self.workers - len(self._worker_tasks)):
+            task = asyncio.create_task(
+                self._worker_loop(), name=f"PaymentWebhookInboxWorker-{index}")
+            self._worker_tasks.add(task)
+            task.add_done_callback(self._worker_tasks.discard)
+
+    async def accept(self, provider: str, event_key: str, event: Dict[str, Any]) -> bool:
+        """Persist an event; returns False for a duplicate delivery."""
+        payload = json_codec.dumps(event)
+        async with self.async_session_factory() as session:
+            event_id = await payment_webhook_inbox_dal.insert_webhook_event(
+                session, provider, event_key, payload)
+            await session.commit()
+        if event_id is None:
+            self.total_duplicates += 1
+            logging.info(f"PaymentWebhookInbox: duplicate {provider} event '{event_key}' ignored.")
+            return False
+        self.total_accepted += 1
+        self._wakeup.set()
+        return True
+
+    async def replay(self, event_id: int) -> bool:
+        """Process a stored event again, e.g. after fixing the cause of a failure."""
+        async with self.async_session_factory() as session:
+            requeued = await payment_webhook_inbox_dal.requeue_webhook_event(session, event_id)
+            await session.commit()
+        if requeued:
+            self._wakeup.set()
+        return requeued
+
+    async def _worker_loop(self) -> None:
+        while True:
+            try:
+                processed = await self._process_next()
+                if not processed:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"PaymentWebhookInbox: worker iteration failed: {e}", exc_info=True)
+                await asyncio.sleep(self.poll_interval)
+
+    async def _process_next(self) -> bool:
+        async with self.async_session_factory() as session:
+            events = await payment_webhook_inbox_dal.claim_webhook_events(
+                session, list(self._processors), 1, self.lease_seconds)
+            await session.commit()
+        if not events:
+            return False
+        event = events[0]
+        self._claimed_ids.add(event.event_id)
+        # The claim incremented the counter in the database only.
+        attempt = event.attempts + 1
+        heartbeat = asyncio.create_task(
+            self._renew_lease(event.event_id, attempt),
+            name=f"PaymentWebhookInboxLease-{event.event_id}")
+        try:
+            status, error = await self._run_processor(event.provider, event.payload)
+            await self._record_outcome(event.event_id, event.provider, event.event_key,
+                                       attempt, status, error)
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+            self._claimed_ids.discard(event.event_id)
+        return True
+
+    async def _renew_lease(self, event_id: int, attempt: int) -> None:
+        """Keep a slow processor's claim from going stale and being taken by another worker."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                async with self.async_session_factory() as session:
+                    renewed = await payment_webhook_inbox_dal.renew_webhook_event_lease(
+                        session, event_id, attempt)
+                    await session.commit()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"PaymentWebhookInbox: lease renewal for event {event_id} failed: {e}")
+                continue
+            if not renewed:
+                logging.warning(
+                    f"PaymentWebhookInbox: lease on event {event_id} (attempt {attempt}) was lost; "
+                    f"its outcome will not be recorded by this worker."
+                )
+                return
+
+    async def _run_processor(self, provider: str, payload: str):
+        try:
+            response = await self._processors[provider](json_codec.loads(payload))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"PaymentWebhookInbox: {provider} processor raised: {e}", exc_info=True)
+            return 500, f"{type(e).__name__}: {e}"
+        text = response.text if isinstance(response, web.Response) else None
+        return response.status, None if response.status < 300 else (text or f"HTTP {response.status}")
+
+    async def _record_outcome(self, event_id: int, provider: str, event_key: str,
+                              attempt: int, status: int, error: Optional[str]) -> None:
+        """Store the result of ``attempt``, unless another claim has taken the event since."""
+        async with self.async_session_factory() as session:
+            if status < 400:
+                recorded = await payment_webhook_inbox_dal.finish_webhook_event(
+                    session, event_id, payment_webhook_inbox_dal.STATUS_DONE, attempt=attempt)
+            elif status < 500:
+                recorded = await payment_webhook_inbox_dal.finish_webhook_event(
+                    session, event_id, payment_webhook_inbox_dal.STATUS_REJECTED, error,
+                    attempt=attempt)
+            elif attempt >= self.max_attempts:
+                recorded = await payment_webhook_inbox_dal.finish_webhook_event(
+                    session, event_id, payment_webhook_inbox_dal.STATUS_FAILED, error,
+                    attempt=attempt)
+            else:
+                delay = min(self.retry_base_delay * 2 ** (attempt - 1), self.retry_max_delay)
+                recorded = await payment_webhook_inbox_dal.schedule_webhook_event_retry(
+                    session, event_id, datetime.now(timezone.utc) + timedelta(seconds=delay),
+                    error or "", attempt=attempt)
+            await session.commit()
+
+        if not recorded:
+            logging.warning(
+                f"PaymentWebhookInbox: {provider} event '{event_key}' (id {event_id}) was claimed again "
+                f"while attempt {attempt} ran; its outcome ({status}) is discarded."
+            )
+        elif status < 400:
+            self.total_done += 1
+        elif status < 500:
+            logging.warning(
+                f"PaymentWebhookInbox: {provider} event '{event_key}' rejected ({status}: {error})."
+            )
+            self.total_done += 1
+        elif attempt >= self.max_attempts:
+            logging.error(
+                f"PaymentWebhookInbox: {provider} event '{event_key}' (id {event_id}) failed after "
+                f"{attempt} attempts: {error}. Replay it with /webhooks once the cause is fixed."
+            )
+            self.total_failed += 1
+        else:
+            logging.warning(
+                f"PaymentWebhookInbox: {provider} event '{event_key}' attempt {attempt} failed ({error}); "
+                f"retrying in {delay:.0f}s."
+            )
+            self.total_retried += 1
+
+    async def close(self) -> None:
+        """Stop the workers; events interrupted mid-processing are released for the next start."""
+        for task in list(self._worker_tasks):
+            task.cancel()
+        if self._worker_tasks:
+            await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        if self._claimed_ids:
+            try:
+                async with self.async_session_factory() as session:
+                    await payment_webhook_inbox_dal.release_webhook_events(
+                        session, list(self._claimed_ids))
+                    await session.commit()
+                self._claimed_ids.clear()
+            except Exception as e:
+                logging.error(f"PaymentWebhookInbox: failed to release events on shutdown: {e}", exc_info=True)
+        logging.info(f"PaymentWebhookInbox closed. Stats: {self.get_stats()}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "accepted": self.total_accepted,
+            "duplicates": self.total_duplicates,
+            "done": self.total_done,
+            "retried": self.total_retried,
+            "failed": self.total_failed,
+        }
+
+
+async def accept_or_process(
+    request: web.Request,
+    provider: str,
+    event_key: str,
+    event: Dict[str, Any],
+    processor: WebhookProcessor,
+    ack: Callable[[], web.Response],
+) -> web.Response:
+    """Hand a verified webhook event to the inbox, or process it inline without one."""
+    inbox: Optional[PaymentWebhookInbox] = request.app.get("payment_webhook_inbox")
+    if inbox is None:
+        return await processor(event)
+    try:
+        await inbox.accept(provider, event_key, event)
+    except Exception as e:
+        logging.error(f"{provider} webhook: failed to store event '{event_key}': {e}", exc_info=True)
+        return web.Response(status=500, text="inbox_error")
+    return ack()
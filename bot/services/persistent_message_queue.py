@@ -0,0 +1,282 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import aiogram.types as tg_types
+from aiogram.types import InputFile, TelegramObject
+from sqlalchemy.orm import sessionmaker
+
+from bot.utils import json_codec
+from bot.utils.message_queue import MessageQueueManager, QueuedMessage
+from db.dal import outbound_message_dal
+
+_MODEL_MARKER = "__tg__"
+
+
+def encode_kwargs(kwargs: Dict[str, Any]) -> str:
+    """Serialize Bot method kwargs; raises TypeError for values that cannot be stored."""
+    return json_codec.dumps(_encode_value(kwargs))
+
+
+def decode_kwargs(payload: str) -> Dict[str, Any]:
+    return _decode_value(json_codec.loads(payload))
+
+
+def _encode_value(value: Any) -> Any:
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, InputFile):
+        raise TypeError("Uploaded files cannot be persisted")
+    if isinstance(value, TelegramObject):
+        model_name = type(value).__name__
+        if getattr(tg_types, model_name, None) is not type(value):
+            raise TypeError(f"Unsupported Telegram type {model_name}")
+        return {
+            _MODEL_MARKER: model_name,
+            "data": value.model_dump(mode="json", exclude_none=True),
+        }
+    if isinstance(value, (list, tuple)):
+        return [_encode_value(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): _encode_value(item) for key, item in value.items()}
+    raise TypeError(f"Unsupported value type {type(value).__name__}")
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_decode_value(item) for item in value]
+    if isinstance(value, dict):
+        model_name = value.get(_MODEL_MARKER)
+        if model_name:
+            model_cls = getattr(tg_types, model_name)
+            return model_cls.model_validate(value.get("data") or {})
+        return {key: _decode_value(item) for key, item in value.items()}
+    return value
+
+
+class PersistentMessageQueue:
+    """
+    Durable outbound queue stored in the ``outbound_messages`` table.
+
+    Producers insert rows instead of appending to the in-memory deques. A poller
+    claims pending rows with SELECT ... FOR UPDATE SKIP LOCKED (so several bot
+    replicas can share the table), feeds them into the rate-limited in-memory
+    queues and records the outcome (sent/failed) in batches. While rows wait in
+    memory their lease is renewed every third of ``lease_seconds``, so only rows
+    claimed by a process that died are picked up again after the lease; on
+    graceful shutdown unsent rows are released right away, so a restart resumes
+    where the previous run stopped.
+
+    Messages that cannot be serialized (uploaded files, callbacks) bypass the table
+    and go straight to memory.
+    """
+
+    def __init__(
+        self,
+        async_session_factory: sessionmaker,
+        queue_manager: MessageQueueManager,
+        claim_batch_size: int = 200,
+        poll_interval: float = 1.0,
+        lease_seconds: int = 300,
+        retention_days: int = 7,
+    ):
+        self.async_session_factory = async_session_factory
+        self.queue_manager = queue_manager
+        self.claim_batch_size = max(claim_batch_size, 1)
+        self.poll_interval = max(poll_interval, 0.05)
+        self.lease_seconds = max(lease_seconds, 1)
+        self.retention_days = retention_days
+
+        self._poller_task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._claimed_ids: Set[int] = set()
+        self._leases_renewed_at = 0.0
+        self._sent_ids: List[int] = []
+        self._failed: List[Tuple[int, str]] = []
+
+        self.total_enqueued = 0
+        self.total_claimed = 0
+        self.total_sent = 0
+        self.total_failed = 0
+
+    async def start(self) -> None:
+        if self.retention_days > 0:
+            try:
+                async with self.async_session_factory() as session:
+                    removed = await outbound_message_dal.delete_finished_outbound_messages(
+                        session,
+                        datetime.now(timezone.utc) - timedelta(days=self.retention_days),
+                    )
+                    pending = await outbound_message_dal.count_pending_outbound_messages(session)
+                    await session.commit()
+                logging.info(
+                    f"PersistentMessageQueue: {pending} messages to resume, {removed} old rows removed."
+                )
+            except Exception as e:
+                logging.error(f"PersistentMessageQueue: startup cleanup failed: {e}", exc_info=True)
+        self.queue_manager.attach_persistent_queue(self)
+        if self._poller_task is None or self._poller_task.done():
+            self._poller_task = asyncio.create_task(
+                self._poll_loop(), name="PersistentMessageQueuePoller")
+
+    async def enqueue(self, chat_id: int, method_name: str, kwargs: Dict[str, Any]) -> bool:
+        """Store a message; returns False if it has to be sent from memory instead."""
+        return await self.enqueue_many(
+            [QueuedMessage(chat_id=chat_id, method_name=method_name, kwargs=kwargs)]
+        ) == 1
+
+    async def enqueue_many(self, messages: List[QueuedMessage]) -> int:
+        """Store several messages with one INSERT. Returns how many were stored.
+
+        Only an all-or-nothing batch is stored; if any payload cannot be serialized
+        nothing is written and 0 is returned.
+        """
+        try:
+            rows = [
+                {
+                    "chat_id": message.chat_id,
+                    "method_name": message.method_name,
+                    "payload": encode_kwargs(message.kwargs),
+                    "broadcast_id": message.broadcast_id,
+                }
+                for message in messages
+                if message.callback is None
+            ]
+            if len(rows) != len(messages):
+                return 0
+        except (TypeError, ValueError) as e:
+            logging.debug(f"PersistentMessageQueue: payload not persistable ({e}); using memory.")
+            return 0
+        if not rows:
+            return 0
+        async with self.async_session_factory() as session:
+            await outbound_message_dal.enqueue_outbound_messages(session, rows)
+            await session.commit()
+        self.total_enqueued += len(rows)
+        self._wakeup.set()
+        return len(rows)
+
+    def report_result(self, outbox_id: int, sent: bool, error: Optional[str]) -> None:
+        self._claimed_ids.discard(outbox_id)
+        if sent:
+            self._sent_ids.append(outbox_id)
+        else:
+            self._failed.append((outbox_id, error or "unknown error"))
+
+    def _memory_backlog(self) -> int:
+        return len(self.queue_manager.user_queue) + len(self.queue_manager.group_queue)
+
+    async def _poll_loop(self) -> None:
+        while True:
+            try:
+                await self._flush_results()
+                await self._renew_leases()
+                claimed = 0
+                if self._memory_backlog() < self.claim_batch_size:
+                    claimed = await self._claim_and_dispatch()
+                if claimed < self.claim_batch_size:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                else:
+                    await asyncio.sleep(0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"PersistentMessageQueue: poll iteration failed: {e}", exc_info=True)
+                await asyncio.sleep(self.poll_interval)
+
+    async def _claim_and_dispatch(self) -> int:
+        async with self.async_session_factory() as session:
+            rows = await outbound_message_dal.claim_outbound_messages(
+                session, self.claim_batch_size, self.lease_seconds)
+            await session.commit()
+        if not rows:
+            return 0
+        self.total_claimed += len(rows)
+        for row in rows:
+            if row.id in self._claimed_ids:
+                # Our lease lapsed (e.g. renewals failed) and we re-claimed a row
+                # that is still queued in memory: do not send it twice.
+                continue
+            self._claimed_ids.add(row.id)
+            try:
+                kwargs = decode_kwargs(row.payload)
+            except Exception as e:
+                self.report_result(row.id, False, f"payload decode error: {e}")
+                continue
+            await self.queue_manager.dispatch(
+                QueuedMessage(
+                    chat_id=row.chat_id,
+                    method_name=row.method_name,
+                    kwargs=kwargs,
+                    outbox_id=row.id,
+                    broadcast_id=row.broadcast_id,
+                )
+            )
+        return len(rows)
+
+    async def _renew_leases(self) -> None:
+        loop_time = asyncio.get_running_loop().time()
+        if not self._claimed_ids or loop_time - self._leases_renewed_at < self.lease_seconds / 3:
+            return
+        async with self.async_session_factory() as session:
+            await outbound_message_dal.renew_outbound_message_leases(
+                session, list(self._claimed_ids))
+            await session.commit()
+        self._leases_renewed_at = loop_time
+
+    async def _flush_results(self) -> None:
+        if not self._sent_ids and not self._failed:
+            return
+        sent_ids, self._sent_ids = self._sent_ids, []
+        failed, self._failed = self._failed, []
+        try:
+            async with self.async_session_factory() as session:
+                await outbound_message_dal.mark_outbound_messages_sent(session, sent_ids)
+                await outbound_message_dal.mark_outbound_messages_failed(session, failed)
+                await session.commit()
+            self.total_sent += len(sent_ids)
+            self.total_failed += len(failed)
+        except Exception:
+            # Keep the outcomes for the next attempt.
+            self._sent_ids[:0] = sent_ids
+            self._failed[:0] = failed
+            raise
+
+    async def close(self) -> None:
+        """Stop claiming, let in-memory sends drain, then persist outcomes."""
+        if self._poller_task and not self._poller_task.done():
+            self._poller_task.cancel()
+            await asyncio.gather(self._poller_task, return_exceptions=True)
+        self._poller_task = None
+
+        await self.queue_manager.close()
+        self.queue_manager.attach_persistent_queue(None)
+
+        try:
+            await self._flush_results()
+            if self._claimed_ids:
+                async with self.async_session_factory() as session:
+                    await outbound_message_dal.release_outbound_messages(
+                        session, list(self._claimed_ids))
+                    await session.commit()
+                logging.info(
+                    f"PersistentMessageQueue: released {len(self._claimed_ids)} unsent messages for the next start."
+                )
+                self._claimed_ids.clear()
+        except Exception as e:
+            logging.error(f"PersistentMessageQueue: failed to save state on shutdown: {e}", exc_info=True)
+        logging.info(f"PersistentMessageQueue closed. Stats: {self.get_stats()}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enqueued": self.total_enqueued,
+            "claimed": self.total_claimed,
+            "sent": self.total_sent,
+            "failed": self.total_failed,
+            "in_memory": len(self._claimed_ids),
+        }
@@ -1,9 +1,8 @@
-import json
 import logging
 from decimal import Decimal, ROUND_HALF_UP
 from typing import Optional, Dict, Any, Tuple
 
-from aiohttp import ClientSession, ClientTimeout, web
+from aiohttp import ClientSession, web
 from aiogram import Bot
 from sqlalchemy.orm import sessionmaker
 
@@ -14,7 +13,12 @@ from bot.services.referral_service import ReferralService
 from bot.keyboards.inline.user_keyboards import get_connect_and_main_keyboard
 from bot.services.notification_service import NotificationService
 from db.dal import payment_dal, user_dal
+from db.models import Payment, User
 from bot.utils.text_sanitizer import sanitize_display_name, username_for_display
+from bot.utils import json_codec
+from bot.utils.background_tasks import BackgroundTaskSupervisor, run_in_background
+from bot.utils.http_client import HttpClientPool
+from bot.services.payment_webhook_inbox import accept_or_process
 from bot.utils.config_link import prepare_config_links
 
 
@@ -29,6 +33,7 @@ class PlategaService:
         subscription_service: SubscriptionService,
         referral_service: ReferralService,
         default_return_url: str,
+        background_tasks: Optional[BackgroundTaskSupervisor] = None,
     ):
         self.bot = bot
         self.settings = settings
@@ -36,6 +41,7 @@ class PlategaService:
         self.async_session_factory = async_session_factory
         self.subscription_service = subscription_service
         self.referral_service = referral_service
+        self.background_tasks = background_tasks
 
         self.base_url = (settings.PLATEGA_BASE_URL or "https://app.platega.io").rstrip("/")
         self.merchant_id = settings.PLATEGA_MERCHANT_ID
@@ -44,8 +50,7 @@ class PlategaService:
         self.return_url = settings.PLATEGA_RETURN_URL or f"https://t.me/{default_return_url}"
         self.failed_url = settings.PLATEGA_FAILED_URL or self.return_url
 
-        self._timeout = ClientTimeout(total=20)
-        self._session: Optional[ClientSession] = None
+        self._http = HttpClientPool(settings, "platega", total_timeout=20)
         self._auth_headers = {
             "X-MerchantId": self.merchant_id or "",
             "X-Secret": self.secret or "",
@@ -58,13 +63,13 @@ class PlategaService:
             logging.warning("PlategaService initialized but not fully configured. Payments disabled.")
 
     async def _get_session(self) -> ClientSession:
-        if self._session is None or self._session.closed:
-            self._session = ClientSession(timeout=self._timeout)
-        return self._session
+        return await self._http.get_session()
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        return self._http.get_stats()
 
     async def close(self) -> None:
-        if self._session and not self._session.closed:
-            await self._session.close()
+        await self._http.close()
 
     async def create_transaction(
         self,
@@ -101,8 +106,8 @@ class PlategaService:
             async with session.post(url, json=clean_body, headers=self._auth_headers) as response:
                 response_text = await response.text()
                 try:
-                    response_data = json.loads(response_text) if response_text else {}
-                except json.JSONDecodeError:
+                    response_data = json_codec.loads(response_text) if response_text else {}
+                except ValueError:
                     logging.error("Platega create_transaction: invalid JSON response: %s", response_text)
                     return False, {
                         "status": response.status,
@@ -128,7 +133,7 @@ class PlategaService:
             return web.Response(status=503, text="platega_disabled")
 
         try:
-            data = await request.json()
+            data = await request.json(loads=json_codec.loads)
         except Exception as exc:
             logging.error("Platega webhook: failed to parse JSON: %s", exc)
             return web.Response(status=400, text="bad_request")
@@ -148,6 +153,28 @@ class PlategaService:
             logging.error("Platega webhook: missing transaction id or status in payload: %s", data)
             return web.Response(status=400, text="missing_fields")
 
+        event = {
+            "transaction_id": transaction_id,
+            "status": status,
+            "amount": str(amount_raw) if amount_raw is not None else None,
+            "currency": currency,
+        }
+        return await accept_or_process(
+            request,
+            "platega",
+            f"{transaction_id}:{status}",
+            event,
+            self.process_webhook_event,
+            lambda: web.Response(text="ok"),
+        )
+
+    async def process_webhook_event(self, event: Dict[str, Any]) -> web.Response:
+        """Apply a verified Platega notification (inline or from the webhook inbox)."""
+        transaction_id = event["transaction_id"]
+        status = event["status"]
+        amount_raw = event.get("amount")
+        currency = event.get("currency") or self.settings.DEFAULT_CURRENCY_SYMBOL or "RUB"
+
         async with self.async_session_factory() as session:
             payment = await payment_dal.get_payment_by_provider_payment_id(session, transaction_id)
             if not payment:
@@ -211,97 +238,11 @@ class PlategaService:
                     return web.Response(status=500, text="processing_error")
 
                 db_user = await user_dal.get_user_by_id(session, payment.user_id)
-                lang = db_user.language_code if db_user and db_user.language_code else self.settings.DEFAULT_LANGUAGE
-                _ = lambda k, **kw: self.i18n.gettext(lang, k, **kw) if self.i18n else k
-
-                raw_config_link = activation.get("subscription_url") if activation else None
-                config_link_display, connect_button_url = await prepare_config_links(self.settings, raw_config_link)
-                config_link_text = config_link_display or _("config_link_not_available")
-                final_end = activation.get("end_date") if activation else None
-                applied_days = 0
-                applied_promo_days = activation.get("applied_promo_bonus_days", 0) if activation else 0
-
-                if referral_bonus and referral_bonus.get("referee_new_end_date"):
-                    final_end = referral_bonus["referee_new_end_date"]
-                    applied_days = referral_bonus.get("referee_bonus_applied_days", 0)
-
-                traffic_label = str(int(payment_months)) if float(payment_months).is_integer() else f"{payment_months:g}"
-
-                if sale_mode == "traffic":
-                    text = _(
-                        "payment_successful_traffic_full",
-                        traffic_gb=traffic_label,
-                        end_date=final_end.strftime("%Y-%m-%d") if final_end else "",
-                        config_link=config_link_text,
-                    )
-                elif applied_days:
-                    inviter_name_display = _("friend_placeholder")
-                    if db_user and db_user.referred_by_id:
-                        inviter = await user_dal.get_user_by_id(session, db_user.referred_by_id)
-                        if inviter:
-                            safe_name = sanitize_display_name(inviter.first_name) if inviter.first_name else None
-                            if safe_name:
-                                inviter_name_display = safe_name
-                            elif inviter.username:
-                                inviter_name_display = username_for_display(inviter.username, with_at=False)
-
-                    text = _(
-                        "payment_successful_with_referral_bonus_full",
-                        months=payment_months,
-                        base_end_date=activation["end_date"].strftime("%Y-%m-%d") if activation and activation.get("end_date") else final_end.strftime("%Y-%m-%d") if final_end else "",
-                        bonus_days=applied_days,
-                        final_end_date=final_end.strftime("%Y-%m-%d") if final_end else "",
-                        inviter_name=inviter_name_display,
-                        config_link=config_link_text,
-                    )
-                elif applied_promo_days and final_end:
-                    text = _(
-                        "payment_successful_with_promo_full",
-                        months=payment_months,
-                        bonus_days=applied_promo_days,
-                        end_date=final_end.strftime("%Y-%m-%d"),
-                        config_link=config_link_text,
-                    )
-                else:
-                    text = _(
-                        "payment_successful_full",
-                        months=payment_months,
-                        end_date=final_end.strftime("%Y-%m-%d") if final_end else "",
-                        config_link=config_link_text,
-                    )
-
-                markup = get_connect_and_main_keyboard(
-                    lang,
-                    self.i18n,
-                    self.settings,
-                    config_link_display,
-                    connect_button_url=connect_button_url,
-                    preserve_message=True,
+                await run_in_background(
+                    self.background_tasks,
+                    self._notify_payment_success(payment, db_user, activation, referral_bonus, payment_months, sale_mode, currency),
+                    name=f"platega-payment-{payment.payment_id}",
                 )
-                try:
-                    await self.bot.send_message(
-                        payment.user_id,
-                        text,
-                        reply_markup=markup,
-                        parse_mode="HTML",
-                        disable_web_page_preview=True,
-                    )
-                except Exception as exc:
-                    logging.error("Platega webhook: failed to notify user %s: %s", payment.user_id, exc)
-
-                try:
-                    notification_service = NotificationService(self.bot, self.settings, self.i18n)
-                    await notification_service.notify_payment_received(
-                        user_id=payment.user_id,
-                        amount=float(payment.amount),
-                        currency=currency,
-                        months=int(payment_months) if sale_mode != "traffic" else 0,
-                        traffic_gb=payment_months if sale_mode == "traffic" else None,
-                        payment_provider="platega",
-                        username=db_user.username if db_user else None,
-                    )
-                except Exception as exc:
-                    logging.error("Platega webhook: failed to notify admins: %s", exc)
 
                 return web.Response(text="ok")
 
@@ -331,6 +272,110 @@ class PlategaService:
             logging.warning("Platega webhook: unhandled status '%s' for transaction %s", status, transaction_id)
             return web.Response(status=202, text="status_ignored")
 
+    async def _notify_payment_success(
+        self,
+        payment: Payment,
+        db_user: Optional[User],
+        activation: Optional[Dict[str, Any]],
+        referral_bonus: Optional[Dict[str, Any]],
+        payment_months: float,
+        sale_mode: str,
+        currency: str,
+    ) -> None:
+        """Send the payment confirmation to the user and the admin log (runs after the commit)."""
+        lang = db_user.language_code if db_user and db_user.language_code else self.settings.DEFAULT_LANGUAGE
+        _ = lambda k, **kw: self.i18n.gettext(lang, k, **kw) if self.i18n else k
+
+        raw_config_link = activation.get("subscription_url") if activation else None
+        config_link_display, connect_button_url = await prepare_config_links(self.settings, raw_config_link)
+        config_link_text = config_link_display or _("config_link_not_available")
+        final_end = activation.get("end_date") if activation else None
+        applied_days = 0
+        applied_promo_days = activation.get("applied_promo_bonus_days", 0) if activation else 0
+
+        if referral_bonus and referral_bonus.get("referee_new_end_date"):
+            final_end = referral_bonus["referee_new_end_date"]
+            applied_days = referral_bonus.get("referee_bonus_applied_days", 0)
+
+        traffic_label = str(int(payment_months)) if float(payment_months).is_integer() else f"{payment_months:g}"
+
+        if sale_mode == "traffic":
+            text = _(
+                "payment_successful_traffic_full",
+                traffic_gb=traffic_label,
+                end_date=final_end.strftime("%Y-%m-%d") if final_end else "",
+                config_link=config_link_text,
+            )
+        elif applied_days:
+            inviter_name_display = _("friend_placeholder")
+            if db_user and db_user.referred_by_id:
+                async with self.async_session_factory() as session:
+                    inviter = await user_dal.get_user_by_id(session, db_user.referred_by_id)
+                if inviter:
+                    safe_name = sanitize_display_name(inviter.first_name) if inviter.first_name else None
+                    if safe_name:
+                        inviter_name_display = safe_name
+                    elif inviter.username:
+                        inviter_name_display = username_for_display(inviter.username, with_at=False)
+
+            text = _(
+                "payment_successful_with_referral_bonus_full",
+                months=payment_months,
+                base_end_date=activation["end_date"].strftime("%Y-%m-%d") if activation and activation.get("end_date") else final_end.strftime("%Y-%m-%d") if final_end else "",
+                bonus_days=applied_days,
+                final_end_date=final_end.strftime("%Y-%m-%d") if final_end else "",
+                inviter_name=inviter_name_display,
+                config_link=config_link_text,
+            )
+        elif applied_promo_days and final_end:
+            text = _(
+                "payment_successful_with_promo_full",
+                months=payment_months,
+                bonus_days=applied_promo_days,
+                end_date=final_end.strftime("%Y-%m-%d"),
+                config_link=config_link_text,
+            )
+        else:
+            text = _(
+                "payment_successful_full",
+                months=payment_months,
+                end_date=final_end.strftime("%Y-%m-%d") if final_end else "",
+                config_link=config_link_text,
+            )
+
+        markup = get_connect_and_main_keyboard(
+            lang,
+            self.i18n,
+            self.settings,
+            config_link_display,
+            connect_button_url=connect_button_url,
+            preserve_message=True,
+        )
+        try:
+            await self.bot.send_message(
+                payment.user_id,
+                text,
+                reply_markup=markup,
+                parse_mode="HTML",
+                disable_web_page_preview=True,
+            )
+        except Exception as exc:
+            logging.error("Platega webhook: failed to notify user %s: %s", payment.user_id, exc)
+
+        try:
+            notification_service = NotificationService(self.bot, self.settings, self.i18n)
+            await notification_service.notify_payment_received(
+                user_id=payment.user_id,
+                amount=float(payment.amount),
+                currency=currency,
+                months=int(payment_months) if sale_mode != "traffic" else 0,
+                traffic_gb=payment_months if sale_mode == "traffic" else None,
+                payment_provider="platega",
+                username=db_user.username if db_user else None,
+            )
+        except Exception as exc:
+            logging.error("Platega webhook: failed to notify admins: %s", exc)
+
 
 async def platega_webhook_route(request: web.Request) -> web.Response:
     service: PlategaService = request.app["platega_service"]
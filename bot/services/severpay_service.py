@@ -6,7 +6,7 @@ import hashlib
 from decimal import Decimal, ROUND_HALF_UP
 from typing import Optional, Dict, Any, Tuple
 
-from aiohttp import ClientSession, ClientTimeout, web
+from aiohttp import ClientSession, web
 from aiogram import Bot
 from sqlalchemy.orm import sessionmaker
 
@@ -17,7 +17,12 @@ from bot.services.referral_service import ReferralService
 from bot.services.notification_service import NotificationService
 from bot.keyboards.inline.user_keyboards import get_connect_and_main_keyboard
 from db.dal import payment_dal, user_dal
+from db.models import Payment, User
 from bot.utils.text_sanitizer import sanitize_display_name, username_for_display
+from bot.utils import json_codec
+from bot.utils.background_tasks import BackgroundTaskSupervisor, run_in_background
+from bot.utils.http_client import HttpClientPool
+from bot.services.payment_webhook_inbox import accept_or_process
 from bot.utils.config_link import prepare_config_links
 
 
@@ -32,6 +37,7 @@ class SeverPayService:
         subscription_service: SubscriptionService,
         referral_service: ReferralService,
         default_return_url: str,
+        background_tasks: Optional[BackgroundTaskSupervisor] = None,
     ):
         self.bot = bot
         self.settings = settings
@@ -39,6 +45,7 @@ class SeverPayService:
         self.async_session_factory = async_session_factory
         self.subscription_service = subscription_service
         self.referral_service = referral_service
+        self.background_tasks = background_tasks
 
         self.base_url = (settings.SEVERPAY_BASE_URL or "https://severpay.io/api/merchant").rstrip("/")
         self.mid = settings.SEVERPAY_MID
@@ -46,21 +53,20 @@ class SeverPayService:
         self.return_url = settings.SEVERPAY_RETURN_URL or f"https://t.me/{default_return_url}"
         self.lifetime_minutes = settings.SEVERPAY_LIFETIME_MINUTES
 
-        self._timeout = ClientTimeout(total=15)
-        self._session: Optional[ClientSession] = None
+        self._http = HttpClientPool(settings, "severpay", total_timeout=15)
 
         self.configured: bool = bool(settings.SEVERPAY_ENABLED and self.mid and self.token)
         if not self.configured:
             logging.warning("SeverPayService initialized but not fully configured. Payments disabled.")
 
     async def _get_session(self) -> ClientSession:
-        if self._session is None or self._session.closed:
-            self._session = ClientSession(timeout=self._timeout)
-        return self._session
+        return await self._http.get_session()
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        return self._http.get_stats()
 
     async def close(self) -> None:
-        if self._session and not self._session.closed:
-            await self._session.close()
+        await self._http.close()
 
     @staticmethod
     def _format_amount(amount: float) -> str:
@@ -127,8 +133,8 @@ class SeverPayService:
             async with session.post(url, json=signed_body) as response:
                 response_text = await response.text()
                 try:
-                    response_data = json.loads(response_text) if response_text else {}
-                except json.JSONDecodeError:
+                    response_data = json_codec.loads(response_text) if response_text else {}
+                except ValueError:
                     logging.error("SeverPay create_payment: invalid JSON response: %s", response_text)
                     return False, {"status": response.status, "message": "invalid_json", "raw": response_text}
 
@@ -150,7 +156,7 @@ class SeverPayService:
             return web.json_response({"status": False, "msg": "severpay_disabled"}, status=503)
 
         try:
-            payload = await request.json()
+            payload = await request.json(loads=json_codec.loads)
         except Exception as exc:
             logging.error("SeverPay webhook: failed to parse JSON: %s", exc)
             return web.json_response({"status": False, "msg": "bad_request"}, status=400)
@@ -170,6 +176,26 @@ class SeverPayService:
         order_id_raw = data.get("order_id")
         status = str(data.get("status") or "").lower()
 
+        event = {
+            "provider_payment_id": provider_payment_id,
+            "order_id": order_id_raw,
+            "status": status,
+        }
+        return await accept_or_process(
+            request,
+            "severpay",
+            f"{provider_payment_id or order_id_raw}:{status}",
+            event,
+            self.process_webhook_event,
+            lambda: web.json_response({"status": True}),
+        )
+
+    async def process_webhook_event(self, event: Dict[str, Any]) -> web.Response:
+        """Apply a verified SeverPay pay-in notification (inline or from the webhook inbox)."""
+        provider_payment_id = event.get("provider_payment_id") or ""
+        order_id_raw = event.get("order_id")
+        status = event.get("status") or ""
+
         payment_db_id: Optional[int] = None
         try:
             if isinstance(order_id_raw, int):
@@ -229,97 +255,11 @@ class SeverPayService:
                     return web.json_response({"status": False, "msg": "processing_error"}, status=500)
 
                 db_user = payment.user or await user_dal.get_user_by_id(session, payment.user_id)
-                lang = db_user.language_code if db_user and db_user.language_code else self.settings.DEFAULT_LANGUAGE
-                _ = lambda k, **kw: self.i18n.gettext(lang, k, **kw) if self.i18n else k
-
-                raw_config_link = activation.get("subscription_url") if activation else None
-                config_link_display, connect_button_url = await prepare_config_links(self.settings, raw_config_link)
-                config_link_text = config_link_display or _("config_link_not_available")
-                final_end = activation.get("end_date") if activation else None
-                applied_days = 0
-                applied_promo_days = activation.get("applied_promo_bonus_days", 0) if activation else 0
-
-                if referral_bonus and referral_bonus.get("referee_new_end_date"):
-                    final_end = referral_bonus["referee_new_end_date"]
-                    applied_days = referral_bonus.get("referee_bonus_applied_days", 0)
-
-                traffic_label = str(int(payment_months)) if float(payment_months).is_integer() else f"{payment_months:g}"
-
-                if sale_mode == "traffic":
-                    text = _(
-                        "payment_successful_traffic_full",
-                        traffic_gb=traffic_label,
-                        end_date=final_end.strftime("%Y-%m-%d") if final_end else "",
-                        config_link=config_link_text,
-                    )
-                elif applied_days:
-                    inviter_name_display = _("friend_placeholder")
-                    if db_user and db_user.referred_by_id:
-                        inviter = await user_dal.get_user_by_id(session, db_user.referred_by_id)
-                        if inviter:
-                            safe_name = sanitize_display_name(inviter.first_name) if inviter.first_name else None
-                            if safe_name:
-                                inviter_name_display = safe_name
-                            elif inviter.username:
-                                inviter_name_display = username_for_display(inviter.username, with_at=False)
-
-                    text = _(
-                        "payment_successful_with_referral_bonus_full",
-                        months=payment_months,
-                        base_end_date=activation["end_date"].strftime("%Y-%m-%d") if activation and activation.get("end_date") else final_end.strftime("%Y-%m-%d") if final_end else "",
-                        bonus_days=applied_days,
-                        final_end_date=final_end.strftime("%Y-%m-%d") if final_end else "",
-                        inviter_name=inviter_name_display,
-                        config_link=config_link_text,
-                    )
-                elif applied_promo_days and final_end:
-                    text = _(
-                        "payment_successful_with_promo_full",
-                        months=payment_months,
-                        bonus_days=applied_promo_days,
-                        end_date=final_end.strftime("%Y-%m-%d"),
-                        config_link=config_link_text,
-                    )
-                else:
-                    text = _(
-                        "payment_successful_full",
-                        months=payment_months,
-                        end_date=final_end.strftime("%Y-%m-%d") if final_end else "",
-                        config_link=config_link_text,
-                    )
-
-                markup = get_connect_and_main_keyboard(
-                    lang,
-                    self.i18n,
-                    self.settings,
-                    config_link_display,
-                    connect_button_url=connect_button_url,
-                    preserve_message=True,
+                await run_in_background(
+                    self.background_tasks,
+                    self._notify_payment_success(payment, db_user, activation, referral_bonus, payment_months, sale_mode),
+                    name=f"severpay-payment-{payment.payment_id}",
                 )
-                try:
-                    await self.bot.send_message(
-                        payment.user_id,
-                        text,
-                        reply_markup=markup,
-                        parse_mode="HTML",
-                        disable_web_page_preview=True,
-                    )
-                except Exception as exc:
-                    logging.error("SeverPay webhook: failed to notify user %s: %s", payment.user_id, exc)
-
-                try:
-                    notification_service = NotificationService(self.bot, self.settings, self.i18n)
-                    await notification_service.notify_payment_received(
-                        user_id=payment.user_id,
-                        amount=float(payment.amount),
-                        currency=payment.currency,
-                        months=int(payment_months) if sale_mode != "traffic" else 0,
-                        traffic_gb=payment_months if sale_mode == "traffic" else None,
-                        payment_provider="severpay",
-                        username=db_user.username if db_user else None,
-                    )
-                except Exception as exc:
-                    logging.error("SeverPay webhook: failed to notify admins: %s", exc)
 
                 return web.json_response({"status": True})
 
@@ -363,6 +303,109 @@ class SeverPayService:
             logging.warning("SeverPay webhook: unhandled status '%s' for payment %s", status, provider_payment_id)
             return web.json_response({"status": True})
 
+    async def _notify_payment_success(
+        self,
+        payment: Payment,
+        db_user: Optional[User],
+        activation: Optional[Dict[str, Any]],
+        referral_bonus: Optional[Dict[str, Any]],
+        payment_months: float,
+        sale_mode: str,
+    ) -> None:
+        """Send the payment confirmation to the user and the admin log (runs after the commit)."""
+        lang = db_user.language_code if db_user and db_user.language_code else self.settings.DEFAULT_LANGUAGE
+        _ = lambda k, **kw: self.i18n.gettext(lang, k, **kw) if self.i18n else k
+
+        raw_config_link = activation.get("subscription_url") if activation else None
+        config_link_display, connect_button_url = await prepare_config_links(self.settings, raw_config_link)
+        config_link_text = config_link_display or _("config_link_not_available")
+        final_end = activation.get("end_date") if activation else None
+        applied_days = 0
+        applied_promo_days = activation.get("applied_promo_bonus_days", 0) if activation else 0
+
+        if referral_bonus and referral_bonus.get("referee_new_end_date"):
+            final_end = referral_bonus["referee_new_end_date"]
+            applied_days = referral_bonus.get("referee_bonus_applied_days", 0)
+
+        traffic_label = str(int(payment_months)) if float(payment_months).is_integer() else f"{payment_months:g}"
+
+        if sale_mode == "traffic":
+            text = _(
+                "payment_successful_traffic_full",
+                traffic_gb=traffic_label,
+                end_date=final_end.strftime("%Y-%m-%d") if final_end else "",
+                config_link=config_link_text,
+            )
+        elif applied_days:
+            inviter_name_display = _("friend_placeholder")
+            if db_user and db_user.referred_by_id:
+                async with self.async_session_factory() as session:
+                    inviter = await user_dal.get_user_by_id(session, db_user.referred_by_id)
+                if inviter:
+                    safe_name = sanitize_display_name(inviter.first_name) if inviter.first_name else None
+                    if safe_name:
+                        inviter_name_display = safe_name
+                    elif inviter.username:
+                        inviter_name_display = username_for_display(inviter.username, with_at=False)
+
+            text = _(
+                "payment_successful_with_referral_bonus_full",
+                months=payment_months,
+                base_end_date=activation["end_date"].strftime("%Y-%m-%d") if activation and activation.get("end_date") else final_end.strftime("%Y-%m-%d") if final_end else "",
+                bonus_days=applied_days,
+                final_end_date=final_end.strftime("%Y-%m-%d") if final_end else "",
+                inviter_name=inviter_name_display,
+                config_link=config_link_text,
+            )
+        elif applied_promo_days and final_end:
+            text = _(
+                "payment_successful_with_promo_full",
+                months=payment_months,
+                bonus_days=applied_promo_days,
+                end_date=final_end.strftime("%Y-%m-%d"),
+                config_link=config_link_text,
+            )
+        else:
+            text = _(
+                "payment_successful_full",
+                months=payment_months,
+                end_date=final_end.strftime("%Y-%m-%d") if final_end else "",
+                config_link=config_link_text,
+            )
+
+        markup = get_connect_and_main_keyboard(
+            lang,
+            self.i18n,
+            self.settings,
+            config_link_display,
+            connect_button_url=connect_button_url,
+            preserve_message=True,
+        )
+        try:
+            await self.bot.send_message(
+                payment.user_id,
+                text,
+                reply_markup=markup,
+                parse_mode="HTML",
+                disable_web_page_preview=True,
+            )
+        except Exception as exc:
+            logging.error("SeverPay webhook: failed to notify user %s: %s", payment.user_id, exc)
+
+        try:
+            notification_service = NotificationService(self.bot, self.settings, self.i18n)
+            await notification_service.notify_payment_received(
+                user_id=payment.user_id,
+                amount=float(payment.amount),
+                currency=payment.currency,
+                months=int(payment_months) if sale_mode != "traffic" else 0,
+                traffic_gb=payment_months if sale_mode == "traffic" else None,
+                payment_provider="severpay",
+                username=db_user.username if db_user else None,
+            )
+        except Exception as exc:
+            logging.error("SeverPay webhook: failed to notify admins: %s", exc)
+
 
 async def severpay_webhook_route(request: web.Request) -> web.Response:
     service: SeverPayService = request.app["severpay_service"]
@@ -29,7 +29,7 @@ class SubscriptionService:
         self.i18n = i18n
 
     async def get_user_language(self, session: AsyncSession, user_id: int) -> str:
-        user_record = await user_dal.get_user_by_id(session, user_id)
+        user_record = await user_dal.get_session_user(session, user_id)
         return (
             user_record.language_code
             if user_record and user_record.language_code
@@ -42,7 +42,7 @@ class SubscriptionService:
     async def has_active_subscription(self, session: AsyncSession, user_id: int) -> bool:
         """Return True if user currently has an active subscription (end_date in future)."""
         try:
-            user_record = await user_dal.get_user_by_id(session, user_id)
+            user_record = await user_dal.get_session_user(session, user_id)
             if not user_record or not user_record.panel_user_uuid:
                 return False
             active_sub = await subscription_dal.get_active_subscription_by_user_id(
@@ -443,7 +443,8 @@ class SubscriptionService:
             logging.error("Failed to ensure panel linkage for user %s during traffic activation", user_id)
             return None
 
-        panel_user_data = await self.panel_service.get_user_by_uuid(panel_user_uuid) or {}
+        panel_user_data = await self.panel_service.get_user_by_uuid(
+            panel_user_uuid, use_cache=False) or {}
         traffic_info = panel_user_data.get("userTraffic") or {}
         current_limit = panel_user_data.get("trafficLimitBytes")
         current_used = traffic_info.get("usedTrafficBytes")
@@ -3,14 +3,36 @@ import logging
 import asyncio
 from typing import Optional, Dict, Any, List
 
-from yookassa import Configuration, Payment as YooKassaPayment
-from yookassa.domain.request.payment_request_builder import PaymentRequestBuilder
-from yookassa.domain.common.confirmation_type import ConfirmationType
+import aiohttp
 
+from bot.utils import json_codec
+from bot.utils.circuit_breaker import backoff_delay
+from bot.utils.http_client import HttpClientPool
 from config.settings import Settings
 
 
+class YooKassaApiError(Exception):
+
+    def __init__(self, status: int, description: str):
+        super().__init__(f"HTTP {status}: {description}")
+        self.status = status
+        self.description = description
+
+
 class YooKassaService:
+    """
+    YooKassa API v3 client for the endpoints the bot uses (create, get, cancel
+    and charges of saved payment methods).
+
+    Requests go through the shared aiohttp pool policy (``HttpClientPool``) instead
+    of the synchronous SDK in the default executor, so bursts of auto-renew
+    charges no longer tie up threads and connections are kept alive between
+    calls. Every POST carries an Idempotence-Key; "still processing" answers
+    (HTTP 202), 5xx and network errors are retried with the same key.
+    """
+
+    API_BASE_URL = "https://api.yookassa.ru/v3"
+    MAX_ATTEMPTS = 3
 
     def __init__(self,
                  shop_id: Optional[str],
@@ -20,6 +42,10 @@ class YooKassaService:
                  settings_obj: Optional[Settings] = None):
 
         self.settings = settings_obj
+        self.shop_id = shop_id
+        self.secret_key = secret_key
+        self._auth = aiohttp.BasicAuth(shop_id, secret_key) if shop_id and secret_key else None
+        self._http = HttpClientPool(settings_obj, "yookassa", total_timeout=30) if settings_obj else None
 
         if self.settings and not self.settings.YOOKASSA_ENABLED:
             logging.warning("YooKassa is disabled via YOOKASSA_ENABLED flag. Payment functionality will be DISABLED.")
@@ -29,16 +55,14 @@ class YooKassaService:
                 "YooKassa SHOP_ID or SECRET_KEY not configured in settings. "
                 "Payment functionality will be DISABLED.")
             self.configured = False
+        elif not self._http:
+            logging.warning(
+                "YooKassaService: Settings object not available. Payment functionality will be DISABLED.")
+            self.configured = False
         else:
-            try:
-                Configuration.configure(shop_id, secret_key)
-                self.configured = True
-                logging.info(
-                    f"YooKassa SDK configured for shop_id: {shop_id[:5]}...")
-            except Exception as e:
-                logging.error(f"Failed to configure YooKassa SDK: {e}",
-                              exc_info=True)
-                self.configured = False
+            self.configured = True
+            logging.info(
+                f"YooKassa API client configured for shop_id: {shop_id[:5]}...")
 
         if configured_return_url:
             self.return_url = configured_return_url
@@ -57,6 +81,62 @@ class YooKassaService:
             f"YooKassa Service effective return_url for payments: {self.return_url}"
         )
 
+    def get_pool_stats(self) -> Dict[str, Any]:
+        return self._http.get_stats() if self._http else {}
+
+    async def close(self) -> None:
+        if self._http:
+            await self._http.close()
+
+    async def _api_request(self,
+                           method: str,
+                           path: str,
+                           body: Optional[Dict[str, Any]] = None,
+                           idempotence_key: Optional[str] = None) -> Dict[str, Any]:
+        headers = {"Content-Type": "application/json"}
+        if method != "GET":
+            headers["Idempotence-Key"] = idempotence_key or str(uuid.uuid4())
+        data = json_codec.dumps_bytes(body) if body is not None else None
+        url = f"{self.API_BASE_URL}{path}"
+        session = await self._http.get_session()
+
+        for attempt in range(1, self.MAX_ATTEMPTS + 1):
+            last_attempt = attempt == self.MAX_ATTEMPTS
+            try:
+                async with session.request(method, url, data=data, headers=headers,
+                                           auth=self._auth) as response:
+                    raw_body = await response.read()
+                    status = response.status
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if last_attempt:
+                    raise
+                delay = backoff_delay(attempt, 0.5, 5.0)
+                logging.warning(
+                    f"YooKassa {method} {path}: {type(e).__name__} on attempt {attempt}, retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            try:
+                payload = json_codec.loads(raw_body) if raw_body else {}
+            except ValueError:
+                payload = {}
+
+            if status == 200:
+                return payload
+            if (status == 202 or status >= 500) and not last_attempt:
+                # 202: the request is still being processed, ask again after retry_after ms.
+                retry_after_ms = payload.get("retry_after") if isinstance(payload, dict) else None
+                delay = (retry_after_ms / 1000) if isinstance(retry_after_ms, (int, float)) \
+                    else backoff_delay(attempt, 0.5, 5.0)
+                logging.warning(
+                    f"YooKassa {method} {path}: HTTP {status} on attempt {attempt}, retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+            description = (payload.get("description") or payload.get("code")) if isinstance(payload, dict) else None
+            raise YooKassaApiError(status, description or raw_body[:500].decode("utf-8", "replace"))
+
+        raise YooKassaApiError(0, "no attempts made")
+
     async def create_payment(
             self,
             amount: float,
@@ -104,30 +184,31 @@ class YooKassaService:
             }
 
         try:
-            builder = PaymentRequestBuilder()
-            builder.set_amount({
-                "value": str(round(amount, 2)),
-                "currency": currency.upper()
-            })
             # For binding cards only, do not capture and set minimal amount
             if bind_only:
                 capture = False
                 amount = max(amount, 1.00)
-            builder.set_capture(capture)
+            payment_request: Dict[str, Any] = {
+                "amount": {
+                    "value": str(round(amount, 2)),
+                    "currency": currency.upper()
+                },
+                "capture": capture,
+                "description": description,
+                "metadata": metadata,
+            }
             if not payment_method_id:
                 # Saved payment_method_id charges must omit confirmation per YooKassa API
-                builder.set_confirmation({
-                    "type": ConfirmationType.REDIRECT,
+                payment_request["confirmation"] = {
+                    "type": "redirect",
                     "return_url": self.return_url
-                })
-            builder.set_description(description)
-            builder.set_metadata(metadata)
+                }
             if save_payment_method:
                 # Ask YooKassa to save method for off-session charges
-                builder.set_save_payment_method(True)
+                payment_request["save_payment_method"] = True
             if payment_method_id:
                 # Use a previously saved payment method for merchant-initiated payments
-                builder.set_payment_method_id(payment_method_id)
+                payment_request["payment_method_id"] = payment_method_id
 
             receipt_items_list: List[Dict[str, Any]] = [{
                 "description":
@@ -151,54 +232,51 @@ class YooKassaService:
                 "items": receipt_items_list
             }
 
-            builder.set_receipt(receipt_data_dict)
+            payment_request["receipt"] = receipt_data_dict
 
             idempotence_key = str(uuid.uuid4())
-            payment_request = builder.build()
 
             logging.info(
                 f"Creating YooKassa payment (Idempotence-Key: {idempotence_key}). "
                 f"Amount: {amount} {currency}. Metadata: {metadata}. Receipt: {receipt_data_dict}"
             )
 
-            loop = asyncio.get_running_loop()
-            response = await loop.run_in_executor(
-                None, lambda: YooKassaPayment.create(payment_request,
-                                                     idempotence_key))
+            response = await self._api_request(
+                "POST", "/payments", payment_request, idempotence_key)
 
             logging.info(
-                f"YooKassa Payment.create response: ID={response.id}, Status={response.status}, Paid={response.paid}"
+                f"YooKassa Payment.create response: ID={response.get('id')}, "
+                f"Status={response.get('status')}, Paid={response.get('paid')}"
             )
 
+            confirmation = response.get("confirmation") or {}
+            response_amount = response.get("amount") or {}
             return {
                 "id":
-                response.id,
+                response.get("id"),
                 "confirmation_url":
-                response.confirmation.confirmation_url
-                if response.confirmation else None,
+                confirmation.get("confirmation_url"),
                 "status":
-                response.status,
+                response.get("status"),
                 "metadata":
-                response.metadata,
+                response.get("metadata"),
                 "amount_value":
-                float(response.amount.value),
+                float(response_amount.get("value", 0)),
                 "amount_currency":
-                response.amount.currency,
+                response_amount.get("currency"),
                 "idempotence_key_used":
                 idempotence_key,
                 "paid":
-                response.paid,
+                response.get("paid"),
                 "refundable":
-                response.refundable,
+                response.get("refundable"),
                 "created_at":
-                response.created_at.isoformat() if hasattr(
-                    response.created_at, 'isoformat') else str(
-                        response.created_at),
+                response.get("created_at"),
                 "description_from_yk":
-                response.description,
+                response.get("description"),
                 "test_mode":
-                response.test if hasattr(response, 'test') else None,
-                "payment_method": getattr(response, 'payment_method', None),
+                response.get("test"),
+                "payment_method": response.get("payment_method"),
             }
         except Exception as e:
             logging.error(f"YooKassa payment creation failed: {e}",
@@ -216,48 +294,49 @@ class YooKassaService:
                 f"Fetching payment info from YooKassa for ID: {payment_id_in_yookassa}"
             )
 
-            loop = asyncio.get_running_loop()
-            payment_info_yk = await loop.run_in_executor(
-                None, lambda: YooKassaPayment.find_one(payment_id_in_yookassa))
+            try:
+                payment_info_yk = await self._api_request(
+                    "GET", f"/payments/{payment_id_in_yookassa}")
+            except YooKassaApiError as e:
+                if e.status != 404:
+                    raise
+                payment_info_yk = None
 
             if payment_info_yk:
                 logging.info(
-                    f"YooKassa payment info for {payment_id_in_yookassa}: Status={payment_info_yk.status}, Paid={payment_info_yk.paid}"
+                    f"YooKassa payment info for {payment_id_in_yookassa}: Status={payment_info_yk.get('status')}, Paid={payment_info_yk.get('paid')}"
                 )
-                pm = getattr(payment_info_yk, 'payment_method', None)
+                pm = payment_info_yk.get("payment_method")
                 pm_payload: Dict[str, Any] = {}
                 if pm:
                     # Collect common fields, including id and hints for last4
-                    pm_id = getattr(pm, 'id', None)
-                    pm_type = getattr(pm, 'type', None)
-                    pm_title = getattr(pm, 'title', None)
-                    account_number = getattr(pm, 'account_number', None) or getattr(pm, 'account', None)
-                    card_obj = getattr(pm, 'card', None)
+                    account_number = pm.get("account_number") or pm.get("account")
+                    card_obj = pm.get("card")
                     last4_val = None
-                    if card_obj and hasattr(card_obj, 'last4'):
-                        last4_val = getattr(card_obj, 'last4')
+                    if card_obj and card_obj.get("last4"):
+                        last4_val = card_obj.get("last4")
                     elif isinstance(account_number, str) and len(account_number) >= 4:
                         last4_val = account_number[-4:]
                     pm_payload = {
-                        "id": pm_id,
-                        "type": pm_type,
-                        "title": pm_title,
+                        "id": pm.get("id"),
+                        "type": pm.get("type"),
+                        "title": pm.get("title"),
                         "card_last4": last4_val,
                     }
+                amount_info = payment_info_yk.get("amount") or {}
                 return {
-                    "id": payment_info_yk.id,
-                    "status": payment_info_yk.status,
-                    "paid": payment_info_yk.paid,
-                    "amount_value": float(payment_info_yk.amount.value),
-                    "amount_currency": payment_info_yk.amount.currency,
-                    "metadata": payment_info_yk.metadata,
-                    "description": payment_info_yk.description,
-                    "refundable": payment_info_yk.refundable,
-                    "created_at": payment_info_yk.created_at.isoformat() if hasattr(
-                        payment_info_yk.created_at, 'isoformat') else str(payment_info_yk.created_at),
-                    "captured_at": payment_info_yk.captured_at.isoformat() if getattr(payment_info_yk, 'captured_at', None) and hasattr(payment_info_yk.captured_at, 'isoformat') else None,
+                    "id": payment_info_yk.get("id"),
+                    "status": payment_info_yk.get("status"),
+                    "paid": payment_info_yk.get("paid"),
+                    "amount_value": float(amount_info.get("value", 0)),
+                    "amount_currency": amount_info.get("currency"),
+                    "metadata": payment_info_yk.get("metadata"),
+                    "description": payment_info_yk.get("description"),
+                    "refundable": payment_info_yk.get("refundable"),
+                    "created_at": payment_info_yk.get("created_at"),
+                    "captured_at": payment_info_yk.get("captured_at"),
                     "payment_method": pm_payload,
-                    "test_mode": getattr(payment_info_yk, 'test', None),
+                    "test_mode": payment_info_yk.get("test"),
                 }
             else:
                 logging.warning(
@@ -275,8 +354,8 @@ class YooKassaService:
             logging.error("YooKassa is not configured. Cannot cancel payment.")
             return False
         try:
-            loop = asyncio.get_running_loop()
-            await loop.run_in_executor(None, lambda: YooKassaPayment.cancel(payment_id_in_yookassa))
+            await self._api_request(
+                "POST", f"/payments/{payment_id_in_yookassa}/cancel", {})
             logging.info(f"Cancelled YooKassa payment {payment_id_in_yookassa}")
             return True
         except Exception as e:
@@ -1,7 +1,7 @@
 # Bot utilities package
 
 from dataclasses import dataclass
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from aiogram import types
 
 
@@ -149,58 +149,46 @@ async def send_message_by_type(bot, chat_id: int, content: MessageContent, **kwa
             )
 
 
-async def send_message_via_queue(queue_manager, uid: int, content: MessageContent, **kwargs) -> None:
+def build_queue_call(content: MessageContent, **kwargs) -> Tuple[str, Dict[str, Any]]:
     """
-    Отправляет сообщение через очередь в зависимости от типа контента.
-    Использует match/case вместо длинных if-elif цепочек.
+    Возвращает (имя метода Bot, kwargs) для отправки контента через очередь.
     Автоматически фильтрует неподдерживаемые параметры.
     """
-    # Фильтруем kwargs для данного типа сообщения
     filtered_kwargs = filter_kwargs(content.content_type, kwargs)
-    
+    caption = content.text or None
+
     match content.content_type:
         case "text":
-            await queue_manager.send_message(
-                chat_id=uid, text=content.text, **filtered_kwargs
-            )
+            return "send_message", {"text": content.text, **filtered_kwargs}
         case "photo":
-            await queue_manager.send_photo(
-                chat_id=uid, photo=content.file_id, caption=content.text or None, **filtered_kwargs
-            )
+            return "send_photo", {"photo": content.file_id, "caption": caption, **filtered_kwargs}
         case "video":
-            await queue_manager.send_video(
-                chat_id=uid, video=content.file_id, caption=content.text or None, **filtered_kwargs
-            )
+            return "send_video", {"video": content.file_id, "caption": caption, **filtered_kwargs}
         case "animation":
-            await queue_manager.send_animation(
-                chat_id=uid, animation=content.file_id, caption=content.text or None, **filtered_kwargs
-            )
+            return "send_animation", {"animation": content.file_id, "caption": caption, **filtered_kwargs}
         case "document":
-            await queue_manager.send_document(
-                chat_id=uid, document=content.file_id, caption=content.text or None, **filtered_kwargs
-            )
+            return "send_document", {"document": content.file_id, "caption": caption, **filtered_kwargs}
         case "audio":
-            await queue_manager.send_audio(
-                chat_id=uid, audio=content.file_id, caption=content.text or None, **filtered_kwargs
-            )
+            return "send_audio", {"audio": content.file_id, "caption": caption, **filtered_kwargs}
         case "voice":
-            await queue_manager.send_voice(
-                chat_id=uid, voice=content.file_id, caption=content.text or None, **filtered_kwargs
-            )
+            return "send_voice", {"voice": content.file_id, "caption": caption, **filtered_kwargs}
         case "sticker":
-            await queue_manager.send_sticker(
-                chat_id=uid, sticker=content.file_id, **filtered_kwargs
-            )
+            return "send_sticker", {"sticker": content.file_id, **filtered_kwargs}
         case "video_note":
-            await queue_manager.send_video_note(
-                chat_id=uid, video_note=content.file_id, **filtered_kwargs
-            )
+            return "send_video_note", {"video_note": content.file_id, **filtered_kwargs}
         case _:
             # Fallback для неизвестных типов - отправляем как текст
             text_kwargs = filter_kwargs("text", kwargs)
-            await queue_manager.send_message(
-                chat_id=uid, text=content.text or "Unknown content type", **text_kwargs
-            )
+            return "send_message", {"text": content.text or "Unknown content type", **text_kwargs}
+
+
+async def send_message_via_queue(queue_manager, uid: int, content: MessageContent, **kwargs) -> None:
+    """
+    Отправляет сообщение через очередь в зависимости от типа контента.
+    Автоматически фильтрует неподдерживаемые параметры.
+    """
+    method_name, call_kwargs = build_queue_call(content, **kwargs)
+    await getattr(queue_manager, method_name)(chat_id=uid, **call_kwargs)
 
 
 async def send_direct_message(bot, chat_id: int, content: MessageContent, extra_text: str = "", **kwargs) -> None:
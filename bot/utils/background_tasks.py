@@ -0,0 +1,90 @@
+import asyncio
+import logging
+from typing import Any, Coroutine, Dict, Optional, Set
+
+
+class BackgroundTaskSupervisor:
+    """
+    Owner of fire-and-forget tasks such as post-payment notifications.
+
+    Spawned coroutines run concurrently (at most ``max_concurrency`` at a time)
+    and are referenced until they finish, so they cannot be garbage collected
+    mid-flight. Failures are logged with the task name instead of disappearing
+    as "Task exception was never retrieved". ``close`` waits up to
+    ``shutdown_timeout`` seconds for pending work and cancels the rest.
+    """
+
+    def __init__(self, max_concurrency: int = 50, shutdown_timeout: float = 15.0):
+        self.shutdown_timeout = max(shutdown_timeout, 0.0)
+        self._semaphore = asyncio.Semaphore(max(max_concurrency, 1))
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.total_spawned = 0
+        self.total_failed = 0
+        self.total_cancelled = 0
+
+    def spawn(self, coro: Coroutine[Any, Any, Any], name: Optional[str] = None) -> asyncio.Task:
+        task = asyncio.create_task(self._run(coro), name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._on_done)
+        self.total_spawned += 1
+        return task
+
+    async def _run(self, coro: Coroutine[Any, Any, Any]) -> Any:
+        async with self._semaphore:
+            return await coro
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if task.cancelled():
+            self.total_cancelled += 1
+            return
+        exc = task.exception()
+        if exc is not None:
+            self.total_failed += 1
+            logging.error(
+                f"BackgroundTaskSupervisor: task '{task.get_name()}' failed: {exc}",
+                exc_info=(type(exc), exc, exc.__traceback__),
+            )
+
+    @property
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    async def close(self) -> None:
+        """Drain pending tasks, cancelling whatever is still running after the timeout."""
+        if self._tasks:
+            logging.info(f"BackgroundTaskSupervisor: waiting for {len(self._tasks)} pending tasks...")
+            _, still_running = await asyncio.wait(set(self._tasks), timeout=self.shutdown_timeout)
+            for task in still_running:
+                task.cancel()
+            if still_running:
+                logging.warning(
+                    f"BackgroundTaskSupervisor: cancelled {len(still_running)} tasks still running after "
+                    f"{self.shutdown_timeout:g}s."
+                )
+                await asyncio.gather(*still_running, return_exceptions=True)
+        logging.info(f"BackgroundTaskSupervisor closed. Stats: {self.get_stats()}")
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "pending": len(self._tasks),
+            "spawned": self.total_spawned,
+            "failed": self.total_failed,
+            "cancelled": self.total_cancelled,
+        }
+
+
+async def run_in_background(
+    supervisor: Optional[BackgroundTaskSupervisor],
+    coro: Coroutine[Any, Any, Any],
+    name: Optional[str] = None,
+) -> None:
+    """Spawn ``coro`` on the supervisor, or await it inline when there is none."""
+    if supervisor is None:
+        try:
+            await coro
+        except Exception as e:
+            logging.error(f"Inline task '{name}' failed: {e}", exc_info=True)
+        return
+    supervisor.spawn(coro, name=name)
@@ -0,0 +1,86 @@
+import logging
+import random
+import time
+from typing import Any, Dict
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Exponential backoff with full jitter for the given 1-based retry attempt."""
+    ceiling = min(max_delay, base_delay * 2 ** max(attempt - 1, 0))
+    return random.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After ``failure_threshold`` failures in a row the circuit opens and
+    ``allow_request`` returns False for ``recovery_timeout`` seconds. Then a single
+    probe request is let through (half-open): its success closes the circuit, its
+    failure opens it again for another recovery period.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(int(failure_threshold), 1)
+        self.recovery_timeout = max(float(recovery_timeout), 0.0)
+        self.state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started_at = 0.0
+
+        self.times_opened = 0
+        self.rejected_requests = 0
+
+    def allow_request(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at >= self.recovery_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            else:
+                self.rejected_requests += 1
+                return False
+        # Half-open: only one probe at a time (a probe whose outcome was never
+        # recorded, e.g. a cancelled call, stops blocking after a recovery period).
+        now = time.monotonic()
+        if self._probe_in_flight and now - self._probe_started_at < self.recovery_timeout:
+            self.rejected_requests += 1
+            return False
+        self._probe_in_flight = True
+        self._probe_started_at = now
+        return True
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logging.info(f"Circuit '{self.name}' closed again after a successful probe.")
+        self.state = self.CLOSED
+        self._consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self._consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+                logging.warning(
+                    f"Circuit '{self.name}' opened after {self._consecutive_failures} consecutive failures; "
+                    f"failing fast for {self.recovery_timeout:.0f}s."
+                )
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected_requests": self.rejected_requests,
+        }
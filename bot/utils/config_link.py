@@ -5,8 +5,23 @@ from config.settings import Settings
 from bot.services.panel_api_service import PanelApiService
 
 
+_shared_panel_service: Optional[PanelApiService] = None
+
+
+def set_config_link_panel_service(panel_service: Optional[PanelApiService]) -> None:
+    """Register the application-wide panel service used for link encryption.
+
+    Reusing it keeps one HTTP connection pool and one encrypted-link cache for
+    every caller of prepare_config_links.
+    """
+    global _shared_panel_service
+    _shared_panel_service = panel_service
+
+
 async def _encrypt_raw_link(settings: Settings, raw_link: str) -> Optional[str]:
     """Encrypt the raw subscription URL using the panel's happ crypt4 API."""
+    if _shared_panel_service is not None:
+        return await _shared_panel_service.encrypt_happ_link(raw_link) or None
     async with PanelApiService(settings) as panel_service:
         encrypted_link = await panel_service.encrypt_happ_link(raw_link)
         if encrypted_link:
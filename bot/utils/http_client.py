@@ -0,0 +1,134 @@
+import logging
+import time
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from bot.utils import json_codec
+from config.settings import Settings
+
+
+class HttpClientPool:
+    """
+    Lazily created aiohttp session backed by a tuned ``TCPConnector``.
+
+    All outbound HTTP integrations (panel API, YooKassa, FreeKassa, Platega, SeverPay) use
+    the same pool policy from settings: a global and a per-host connection limit,
+    keep-alive reuse, cached DNS lookups and separate connect/read timeouts on top
+    of the per-integration total timeout. Connection-pool events are counted via
+    an aiohttp trace config so saturation (requests waiting for a free
+    connection) is visible in ``get_stats``.
+
+    aiohttp does not pipeline HTTP/1.1 requests; concurrency comes from keeping
+    several keep-alive connections per host open instead.
+    """
+
+    def __init__(self, settings: Settings, name: str, total_timeout: float):
+        self.settings = settings
+        self.name = name
+        self.total_timeout = total_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+
+        self.requests_total = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.waiting = 0
+        self.waits_total = 0
+        self.wait_seconds_total = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _build_connector(self) -> aiohttp.TCPConnector:
+        return aiohttp.TCPConnector(
+            limit=self.settings.HTTP_POOL_LIMIT,
+            limit_per_host=self.settings.HTTP_POOL_LIMIT_PER_HOST,
+            keepalive_timeout=self.settings.HTTP_KEEPALIVE_TIMEOUT_SECONDS,
+            ttl_dns_cache=self.settings.HTTP_DNS_CACHE_TTL_SECONDS,
+        )
+
+    def _build_timeout(self) -> aiohttp.ClientTimeout:
+        return aiohttp.ClientTimeout(
+            total=self.total_timeout,
+            connect=self.settings.HTTP_CONNECT_TIMEOUT_SECONDS,
+            sock_connect=self.settings.HTTP_CONNECT_TIMEOUT_SECONDS,
+            sock_read=self.settings.HTTP_READ_TIMEOUT_SECONDS,
+        )
+
+    def _build_trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, ctx, params) -> None:
+            self.requests_total += 1
+
+        async def on_queued_start(session, ctx, params) -> None:
+            ctx.queued_at = time.monotonic()
+            self.waiting += 1
+            self.waits_total += 1
+
+        async def on_queued_end(session, ctx, params) -> None:
+            self.waiting = max(self.waiting - 1, 0)
+            waited = time.monotonic() - getattr(ctx, "queued_at", time.monotonic())
+            self.wait_seconds_total += waited
+            if waited > self.max_wait_seconds:
+                self.max_wait_seconds = waited
+            if waited >= 1.0:
+                logging.warning(
+                    f"HTTP pool '{self.name}': request waited {waited:.2f}s for a free connection "
+                    f"(limit={self.settings.HTTP_POOL_LIMIT}, per host={self.settings.HTTP_POOL_LIMIT_PER_HOST})."
+                )
+
+        async def on_create_end(session, ctx, params) -> None:
+            self.connections_created += 1
+
+        async def on_reuse(session, ctx, params) -> None:
+            self.connections_reused += 1
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_queued_start.append(on_queued_start)
+        trace_config.on_connection_queued_end.append(on_queued_end)
+        trace_config.on_connection_create_end.append(on_create_end)
+        trace_config.on_connection_reuseconn.append(on_reuse)
+        return trace_config
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=self._build_connector(),
+                timeout=self._build_timeout(),
+                trace_configs=[self._build_trace_config()],
+                json_serialize=json_codec.dumps,
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session and not self._session.closed:
+            stats = self.get_stats()
+            await self._session.close()
+            logging.info(f"HTTP pool '{self.name}' closed. Stats: {stats}")
+        self._session = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {
+            "name": self.name,
+            "limit": self.settings.HTTP_POOL_LIMIT,
+            "limit_per_host": self.settings.HTTP_POOL_LIMIT_PER_HOST,
+            "requests": self.requests_total,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "waiting": self.waiting,
+            "waits_total": self.waits_total,
+            "avg_wait_ms": round(self.wait_seconds_total / self.waits_total * 1000, 1)
+            if self.waits_total else 0.0,
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 1),
+            "acquired": 0,
+            "idle": 0,
+        }
+        connector = self._session.connector if self._session and not self._session.closed else None
+        if connector is not None:
+            # aiohttp exposes no public counters for these; read defensively.
+            acquired = getattr(connector, "_acquired", None)
+            idle = getattr(connector, "_conns", None)
+            if acquired is not None:
+                stats["acquired"] = len(acquired)
+            if idle is not None:
+                stats["idle"] = sum(len(conns) for conns in idle.values())
+        return stats
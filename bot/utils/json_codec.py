@@ -0,0 +1,71 @@
+"""
+JSON encoding/decoding with the fastest available backend.
+
+orjson is preferred, then msgspec, then the standard library. All backends
+produce compact UTF-8 JSON (non-ASCII characters are not escaped) and raise
+``json.JSONDecodeError`` (a ``ValueError``) for malformed input, so callers do
+not depend on the backend.
+"""
+
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+JsonInput = Union[str, bytes, bytearray, memoryview]
+
+if orjson is not None:
+    JSON_BACKEND = "orjson"
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def loads(data: JsonInput) -> Any:
+        return orjson.loads(data)
+
+    def dumps_bytes(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=_ORJSON_OPTIONS)
+
+    def dumps(obj: Any) -> str:
+        return orjson.dumps(obj, option=_ORJSON_OPTIONS).decode()
+
+elif msgspec is not None:
+    JSON_BACKEND = "msgspec"
+    _decoder = msgspec.json.Decoder()
+    _encoder = msgspec.json.Encoder()
+
+    def loads(data: JsonInput) -> Any:
+        try:
+            return _decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise json.JSONDecodeError(str(e), "", 0) from e
+
+    def dumps_bytes(obj: Any) -> bytes:
+        try:
+            return _encoder.encode(obj)
+        except msgspec.EncodeError as e:
+            raise TypeError(str(e)) from e
+
+    def dumps(obj: Any) -> str:
+        return dumps_bytes(obj).decode()
+
+else:
+    JSON_BACKEND = "json"
+
+    def loads(data: JsonInput) -> Any:
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return json.loads(data)
+
+    def dumps(obj: Any) -> str:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+    def dumps_bytes(obj: Any) -> bytes:
+        return dumps(obj).encode()
@@ -0,0 +1,34 @@
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Hashable
+
+
+class KeyedLock:
+    """
+    One asyncio.Lock per key, kept in a WeakValueDictionary.
+
+    A lock lives only while some coroutine holds or waits on it, so the table
+    does not grow with the number of distinct keys seen. Work for different keys
+    runs concurrently; work for the same key is serialized.
+    """
+
+    def __init__(self):
+        self._locks: "weakref.WeakValueDictionary[Hashable, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    def get(self, key: Hashable) -> asyncio.Lock:
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[key] = lock
+        return lock
+
+    @asynccontextmanager
+    async def __call__(self, key: Hashable) -> AsyncIterator[None]:
+        # The local reference keeps the lock alive for waiters until release.
+        lock = self.get(key)
+        async with lock:
+            yield
+
+    def __len__(self) -> int:
+        return len(self._locks)
@@ -1,11 +1,17 @@
 import asyncio
+import heapq
+import itertools
 import logging
-from typing import Dict, Any, Callable, Awaitable, Optional
+import time
+from typing import Dict, Any, Callable, Awaitable, Optional, List, Set, Tuple
 from dataclasses import dataclass
-from datetime import datetime, timedelta
 from collections import deque
 from aiogram import Bot
-from aiogram.exceptions import TelegramBadRequest
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
 
 from bot.utils.telegram_markup import (
     is_profile_link_error,
@@ -20,97 +26,380 @@ class QueuedMessage:
     method_name: str  # 'send_message', 'edit_message_text', etc.
     kwargs: Dict[str, Any]
     callback: Optional[Callable[[Any], Awaitable[None]]] = None  # Optional callback for result
+    attempts: int = 0  # flood-wait retries already spent
+    outbox_id: Optional[int] = None  # row id when the message came from the persistent queue
+    broadcast_id: Optional[int] = None  # set for broadcast deliveries
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second, at most ``capacity`` stored."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+
+    def try_consume(self) -> float:
+        """Take a token if available; otherwise return seconds until one is."""
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self) -> None:
+        while True:
+            wait_time = self.try_consume()
+            if wait_time <= 0:
+                return
+            await asyncio.sleep(wait_time)
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for ``seconds`` (e.g. after a flood-wait)."""
+        now = time.monotonic()
+        self.paused_until = max(self.paused_until, now + seconds)
+        self.tokens = 0.0
+        self.updated_at = self.paused_until
+
+    def set_rate(self, rate: float) -> None:
+        self._refill(time.monotonic())
+        self.rate = rate
 
 
 class MessageQueue:
-    """Message queue with rate limiting for Telegram API"""
-    
-    def __init__(self, messages_per_second: float, burst_size: int = 5):
+    """
+    Message queue with rate limiting for Telegram API.
+
+    A scheduler task hands messages to ``workers`` sender tasks, so a slow API call
+    does not hold up the rest of the queue. The overall rate is enforced by a token
+    bucket (``messages_per_second`` with bursts of up to ``burst_size``), and each
+    chat additionally gets at most one message per ``per_chat_interval`` seconds;
+    messages for a chat that is not ready yet wait aside without blocking others.
+    Messages for one chat go out strictly in order: the next one is handed to a
+    worker only after the previous one has finished, and the chat's interval is
+    counted from the moment a message is actually handed over.
+
+    Flood-waits (TelegramRetryAfter) pause the bucket for the requested time and put
+    the message back at the head of its chat; the target rate is halved on floods
+    and raised again in small steps once no flood has been seen for a cooldown
+    period (AIMD). Chats that have blocked the bot (TelegramForbiddenError) are
+    reported to ``on_chat_unreachable``.
+    ``on_message_done(message, sent, error)`` is called once per message when it was
+    finally sent or given up on.
+    """
+
+    MAX_FLOOD_RETRIES = 3
+    RATE_DECREASE_FACTOR = 0.5
+    MIN_RATE_FACTOR = 0.1
+    RATE_RECOVERY_COOLDOWN = 30.0
+    RATE_RECOVERY_STEP_INTERVAL = 5.0
+    RATE_RECOVERY_STEP_FACTOR = 0.1
+
+    def __init__(
+        self,
+        messages_per_second: float,
+        burst_size: int = 5,
+        workers: int = 1,
+        per_chat_interval: float = 0.0,
+        on_chat_unreachable: Optional[Callable[[int], None]] = None,
+        on_message_done: Optional[Callable[[QueuedMessage, bool, Optional[str]], None]] = None,
+    ):
         self.messages_per_second = messages_per_second
+        self.current_rate = messages_per_second
+        self.on_chat_unreachable = on_chat_unreachable
+        self.on_message_done = on_message_done
         self.burst_size = burst_size
-        self.queue: deque[QueuedMessage] = deque()
-        self.last_send_times: deque[datetime] = deque()
+        self.workers = max(workers, 1)
+        self.per_chat_interval = per_chat_interval
+        self.bucket = TokenBucket(messages_per_second, burst_size)
+        self.last_send_times: deque[float] = deque()
         self.is_processing = False
-        self.delay_between_messages = 1.0 / messages_per_second
         self.total_sent = 0
         self.total_failed = 0
-        
+        self.total_blocked = 0
+        self.total_flood_waits = 0
+        self._last_flood_at = 0.0
+        self._last_rate_change_at = 0.0
+
+        # Waiting messages per chat, in arrival order. A chat is in exactly one of:
+        # _ready_chats (may send now), _waiting_chats heap (slot in the future, as
+        # (ready_at, seq, chat_id)), _busy_chats (a message is with a worker), or
+        # none of them when it has nothing queued.
+        self._chat_queues: Dict[int, deque[QueuedMessage]] = {}
+        self._queued_count = 0
+        self._ready_chats: deque[int] = deque()
+        self._waiting_chats: List[Tuple[float, int, int]] = []
+        self._waiting_seq = itertools.count()
+        self._busy_chats: Set[int] = set()
+        self._chat_next_at: Dict[int, float] = {}
+        self._send_queue: Optional[asyncio.Queue] = None
+        self._free_workers: Optional[asyncio.Semaphore] = None
+        self._wakeup = asyncio.Event()
+        self._scheduler_task: Optional[asyncio.Task] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._in_flight = 0
+
+    def __len__(self) -> int:
+        return self._queued_count
+
     async def add_message(self, message: QueuedMessage) -> None:
         """Add message to queue"""
-        self.queue.append(message)
-        if not self.is_processing:
-            asyncio.create_task(self._process_queue())
-    
-    async def _process_queue(self) -> None:
-        """Process messages from queue with rate limiting"""
-        if self.is_processing:
-            return
-            
+        chat_queue = self._chat_queues.setdefault(message.chat_id, deque())
+        chat_queue.append(message)
+        self._queued_count += 1
+        if len(chat_queue) == 1 and message.chat_id not in self._busy_chats:
+            self._activate_chat(message.chat_id, time.monotonic())
         self.is_processing = True
-        
+        self._ensure_started()
+        self._wakeup.set()
+
+    def _ensure_started(self) -> None:
+        if self._scheduler_task is None or self._scheduler_task.done():
+            self._send_queue = asyncio.Queue()
+            self._free_workers = asyncio.Semaphore(self.workers)
+            self._worker_tasks = [
+                asyncio.create_task(self._worker())
+                for _ in range(self.workers)
+            ]
+            self._scheduler_task = asyncio.create_task(self._schedule())
+
+    def _activate_chat(self, chat_id: int, now: float) -> None:
+        """Make a chat with queued messages and nothing in flight eligible again."""
+        ready_at = self._chat_next_at.get(chat_id, 0.0)
+        if ready_at <= now:
+            self._ready_chats.append(chat_id)
+        else:
+            heapq.heappush(
+                self._waiting_chats, (ready_at, next(self._waiting_seq), chat_id))
+
+    def _promote_due_chats(self, now: float) -> Optional[float]:
+        """Move chats whose slot has come to the ready list.
+
+        Returns seconds until the next waiting chat, or None if none is waiting.
+        """
+        while self._waiting_chats and self._waiting_chats[0][0] <= now:
+            self._ready_chats.append(heapq.heappop(self._waiting_chats)[2])
+        if self._waiting_chats:
+            return self._waiting_chats[0][0] - now
+        return None
+
+    def _take_ready_message(self, now: float) -> QueuedMessage:
+        """Hand the next ready chat's head message out and book the chat's next slot."""
+        chat_id = self._ready_chats.popleft()
+        chat_queue = self._chat_queues[chat_id]
+        message = chat_queue.popleft()
+        if not chat_queue:
+            del self._chat_queues[chat_id]
+        self._queued_count -= 1
+        self._busy_chats.add(chat_id)
+        if self.per_chat_interval > 0:
+            self._chat_next_at[chat_id] = now + self.per_chat_interval
+            if len(self._chat_next_at) > 10000:
+                self._chat_next_at = {
+                    cid: next_at
+                    for cid, next_at in self._chat_next_at.items()
+                    if next_at > now
+                }
+        return message
+
+    def _finish_chat(self, chat_id: int) -> None:
+        self._busy_chats.discard(chat_id)
+        if chat_id in self._chat_queues:
+            self._activate_chat(chat_id, time.monotonic())
+
+    async def _schedule(self) -> None:
+        """Release messages to the workers at the permitted rate"""
+        while True:
+            # Only pick a message once a worker can take it right away, so the
+            # chat slot booked below matches the real dispatch time.
+            await self._free_workers.acquire()
+            while True:
+                wait_time = self._promote_due_chats(time.monotonic())
+                if self._ready_chats:
+                    break
+                if wait_time is None and self._in_flight == 0:
+                    self.is_processing = False
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait_time)
+                except asyncio.TimeoutError:
+                    pass
+            await self.bucket.acquire()
+            now = time.monotonic()
+            self._promote_due_chats(now)
+            message = self._take_ready_message(now)
+            self._in_flight += 1
+            self._send_queue.put_nowait(message)
+
+    async def _worker(self) -> None:
+        while True:
+            message = await self._send_queue.get()
+            try:
+                await self._deliver(message)
+            finally:
+                self._in_flight -= 1
+                self._send_queue.task_done()
+                self._finish_chat(message.chat_id)
+                self._free_workers.release()
+                self._wakeup.set()
+
+    async def _deliver(self, message: QueuedMessage) -> None:
+        """Send one message and account for the outcome"""
+        outcome = await self._attempt_delivery(message)
+        if outcome is not None and self.on_message_done:
+            sent, error = outcome
+            try:
+                self.on_message_done(message, sent, error)
+            except Exception as e:
+                logging.error(f"Message outcome hook failed for {message.chat_id}: {e}")
+
+    async def _attempt_delivery(
+        self, message: QueuedMessage
+    ) -> Optional[Tuple[bool, Optional[str]]]:
+        """Returns (sent, error), or None when the message was re-scheduled."""
         try:
-            while self.queue:
-                # Check if we need to wait
-                await self._wait_if_needed()
-                
-                # Get and process next message
-                message = self.queue.popleft()
+            await self._send_message(message)
+            self._record_send_time()
+            return True, None
+
+        except TelegramRetryAfter as exc:
+            if self._on_flood_wait(message, exc.retry_after):
+                return None
+            return False, f"flood-wait retries exhausted: {exc.message}"
+
+        except TelegramForbiddenError as exc:
+            self.total_failed += 1
+            self.total_blocked += 1
+            logging.info(f"Chat {message.chat_id} is unreachable: {exc.message}")
+            if self.on_chat_unreachable:
                 try:
-                    await self._send_message(message)
-                    self._record_send_time()
-                    
-                except TelegramBadRequest as exc:
-                    fallback_message = self._build_profile_link_fallback(message, exc)
-                    if fallback_message:
-                        logging.warning(
-                            "Telegram rejected profile buttons for chat %s: %s. "
-                            "Retrying without tg:// links.",
-                            message.chat_id,
-                            getattr(exc, "message", "") or str(exc),
-                        )
-                        try:
-                            await self._send_message(fallback_message)
-                            self._record_send_time()
-                            continue
-                        except Exception as retry_exc:
-                            self.total_failed += 1
-                            logging.error(
-                                f"Failed to send fallback message to {message.chat_id}: {retry_exc}"
-                            )
-                            continue
-                    
-                    self.total_failed += 1
-                    logging.error(f"Failed to send queued message to {message.chat_id}: {exc}")
-                    
+                    self.on_chat_unreachable(message.chat_id)
                 except Exception as e:
+                    logging.error(f"Failed to report unreachable chat {message.chat_id}: {e}")
+            return False, f"forbidden: {exc.message}"
+
+        except TelegramBadRequest as exc:
+            fallback_message = self._build_profile_link_fallback(message, exc)
+            if fallback_message:
+                logging.warning(
+                    "Telegram rejected profile buttons for chat %s: %s. "
+                    "Retrying without tg:// links.",
+                    message.chat_id,
+                    getattr(exc, "message", "") or str(exc),
+                )
+                try:
+                    await self._send_message(fallback_message)
+                    self._record_send_time()
+                    return True, None
+                except Exception as retry_exc:
                     self.total_failed += 1
-                    logging.error(f"Failed to send queued message to {message.chat_id}: {e}")
-                    
-        finally:
-            self.is_processing = False
-    
-    async def _wait_if_needed(self) -> None:
-        """Wait if we need to respect rate limits"""
-        if not self.last_send_times:
+                    logging.error(
+                        f"Failed to send fallback message to {message.chat_id}: {retry_exc}"
+                    )
+                    return False, str(retry_exc)
+
+            self.total_failed += 1
+            logging.error(f"Failed to send queued message to {message.chat_id}: {exc}")
+            return False, str(exc)
+
+        except Exception as e:
+            self.total_failed += 1
+            logging.error(f"Failed to send queued message to {message.chat_id}: {e}")
+            return False, str(e)
+
+    def _on_flood_wait(self, message: QueuedMessage, retry_after: float) -> bool:
+        """Pause sending, slow down and put the message back for a later attempt.
+
+        Returns False when the message has used up its retries.
+        """
+        now = time.monotonic()
+        self.total_flood_waits += 1
+        self._last_flood_at = now
+        self.bucket.pause(retry_after)
+
+        min_rate = self.messages_per_second * self.MIN_RATE_FACTOR
+        # Concurrent workers tend to hit the same flood; decrease once per window.
+        if now - self._last_rate_change_at >= 1.0 and self.current_rate > min_rate:
+            self.current_rate = max(min_rate, self.current_rate * self.RATE_DECREASE_FACTOR)
+            self.bucket.set_rate(self.current_rate)
+            self._last_rate_change_at = now
+            logging.warning(
+                f"Telegram flood-wait {retry_after}s for chat {message.chat_id}; "
+                f"queue rate lowered to {self.current_rate:.2f} msg/s"
+            )
+
+        if message.attempts >= self.MAX_FLOOD_RETRIES:
+            self.total_failed += 1
+            logging.error(
+                f"Dropping message to {message.chat_id} after {message.attempts} flood-wait retries"
+            )
+            return False
+        message.attempts += 1
+        # Back to the head of its chat: the chat stays busy until this delivery
+        # returns, and then waits out the flood before anything else goes to it.
+        self._chat_next_at[message.chat_id] = max(
+            self._chat_next_at.get(message.chat_id, 0.0), now + retry_after)
+        self._chat_queues.setdefault(message.chat_id, deque()).appendleft(message)
+        self._queued_count += 1
+        self._wakeup.set()
+        return True
+
+    def _maybe_recover_rate(self, now: float) -> None:
+        """Additive increase back towards the configured rate after a quiet period"""
+        if self.current_rate >= self.messages_per_second:
             return
-            
-        # Calculate time since last message
-        time_since_last = (datetime.now() - self.last_send_times[-1]).total_seconds()
-        
-        if time_since_last < self.delay_between_messages:
-            wait_time = self.delay_between_messages - time_since_last
-            await asyncio.sleep(wait_time)
+        if now - self._last_flood_at < self.RATE_RECOVERY_COOLDOWN:
+            return
+        if now - self._last_rate_change_at < self.RATE_RECOVERY_STEP_INTERVAL:
+            return
+        self.current_rate = min(
+            self.messages_per_second,
+            self.current_rate + self.messages_per_second * self.RATE_RECOVERY_STEP_FACTOR,
+        )
+        self.bucket.set_rate(self.current_rate)
+        self._last_rate_change_at = now
+        logging.info(f"Queue rate raised to {self.current_rate:.2f} msg/s")
 
     def _record_send_time(self) -> None:
-        """Track sent message timestamps and purge old entries for rate limiting."""
-        now = datetime.now()
+        """Track sent message timestamps and purge old entries for stats."""
+        now = time.monotonic()
         self.last_send_times.append(now)
         self.total_sent += 1
+        self._maybe_recover_rate(now)
 
-        cutoff_time = now - timedelta(seconds=60)
+        cutoff_time = now - 60
         while self.last_send_times and self.last_send_times[0] < cutoff_time:
             self.last_send_times.popleft()
 
+    async def close(self, timeout: float = 5.0) -> None:
+        """Give pending messages a moment to go out, then stop the tasks."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self.is_processing and loop.time() < deadline:
+            await asyncio.sleep(0.1)
+        tasks = [t for t in [self._scheduler_task, *self._worker_tasks] if t]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._scheduler_task = None
+        self._worker_tasks = []
+        self.is_processing = False
+        if len(self):
+            logging.warning(
+                f"Message queue closed with {len(self)} unsent messages.")
+
     def _build_profile_link_fallback(
         self, message: QueuedMessage, exc: Exception
     ) -> Optional[QueuedMessage]:
@@ -141,8 +430,24 @@ class MessageQueue:
 class TelegramMessageQueue(MessageQueue):
     """Telegram-specific message queue"""
     
-    def __init__(self, bot: Bot, messages_per_second: float, burst_size: int = 5):
-        super().__init__(messages_per_second, burst_size)
+    def __init__(
+        self,
+        bot: Bot,
+        messages_per_second: float,
+        burst_size: int = 5,
+        workers: int = 1,
+        per_chat_interval: float = 0.0,
+        on_chat_unreachable: Optional[Callable[[int], None]] = None,
+        on_message_done: Optional[Callable[[QueuedMessage, bool, Optional[str]], None]] = None,
+    ):
+        super().__init__(
+            messages_per_second,
+            burst_size,
+            workers,
+            per_chat_interval,
+            on_chat_unreachable,
+            on_message_done,
+        )
         self.bot = bot
     
     async def _send_message(self, message: QueuedMessage) -> Any:
@@ -160,125 +465,151 @@ class TelegramMessageQueue(MessageQueue):
 class MessageQueueManager:
     """Manager for different types of message queues"""
     
-    def __init__(self, bot: Bot):
+    UNREACHABLE_FLUSH_DELAY = 2.0
+
+    def __init__(
+        self,
+        bot: Bot,
+        unreachable_handler: Optional[Callable[[List[int]], Awaitable[None]]] = None,
+    ):
         self.bot = bot
+        self.unreachable_handler = unreachable_handler
+        self._unreachable_pending: set = set()
+        self._unreachable_flush_task: Optional[asyncio.Task] = None
+        # Optional durable store (bot/services/persistent_message_queue.py)
+        self.persistent_queue = None
+        self._result_listeners: List[Callable[[QueuedMessage, bool, Optional[str]], None]] = []
         
         # Different queues for different types of chats
         self.group_queue = TelegramMessageQueue(
             bot=bot,
-            messages_per_second=15/60,  # 15 messages per minute for groups
-            burst_size=3
+            messages_per_second=1,  # across all groups
+            burst_size=3,
+            workers=2,
+            per_chat_interval=3.0,  # 20 messages per minute per group
+            on_message_done=self._on_message_done,
         )
         
         self.user_queue = TelegramMessageQueue(
             bot=bot, 
             messages_per_second=25,  # 25 messages per second for users
-            burst_size=10
+            burst_size=10,
+            workers=8,
+            per_chat_interval=1.0,  # 1 message per second per private chat
+            on_chat_unreachable=self._report_unreachable,
+            on_message_done=self._on_message_done,
         )
     
+    def attach_persistent_queue(self, persistent_queue) -> None:
+        """Route new messages through a durable queue instead of memory"""
+        self.persistent_queue = persistent_queue
+
+    def add_result_listener(
+        self, listener: Callable[[QueuedMessage, bool, Optional[str]], None]
+    ) -> None:
+        """Subscribe to final outcomes (sent or given up) of queued messages"""
+        self._result_listeners.append(listener)
+
+    def _on_message_done(
+        self, message: QueuedMessage, sent: bool, error: Optional[str]
+    ) -> None:
+        if message.outbox_id is not None and self.persistent_queue:
+            self.persistent_queue.report_result(message.outbox_id, sent, error)
+        for listener in self._result_listeners:
+            try:
+                listener(message, sent, error)
+            except Exception as e:
+                logging.error(f"Queue result listener failed: {e}", exc_info=True)
+
+    def _queue_for_chat(self, chat_id: int) -> "TelegramMessageQueue":
+        return self.group_queue if self._is_group_chat(chat_id) else self.user_queue
+
+    async def dispatch(self, message: QueuedMessage) -> None:
+        """Put a message straight onto the in-memory rate-limited queue"""
+        await self._queue_for_chat(message.chat_id).add_message(message)
+
+    async def enqueue_many(self, messages: List[QueuedMessage]) -> None:
+        """Queue a batch of prepared calls (one INSERT in persistent mode)"""
+        if not messages:
+            return
+        if self.persistent_queue and await self.persistent_queue.enqueue_many(messages):
+            return
+        for message in messages:
+            await self.dispatch(message)
+
+    async def _enqueue(self, chat_id: int, method_name: str, kwargs: Dict[str, Any]) -> None:
+        if self.persistent_queue and await self.persistent_queue.enqueue(
+            chat_id, method_name, kwargs
+        ):
+            return
+        await self.dispatch(
+            QueuedMessage(chat_id=chat_id, method_name=method_name, kwargs=kwargs)
+        )
+
+    def _report_unreachable(self, chat_id: int) -> None:
+        """Collect users who blocked the bot and hand them over in batches"""
+        if not self.unreachable_handler or chat_id <= 0:
+            return
+        self._unreachable_pending.add(chat_id)
+        if self._unreachable_flush_task is None or self._unreachable_flush_task.done():
+            self._unreachable_flush_task = asyncio.create_task(
+                self._flush_unreachable(delay=self.UNREACHABLE_FLUSH_DELAY))
+
+    async def _flush_unreachable(self, delay: float = 0.0) -> None:
+        if delay:
+            await asyncio.sleep(delay)
+        chat_ids = list(self._unreachable_pending)
+        self._unreachable_pending.clear()
+        if not chat_ids:
+            return
+        try:
+            await self.unreachable_handler(chat_ids)
+        except Exception as e:
+            logging.error(f"Failed to mark {len(chat_ids)} unreachable users: {e}", exc_info=True)
+
     def _is_group_chat(self, chat_id: int) -> bool:
         """Check if chat_id belongs to a group or channel"""
         return str(chat_id).startswith('-100')
     
     async def send_message(self, chat_id: int, **kwargs) -> None:
         """Queue a send_message call"""
-        queue = self.group_queue if self._is_group_chat(chat_id) else self.user_queue
-        message = QueuedMessage(
-            chat_id=chat_id,
-            method_name='send_message',
-            kwargs=kwargs
-        )
-        await queue.add_message(message)
+        await self._enqueue(chat_id, 'send_message', kwargs)
     
     async def edit_message_text(self, chat_id: int, **kwargs) -> None:
         """Queue an edit_message_text call"""
-        queue = self.group_queue if self._is_group_chat(chat_id) else self.user_queue
-        message = QueuedMessage(
-            chat_id=chat_id,
-            method_name='edit_message_text',
-            kwargs=kwargs
-        )
-        await queue.add_message(message)
+        await self._enqueue(chat_id, 'edit_message_text', kwargs)
     
     async def send_document(self, chat_id: int, **kwargs) -> None:
         """Queue a send_document call"""
-        queue = self.group_queue if self._is_group_chat(chat_id) else self.user_queue
-        message = QueuedMessage(
-            chat_id=chat_id,
-            method_name='send_document',
-            kwargs=kwargs
-        )
-        await queue.add_message(message)
+        await self._enqueue(chat_id, 'send_document', kwargs)
     
     async def send_photo(self, chat_id: int, **kwargs) -> None:
         """Queue a send_photo call"""
-        queue = self.group_queue if self._is_group_chat(chat_id) else self.user_queue
-        message = QueuedMessage(
-            chat_id=chat_id,
-            method_name='send_photo',
-            kwargs=kwargs
-        )
-        await queue.add_message(message)
+        await self._enqueue(chat_id, 'send_photo', kwargs)
 
     async def send_video(self, chat_id: int, **kwargs) -> None:
         """Queue a send_video call"""
-        queue = self.group_queue if self._is_group_chat(chat_id) else self.user_queue
-        message = QueuedMessage(
-            chat_id=chat_id,
-            method_name='send_video',
-            kwargs=kwargs
-        )
-        await queue.add_message(message)
+        await self._enqueue(chat_id, 'send_video', kwargs)
 
     async def send_animation(self, chat_id: int, **kwargs) -> None:
         """Queue a send_animation (GIF) call"""
-        queue = self.group_queue if self._is_group_chat(chat_id) else self.user_queue
-        message = QueuedMessage(
-            chat_id=chat_id,
-            method_name='send_animation',
-            kwargs=kwargs
-        )
-        await queue.add_message(message)
+        await self._enqueue(chat_id, 'send_animation', kwargs)
 
     async def send_audio(self, chat_id: int, **kwargs) -> None:
         """Queue a send_audio call"""
-        queue = self.group_queue if self._is_group_chat(chat_id) else self.user_queue
-        message = QueuedMessage(
-            chat_id=chat_id,
-            method_name='send_audio',
-            kwargs=kwargs
-        )
-        await queue.add_message(message)
+        await self._enqueue(chat_id, 'send_audio', kwargs)
 
     async def send_voice(self, chat_id: int, **kwargs) -> None:
         """Queue a send_voice call"""
-        queue = self.group_queue if self._is_group_chat(chat_id) else self.user_queue
-        message = QueuedMessage(
-            chat_id=chat_id,
-            method_name='send_voice',
-            kwargs=kwargs
-        )
-        await queue.add_message(message)
+        await self._enqueue(chat_id, 'send_voice', kwargs)
 
     async def send_sticker(self, chat_id: int, **kwargs) -> None:
         """Queue a send_sticker call"""
-        queue = self.group_queue if self._is_group_chat(chat_id) else self.user_queue
-        message = QueuedMessage(
-            chat_id=chat_id,
-            method_name='send_sticker',
-            kwargs=kwargs
-        )
-        await queue.add_message(message)
+        await self._enqueue(chat_id, 'send_sticker', kwargs)
 
     async def send_video_note(self, chat_id: int, **kwargs) -> None:
         """Queue a send_video_note call"""
-        queue = self.group_queue if self._is_group_chat(chat_id) else self.user_queue
-        message = QueuedMessage(
-            chat_id=chat_id,
-            method_name='send_video_note',
-            kwargs=kwargs
-        )
-        await queue.add_message(message)
+        await self._enqueue(chat_id, 'send_video_note', kwargs)
     
     async def answer_callback_query(self, callback_query_id: str, **kwargs) -> None:
         """Send callback query answer immediately (not rate limited)"""
@@ -287,8 +618,8 @@ class MessageQueueManager:
     def get_queue_stats(self) -> Dict[str, Any]:
         """Get statistics about queues"""
         return {
-            "group_queue_size": len(self.group_queue.queue),
-            "user_queue_size": len(self.user_queue.queue),
+            "group_queue_size": len(self.group_queue),
+            "user_queue_size": len(self.user_queue),
             "group_queue_processing": self.group_queue.is_processing,
             "user_queue_processing": self.user_queue.is_processing,
             "group_recent_sends": len(self.group_queue.last_send_times),
@@ -297,17 +628,33 @@ class MessageQueueManager:
             "user_failed_messages": self.user_queue.total_failed,
             "group_sent_messages": self.group_queue.total_sent,
             "user_sent_messages": self.user_queue.total_sent,
+            "user_blocked_messages": self.user_queue.total_blocked,
+            "user_flood_waits": self.user_queue.total_flood_waits,
+            "user_current_rate": self.user_queue.current_rate,
+            "group_flood_waits": self.group_queue.total_flood_waits,
+            "group_current_rate": self.group_queue.current_rate,
         }
 
+    async def close(self) -> None:
+        """Stop queue workers, letting already queued messages drain briefly"""
+        await asyncio.gather(self.user_queue.close(), self.group_queue.close())
+        if self._unreachable_flush_task and not self._unreachable_flush_task.done():
+            self._unreachable_flush_task.cancel()
+        if self.unreachable_handler:
+            await self._flush_unreachable()
+
 
 # Global queue manager instance
 _queue_manager: Optional[MessageQueueManager] = None
 
 
-def init_queue_manager(bot: Bot) -> MessageQueueManager:
+def init_queue_manager(
+    bot: Bot,
+    unreachable_handler: Optional[Callable[[List[int]], Awaitable[None]]] = None,
+) -> MessageQueueManager:
     """Initialize global queue manager"""
     global _queue_manager
-    _queue_manager = MessageQueueManager(bot)
+    _queue_manager = MessageQueueManager(bot, unreachable_handler)
     return _queue_manager
 
 
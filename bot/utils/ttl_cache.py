@@ -0,0 +1,143 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """Bounded in-memory LRU cache whose entries expire after ``ttl_seconds``.
+
+    Intended for process-local caching of hot, rarely changing values. Not
+    shared between processes; callers are responsible for invalidating keys
+    they write.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl_seconds: float = 60.0):
+        self.maxsize = max(int(maxsize), 1)
+        self.ttl_seconds = float(ttl_seconds)
+        self._data: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """Return the cached value or None when missing or expired."""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: V, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl <= 0:
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def configure(self, maxsize: Optional[int] = None, ttl_seconds: Optional[float] = None) -> None:
+        """Adjust limits at runtime (e.g. from settings on startup)."""
+        if maxsize is not None:
+            self.maxsize = max(int(maxsize), 1)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        if ttl_seconds is not None:
+            self.ttl_seconds = float(ttl_seconds)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class AsyncTTLCache(TTLCache[V]):
+    """TTLCache with async read-through loading and single-flight de-duplication.
+
+    Concurrent ``get_or_load`` calls for the same missing key share one loader
+    call. ``None`` results are returned but not cached. Invalidating a key while
+    its load is in flight prevents that (possibly stale) result from being stored.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl_seconds: float = 60.0):
+        super().__init__(maxsize=maxsize, ttl_seconds=ttl_seconds)
+        self._in_flight: Dict[Hashable, "asyncio.Task[Optional[V]]"] = {}
+        self.shared_loads = 0
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Optional[V]]],
+        ttl_seconds: Optional[float] = None,
+    ) -> Optional[V]:
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, loader, ttl_seconds))
+            self._in_flight[key] = task
+        else:
+            self.shared_loads += 1
+        # Shielded so that a cancelled caller does not cancel the load for others.
+        return await asyncio.shield(task)
+
+    async def _load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Optional[V]]],
+        ttl_seconds: Optional[float],
+    ) -> Optional[V]:
+        current_task = asyncio.current_task()
+        try:
+            value = await loader()
+            if value is not None and self._in_flight.get(key) is current_task:
+                self.set(key, value, ttl_seconds)
+            return value
+        finally:
+            if self._in_flight.get(key) is current_task:
+                del self._in_flight[key]
+
+    def invalidate(self, key: Hashable) -> None:
+        super().invalidate(key)
+        self._in_flight.pop(key, None)
+
+    def clear(self) -> None:
+        super().clear()
+        self._in_flight.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = super().get_stats()
+        stats["in_flight"] = len(self._in_flight)
+        stats["shared_loads"] = self.shared_loads
+        return stats
+
@@ -149,6 +149,21 @@ class Settings(BaseSettings):
 
     PANEL_API_URL: Optional[str] = None
     PANEL_API_KEY: Optional[str] = None
+    PANEL_API_TIMEOUT_SECONDS: float = Field(default=30.0, description="Total timeout of a single panel API request")
+    PANEL_API_MAX_RETRIES: int = Field(default=2, description="Retries of a panel API call after a transient failure (connection error, timeout, 5xx, 429)")
+    PANEL_API_RETRY_BASE_DELAY_SECONDS: float = Field(default=0.3, description="Base delay of the jittered exponential backoff between panel API retries")
+    PANEL_API_RETRY_MAX_DELAY_SECONDS: float = Field(default=3.0, description="Upper bound of a single backoff delay between panel API retries")
+    PANEL_API_CIRCUIT_FAILURE_THRESHOLD: int = Field(default=5, description="Consecutive panel API failures that open the circuit breaker")
+    PANEL_API_CIRCUIT_RECOVERY_SECONDS: float = Field(default=30.0, description="How long panel API calls fail fast before a probe request is allowed")
+    PANEL_API_LOG_FULL_RESPONSE_SAMPLE_RATE: float = Field(default=0.1, description="Share (0..1) of panel calls requesting full response logging whose body is actually logged; error responses are always logged")
+    PANEL_API_HEDGE_DELAY_MS: int = Field(default=0, description="Send a duplicate GET to the panel if the first has not answered within this many ms (0 disables hedging)")
+
+    HTTP_POOL_LIMIT: int = Field(default=100, description="Maximum simultaneous connections per outbound HTTP client (panel, payment providers)")
+    HTTP_POOL_LIMIT_PER_HOST: int = Field(default=30, description="Maximum simultaneous connections to a single host per HTTP client")
+    HTTP_KEEPALIVE_TIMEOUT_SECONDS: float = Field(default=30.0, description="How long idle keep-alive connections stay in the pool")
+    HTTP_DNS_CACHE_TTL_SECONDS: int = Field(default=300, description="How long resolved host addresses are cached")
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = Field(default=5.0, description="Timeout for acquiring a pooled connection and for establishing a new one")
+    HTTP_READ_TIMEOUT_SECONDS: float = Field(default=20.0, description="Timeout between reads from an open connection")
     USER_TRAFFIC_LIMIT_GB: Optional[float] = Field(default=0.0)
     USER_TRAFFIC_STRATEGY: str = Field(default="NO_RESET")
     USER_SQUAD_UUIDS: Optional[str] = Field(
@@ -166,6 +181,85 @@ class Settings(BaseSettings):
 
     CRYPT4_ENABLED: bool = Field(default=False, description="Enable happ crypt4 encryption for subscription URLs")
     CRYPT4_REDIRECT_URL: Optional[str] = Field(default=None, description="Base redirect URL used for the connect button when crypt4 is enabled")
+    CRYPT4_CACHE_TTL_SECONDS: int = Field(default=3600, description="How long encrypted crypt4 links are cached per raw link (0 disables caching)")
+    CRYPT4_CACHE_MAX_SIZE: int = Field(default=10000, description="Maximum number of cached encrypted crypt4 links")
+
+    USER_CACHE_TTL_SECONDS: int = Field(
+        default=60,
+        description="Lifetime of cached hot user attributes (ban flag, language, channel check); 0 disables the cache")
+    USER_CACHE_MAX_SIZE: int = Field(
+        default=10000,
+        description="Maximum number of users kept in the in-memory attribute cache")
+    PANEL_USER_CACHE_TTL_SECONDS: float = Field(
+        default=5.0,
+        description="Lifetime of cached panel user objects and HWID device lists per user uuid; 0 disables the cache")
+    PANEL_USER_CACHE_MAX_SIZE: int = Field(
+        default=5000,
+        description="Maximum number of panel users (and device lists) kept in the cache")
+
+    ACTION_LOG_QUEUE_SIZE: int = Field(
+        default=10000,
+        description="Maximum number of action log records buffered in memory before new ones are dropped")
+    ACTION_LOG_BATCH_SIZE: int = Field(
+        default=200,
+        description="Maximum number of action log records written with one INSERT")
+    ACTION_LOG_FLUSH_INTERVAL_MS: int = Field(
+        default=500,
+        description="How long the action log writer waits to fill a batch before flushing")
+
+    MESSAGE_QUEUE_PERSISTENT: bool = Field(
+        default=False,
+        description="Store outbound queued messages in PostgreSQL so they survive restarts")
+    MESSAGE_QUEUE_CLAIM_BATCH_SIZE: int = Field(
+        default=200,
+        description="How many stored messages a bot instance claims at once")
+    MESSAGE_QUEUE_LEASE_SECONDS: int = Field(
+        default=300,
+        description="After this time messages claimed by a crashed instance are retried")
+
+    PANEL_SYNC_CONCURRENCY: int = Field(
+        default=10,
+        description="Maximum number of concurrent panel API calls made by the panel sync")
+    PANEL_SYNC_INCREMENTAL: bool = Field(
+        default=True,
+        description="Only apply panel users whose relevant fields changed since the previous sync")
+    PANEL_FULL_SYNC_INTERVAL_HOURS: int = Field(
+        default=24,
+        description="How often an incremental sync is promoted to a full reconcile")
+
+    BACKGROUND_TASKS_MAX_CONCURRENCY: int = Field(
+        default=50,
+        description="Maximum number of background side-effect tasks (e.g. payment notifications) running at once")
+    BACKGROUND_TASKS_SHUTDOWN_TIMEOUT_SECONDS: float = Field(
+        default=15.0,
+        description="How long shutdown waits for pending background tasks before cancelling them")
+
+    PAYMENT_WEBHOOK_INBOX_ENABLED: bool = Field(
+        default=True,
+        description="Store verified payment webhooks and acknowledge them before processing in background workers")
+    PAYMENT_WEBHOOK_WORKERS: int = Field(
+        default=4,
+        description="Number of workers processing stored payment webhook events")
+    PAYMENT_WEBHOOK_MAX_ATTEMPTS: int = Field(
+        default=8,
+        description="Processing attempts before a payment webhook event is marked as failed")
+    PAYMENT_WEBHOOK_RETENTION_DAYS: int = Field(
+        default=30,
+        description="How long handled payment webhook events are kept for replay and audit (0 keeps them forever)")
+
+    ADMIN_STATS_REFRESH_INTERVAL_SECONDS: int = Field(
+        default=300,
+        description="How often the cached admin statistics snapshot is recomputed (0 computes it on demand only)")
+
+    MESSAGE_LOGS_RETENTION_DAYS: int = Field(
+        default=0,
+        description="Drop monthly message log partitions older than this many days (0 keeps logs forever)")
+    MESSAGE_LOGS_PARTITIONS_AHEAD: int = Field(
+        default=3,
+        description="How many future monthly message log partitions to keep created")
+    MESSAGE_LOGS_ARCHIVE_DIR: Optional[str] = Field(
+        default=None,
+        description="Directory where expired message log partitions are saved as gzipped CSV before being dropped")
 
     WEB_SERVER_HOST: str = Field(default="0.0.0.0")
     WEB_SERVER_PORT: int = Field(default=8080)
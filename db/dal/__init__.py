@@ -6,6 +6,9 @@ from . import panel_sync_dal
 from . import message_log_dal
 from . import user_billing_dal
 from . import ad_dal
+from . import outbound_message_dal
+from . import broadcast_dal
+from . import payment_webhook_inbox_dal
 
 __all__ = (
     "user_dal",
@@ -16,6 +19,9 @@ __all__ = (
     "message_log_dal",
     "user_billing_dal",
     "ad_dal",
+    "outbound_message_dal",
+    "broadcast_dal",
+    "payment_webhook_inbox_dal",
 )
 
 
@@ -0,0 +1,87 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import Broadcast
+
+STATUS_QUEUING = "queuing"
+STATUS_SENDING = "sending"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+
+
+async def create_broadcast(session: AsyncSession,
+                           broadcast_data: Dict[str, Any]) -> Broadcast:
+    broadcast = Broadcast(**broadcast_data)
+    session.add(broadcast)
+    await session.flush()
+    await session.refresh(broadcast)
+    return broadcast
+
+
+async def get_broadcast(session: AsyncSession,
+                        broadcast_id: int) -> Optional[Broadcast]:
+    return await session.get(Broadcast, broadcast_id)
+
+
+async def increment_broadcast_counters(session: AsyncSession,
+                                       broadcast_id: int,
+                                       queued: int = 0,
+                                       sent: int = 0,
+                                       failed: int = 0,
+                                       blocked: int = 0) -> None:
+    """Atomically add to the counters (safe with several bot instances)."""
+    if not any((queued, sent, failed, blocked)):
+        return
+    await session.execute(
+        update(Broadcast)
+        .where(Broadcast.broadcast_id == broadcast_id)
+        .values(
+            queued_count=Broadcast.queued_count + queued,
+            sent_count=Broadcast.sent_count + sent,
+            failed_count=Broadcast.failed_count + failed,
+            blocked_count=Broadcast.blocked_count + blocked,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def finish_queuing(session: AsyncSession, broadcast_id: int,
+                         total_recipients: int) -> None:
+    await session.execute(
+        update(Broadcast)
+        .where(Broadcast.broadcast_id == broadcast_id)
+        .values(status=STATUS_SENDING, total_recipients=total_recipients)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def complete_if_delivered(session: AsyncSession, broadcast_id: int) -> bool:
+    """Mark the broadcast completed once every queued message has an outcome."""
+    result = await session.execute(
+        update(Broadcast)
+        .where(
+            Broadcast.broadcast_id == broadcast_id,
+            Broadcast.status == STATUS_SENDING,
+            Broadcast.sent_count + Broadcast.failed_count + Broadcast.blocked_count
+            >= Broadcast.queued_count,
+        )
+        .values(status=STATUS_COMPLETED, finished_at=datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
+    )
+    return (result.rowcount or 0) > 0
+
+
+async def set_broadcast_status(session: AsyncSession, broadcast_id: int,
+                               status: str) -> None:
+    values: Dict[str, Any] = {"status": status}
+    if status in (STATUS_COMPLETED, STATUS_FAILED):
+        values["finished_at"] = datetime.now(timezone.utc)
+    await session.execute(
+        update(Broadcast)
+        .where(Broadcast.broadcast_id == broadcast_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
@@ -1,10 +1,11 @@
 import logging
-from typing import Optional, List
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import func, or_
+from sqlalchemy import func, or_, insert, text
 
 from ..models import MessageLog, User
+from .pagination import KeysetCursor, KeysetPage, estimate_row_count, fetch_keyset_page
 
 
 async def create_message_log(session: AsyncSession,
@@ -30,10 +31,15 @@ async def get_all_message_logs(session: AsyncSession, limit: int,
     return result.scalars().all()
 
 
-async def count_all_message_logs(session: AsyncSession) -> int:
-    stmt = select(func.count()).select_from(MessageLog)
-    result = await session.execute(stmt)
-    return result.scalar_one()
+async def get_message_logs_page(session: AsyncSession, cursor: KeysetCursor,
+                                page_size: int) -> KeysetPage:
+    return await fetch_keyset_page(session, select(MessageLog),
+                                   MessageLog.timestamp, MessageLog.log_id,
+                                   cursor, page_size)
+
+
+async def estimate_message_logs_count(session: AsyncSession) -> int:
+    return await estimate_row_count(session, MessageLog.__tablename__)
 
 
 async def get_user_message_logs(session: AsyncSession, user_id_to_search: int,
@@ -46,6 +52,17 @@ async def get_user_message_logs(session: AsyncSession, user_id_to_search: int,
     return result.scalars().all()
 
 
+async def get_user_message_logs_page(session: AsyncSession,
+                                     user_id_to_search: int,
+                                     cursor: KeysetCursor,
+                                     page_size: int) -> KeysetPage:
+    stmt = select(MessageLog).where(
+        or_(MessageLog.user_id == user_id_to_search,
+            MessageLog.target_user_id == user_id_to_search))
+    return await fetch_keyset_page(session, stmt, MessageLog.timestamp,
+                                   MessageLog.log_id, cursor, page_size)
+
+
 async def count_user_message_logs(session: AsyncSession,
                                   user_id_to_search: int) -> int:
     stmt = (select(func.count()).select_from(MessageLog).where(
@@ -74,3 +91,63 @@ async def create_message_log_no_commit(session: AsyncSession,
         f"Message log added to session: user {log_data.get('user_id')}, event {log_data.get('event_type')}"
     )
     return new_log
+
+
+async def bulk_create_message_logs_no_commit(session: AsyncSession,
+                                            rows: List[Dict[str, Any]]) -> int:
+    """Insert many log rows with a single multi-row INSERT.
+
+    User references pointing to unknown users are set to NULL (resolved with one
+    lookup for the whole batch) so that one stale id does not fail the batch.
+    """
+    if not rows:
+        return 0
+
+    referenced_ids = {
+        row[key]
+        for row in rows
+        for key in ("user_id", "target_user_id")
+        if row.get(key)
+    }
+    existing_ids = set()
+    if referenced_ids:
+        result = await session.execute(
+            select(User.user_id).where(User.user_id.in_(referenced_ids)))
+        existing_ids = set(result.scalars().all())
+
+    for row in rows:
+        for key in ("user_id", "target_user_id"):
+            if row.get(key) and row[key] not in existing_ids:
+                row[key] = None
+
+    await session.execute(insert(MessageLog), rows)
+    return len(rows)
+
+
+ARCHIVE_COLUMNS: Tuple[str, ...] = (
+    "log_id",
+    "timestamp",
+    "user_id",
+    "telegram_username",
+    "telegram_first_name",
+    "event_type",
+    "content",
+    "raw_update_preview",
+    "is_admin_event",
+    "target_user_id",
+)
+
+
+async def stream_message_log_partition(
+    session: AsyncSession, partition_name: str, chunk_size: int = 5000
+) -> AsyncIterator[List[Tuple[Any, ...]]]:
+    """Stream all rows of one ``message_logs`` partition through a server-side cursor.
+
+    ``partition_name`` must come from the partition catalog, never from user input.
+    """
+    stmt = text(
+        f'SELECT {", ".join(ARCHIVE_COLUMNS)} FROM "{partition_name}" ORDER BY timestamp, log_id'
+    ).execution_options(yield_per=chunk_size)
+    result = await session.stream(stmt)
+    async for partition in result.partitions(chunk_size):
+        yield [tuple(row) for row in partition]
@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import and_, delete, func, insert, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from db.models import OutboundMessage
+
+STATUS_PENDING = "pending"
+STATUS_PROCESSING = "processing"
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+
+
+async def enqueue_outbound_messages(session: AsyncSession,
+                                    rows: List[Dict[str, Any]]) -> int:
+    """Insert pending messages; each row needs chat_id, method_name and payload."""
+    if not rows:
+        return 0
+    await session.execute(insert(OutboundMessage), rows)
+    return len(rows)
+
+
+async def claim_outbound_messages(session: AsyncSession, limit: int,
+                                  lease_seconds: int) -> List[OutboundMessage]:
+    """Lock up to ``limit`` messages for this worker.
+
+    Uses SELECT ... FOR UPDATE SKIP LOCKED so several bot replicas can drain the
+    same table. Rows left in ``processing`` longer than the lease (a crashed
+    worker) are claimed again.
+    """
+    now = datetime.now(timezone.utc)
+    stale_before = now - timedelta(seconds=lease_seconds)
+    stmt = (
+        select(OutboundMessage)
+        .where(
+            or_(
+                OutboundMessage.status == STATUS_PENDING,
+                and_(
+                    OutboundMessage.status == STATUS_PROCESSING,
+                    OutboundMessage.claimed_at < stale_before,
+                ),
+            )
+        )
+        .order_by(OutboundMessage.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    result = await session.execute(stmt)
+    messages = result.scalars().all()
+    if messages:
+        await session.execute(
+            update(OutboundMessage)
+            .where(OutboundMessage.id.in_([m.id for m in messages]))
+            .values(
+                status=STATUS_PROCESSING,
+                claimed_at=now,
+                attempts=OutboundMessage.attempts + 1,
+            )
+            .execution_options(synchronize_session=False)
+        )
+    return messages
+
+
+async def renew_outbound_message_leases(session: AsyncSession,
+                                        message_ids: List[int]) -> int:
+    """Refresh ``claimed_at`` of messages this worker still holds so they are not
+    treated as abandoned while waiting in the in-memory queues."""
+    if not message_ids:
+        return 0
+    result = await session.execute(
+        update(OutboundMessage)
+        .where(
+            OutboundMessage.id.in_(message_ids),
+            OutboundMessage.status == STATUS_PROCESSING,
+        )
+        .values(claimed_at=datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount or 0
+
+
+async def mark_outbound_messages_sent(session: AsyncSession,
+                                      message_ids: List[int]) -> None:
+    if not message_ids:
+        return
+    await session.execute(
+        update(OutboundMessage)
+        .where(OutboundMessage.id.in_(message_ids))
+        .values(status=STATUS_SENT, finished_at=datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def mark_outbound_messages_failed(
+        session: AsyncSession, failures: List[Tuple[int, str]]) -> None:
+    if not failures:
+        return
+    now = datetime.now(timezone.utc)
+    await session.execute(
+        update(OutboundMessage),
+        [{
+            "id": message_id,
+            "status": STATUS_FAILED,
+            "finished_at": now,
+            "last_error": (error or "")[:1000],
+        } for message_id, error in failures],
+    )
+
+
+async def release_outbound_messages(session: AsyncSession,
+                                    message_ids: List[int]) -> None:
+    """Return claimed but unsent messages to the pending pool (graceful shutdown)."""
+    if not message_ids:
+        return
+    await session.execute(
+        update(OutboundMessage)
+        .where(
+            OutboundMessage.id.in_(message_ids),
+            OutboundMessage.status == STATUS_PROCESSING,
+        )
+        .values(status=STATUS_PENDING, claimed_at=None)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def count_pending_outbound_messages(session: AsyncSession) -> int:
+    result = await session.execute(
+        select(func.count(OutboundMessage.id)).where(
+            OutboundMessage.status.in_([STATUS_PENDING, STATUS_PROCESSING])))
+    return result.scalar_one()
+
+
+async def delete_finished_outbound_messages(session: AsyncSession,
+                                            older_than: datetime) -> int:
+    result = await session.execute(
+        delete(OutboundMessage).where(
+            OutboundMessage.status.in_([STATUS_SENT, STATUS_FAILED]),
+            OutboundMessage.finished_at < older_than,
+        ))
+    return result.rowcount or 0
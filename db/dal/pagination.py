@@ -0,0 +1,146 @@
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+from sqlalchemy import func, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+
+@dataclass(frozen=True)
+class KeysetCursor:
+    """
+    Position in a newest-first listing.
+
+    ``anchor_id`` is the primary key of the row the page was reached from: the
+    page holds the rows just after it (or just before it when ``backwards``).
+    ``page`` is only kept for display. The token form (``"3.n1234"``) is compact
+    enough for Telegram callback data and contains no ``:``.
+    """
+
+    page: int = 0
+    anchor_id: Optional[int] = None
+    backwards: bool = False
+
+    def to_token(self) -> str:
+        if self.anchor_id is None:
+            return str(self.page)
+        return f"{self.page}.{'p' if self.backwards else 'n'}{self.anchor_id}"
+
+    @classmethod
+    def from_token(cls, token: Optional[str]) -> "KeysetCursor":
+        """Parse a token; malformed and legacy page-number tokens open the first page."""
+        try:
+            page_str, anchor = (token or "").split(".", 1)
+            return cls(page=max(int(page_str), 0), anchor_id=int(anchor[1:]),
+                       backwards=anchor[0] == "p")
+        except (ValueError, IndexError):
+            return cls()
+
+
+@dataclass
+class KeysetPage:
+    items: List[Any]
+    cursor: KeysetCursor
+    has_prev: bool
+    has_next: bool
+    first_id: Optional[int] = None
+    last_id: Optional[int] = None
+
+    def next_cursor(self) -> KeysetCursor:
+        return KeysetCursor(page=self.cursor.page + 1, anchor_id=self.last_id)
+
+    def prev_cursor(self) -> KeysetCursor:
+        if self.cursor.page <= 1:
+            return KeysetCursor()
+        return KeysetCursor(page=self.cursor.page - 1, anchor_id=self.first_id,
+                            backwards=True)
+
+
+async def fetch_keyset_page(session: AsyncSession, stmt: Select, sort_column,
+                            id_column, cursor: KeysetCursor,
+                            page_size: int) -> KeysetPage:
+    """
+    Fetch one page of ``stmt`` ordered by ``(sort_column, id_column)`` descending.
+
+    The anchor's sort value is looked up by primary key, so each page costs one
+    index range scan regardless of how deep it is. One extra row is fetched to
+    tell whether there is another page in the direction of travel.
+    """
+    page_size = max(page_size, 1)
+    paged_stmt = stmt
+    if cursor.anchor_id is not None:
+        anchor_sort = (select(sort_column)
+                       .where(id_column == cursor.anchor_id)
+                       .correlate(None)
+                       .scalar_subquery())
+        if cursor.backwards:
+            paged_stmt = paged_stmt.where(
+                sort_column >= anchor_sort,
+                or_(sort_column > anchor_sort, id_column > cursor.anchor_id))
+        else:
+            paged_stmt = paged_stmt.where(
+                sort_column <= anchor_sort,
+                or_(sort_column < anchor_sort, id_column < cursor.anchor_id))
+    if cursor.backwards:
+        paged_stmt = paged_stmt.order_by(sort_column.asc(), id_column.asc())
+    else:
+        paged_stmt = paged_stmt.order_by(sort_column.desc(), id_column.desc())
+
+    result = await session.execute(paged_stmt.limit(page_size + 1))
+    rows = list(result.scalars().all())
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    if not rows and cursor.anchor_id is not None:
+        # The anchor row is gone (or nothing is left past it): start over.
+        return await fetch_keyset_page(session, stmt, sort_column, id_column,
+                                       KeysetCursor(), page_size)
+
+    if cursor.backwards:
+        rows.reverse()
+        if not has_more:
+            cursor = KeysetCursor()
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = cursor.anchor_id is not None, has_more
+
+    id_key = id_column.key
+    return KeysetPage(
+        items=rows,
+        cursor=cursor,
+        has_prev=has_prev,
+        has_next=has_next,
+        first_id=getattr(rows[0], id_key) if rows else None,
+        last_id=getattr(rows[-1], id_key) if rows else None,
+    )
+
+
+async def estimate_row_count(session: AsyncSession, table_name: str) -> int:
+    """
+    Planner row estimate for a whole table (kept current by autovacuum/ANALYZE).
+
+    Partitioned tables have no statistics of their own, so their partitions'
+    estimates are summed. Falls back to an exact count for plain tables that
+    were never analyzed.
+    """
+    result = await session.execute(
+        text(
+            """
+            SELECT CASE WHEN t.relkind = 'p' THEN (
+                       SELECT COALESCE(SUM(GREATEST(c.reltuples, 0)), 0)
+                       FROM pg_inherits i
+                       JOIN pg_class c ON c.oid = i.inhrelid
+                       WHERE i.inhparent = t.oid)
+                   ELSE t.reltuples END::bigint
+            FROM pg_class t
+            WHERE t.oid = to_regclass(:table_name)
+            """
+        ),
+        {"table_name": table_name},
+    )
+    estimate = result.scalar()
+    if estimate is not None and estimate >= 0:
+        return int(estimate)
+    result = await session.execute(
+        select(func.count()).select_from(text(table_name)))
+    return int(result.scalar_one())
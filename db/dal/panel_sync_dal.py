@@ -1,11 +1,12 @@
 import logging
-from typing import Optional
+from typing import Optional, Dict, List
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import update
+from sqlalchemy import update, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from datetime import datetime, timezone
 
-from db.models import PanelSyncStatus
+from db.models import PanelSyncStatus, PanelUserSyncState
 
 SINGLETON_ID = 1
 
@@ -21,7 +22,8 @@ async def update_panel_sync_status(
         details: str,
         users_processed: int = 0,
         subs_synced: int = 0,
-        last_sync_time: Optional[datetime] = None) -> PanelSyncStatus:
+        last_sync_time: Optional[datetime] = None,
+        last_full_sync_time: Optional[datetime] = None) -> PanelSyncStatus:
     if last_sync_time is None:
         last_sync_time = datetime.now(timezone.utc)
 
@@ -32,6 +34,8 @@ async def update_panel_sync_status(
         sync_record.details = details
         sync_record.users_processed_from_panel = users_processed
         sync_record.subscriptions_synced = subs_synced
+        if last_full_sync_time is not None:
+            sync_record.last_full_sync_time = last_full_sync_time
     else:
         sync_record = PanelSyncStatus(
             id=SINGLETON_ID,
@@ -39,7 +43,8 @@ async def update_panel_sync_status(
             status=status,
             details=details,
             users_processed_from_panel=users_processed,
-            subscriptions_synced=subs_synced)
+            subscriptions_synced=subs_synced,
+            last_full_sync_time=last_full_sync_time)
         session.add(sync_record)
 
     await session.flush()
@@ -48,3 +53,56 @@ async def update_panel_sync_status(
         f"Panel sync status updated: {status}, Users: {users_processed}, Subs: {subs_synced}"
     )
     return sync_record
+
+
+async def get_user_content_hashes(
+        session: AsyncSession, panel_user_uuids: List[str]) -> Dict[str, str]:
+    """Content hashes stored by the previous sync for the given panel users."""
+    if not panel_user_uuids:
+        return {}
+    stmt = select(PanelUserSyncState.panel_user_uuid,
+                  PanelUserSyncState.content_hash).where(
+                      PanelUserSyncState.panel_user_uuid.in_(panel_user_uuids))
+    result = await session.execute(stmt)
+    return {row.panel_user_uuid: row.content_hash for row in result}
+
+
+async def upsert_user_content_hashes(session: AsyncSession,
+                                     hashes: Dict[str, str],
+                                     synced_at: datetime) -> None:
+    if not hashes:
+        return
+    rows = [{
+        "panel_user_uuid": panel_uuid,
+        "content_hash": content_hash,
+        "synced_at": synced_at,
+    } for panel_uuid, content_hash in hashes.items()]
+    stmt = pg_insert(PanelUserSyncState).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PanelUserSyncState.panel_user_uuid],
+        set_={
+            "content_hash": stmt.excluded.content_hash,
+            "synced_at": stmt.excluded.synced_at,
+        },
+    )
+    await session.execute(stmt)
+
+
+async def delete_user_content_hashes(session: AsyncSession,
+                                     panel_user_uuids: List[str]) -> int:
+    """Forget stored hashes so the next incremental sync processes these users again."""
+    if not panel_user_uuids:
+        return 0
+    result = await session.execute(
+        delete(PanelUserSyncState).where(
+            PanelUserSyncState.panel_user_uuid.in_(panel_user_uuids)))
+    return result.rowcount or 0
+
+
+async def delete_stale_user_content_hashes(session: AsyncSession,
+                                           synced_before: datetime) -> int:
+    """Forget panel users that were not seen by a full sync."""
+    result = await session.execute(
+        delete(PanelUserSyncState).where(
+            PanelUserSyncState.synced_at < synced_before))
+    return result.rowcount or 0
@@ -5,7 +5,8 @@ from sqlalchemy.future import select
 from sqlalchemy import update, func, and_
 from sqlalchemy.orm import selectinload
 
-from db.models import Payment, User
+from db.models import Payment, PaymentDailyRollup, User
+from .pagination import KeysetCursor, KeysetPage, fetch_keyset_page
 
 
 async def create_payment_record(session: AsyncSession,
@@ -111,6 +112,34 @@ async def update_payment_status_by_db_id(
     return payment
 
 
+async def claim_payment_for_processing(
+        session: AsyncSession,
+        payment_db_id: int,
+        new_status: str = "succeeded",
+        yk_payment_id: Optional[str] = None) -> bool:
+    """Atomically move a payment to ``new_status`` unless it already has it.
+
+    Returns False when the payment was already processed (duplicate webhook) or
+    does not exist. A concurrent duplicate blocks on the row lock until the first
+    transaction finishes and then matches no rows, so a payment is applied once
+    even across processes.
+    """
+    values: Dict[str, Any] = {"status": new_status, "updated_at": func.now()}
+    if yk_payment_id:
+        values["yookassa_payment_id"] = func.coalesce(Payment.yookassa_payment_id, yk_payment_id)
+    stmt = (
+        update(Payment)
+        .where(Payment.payment_id == payment_db_id, Payment.status != new_status)
+        .values(**values)
+        .returning(Payment.payment_id)
+    )
+    result = await session.execute(stmt)
+    claimed = result.scalar_one_or_none() is not None
+    if claimed:
+        logging.info(f"Payment record {payment_db_id} status updated to {new_status}.")
+    return claimed
+
+
 async def get_recent_payment_logs_with_user(session: AsyncSession,
                                             limit: int = 20,
                                             offset: int = 0) -> List[Payment]:
@@ -122,11 +151,20 @@ async def get_recent_payment_logs_with_user(session: AsyncSession,
     return result.scalars().all()
 
 
+async def get_succeeded_payments_page(session: AsyncSession,
+                                      cursor: KeysetCursor,
+                                      page_size: int) -> KeysetPage:
+    stmt = (select(Payment).options(selectinload(Payment.user))
+            .where(Payment.status == 'succeeded'))
+    return await fetch_keyset_page(session, stmt, Payment.created_at,
+                                   Payment.payment_id, cursor, page_size)
+
+
 async def get_payments_count(session: AsyncSession) -> int:
-    """Get total count of successful payments."""
-    stmt = select(func.count(Payment.payment_id)).where(Payment.status == 'succeeded')
+    """Get total count of successful payments (from the daily revenue rollup)."""
+    stmt = select(func.coalesce(func.sum(PaymentDailyRollup.payments_count), 0))
     result = await session.execute(stmt)
-    return result.scalar() or 0
+    return int(result.scalar() or 0)
 
 
 async def get_all_succeeded_payments_with_user(session: AsyncSession) -> List[Payment]:
@@ -176,66 +214,35 @@ async def update_provider_payment_and_status(
 
 
 async def get_financial_statistics(session: AsyncSession) -> Dict[str, Any]:
-    """Get comprehensive financial statistics."""
-    from datetime import datetime, timedelta
-    from sqlalchemy import and_, text
-    
-    now = datetime.utcnow()
-    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    week_start = today_start - timedelta(days=7)
-    month_start = today_start - timedelta(days=30)
-    
-    # Today's revenue
-    stmt_today = select(func.sum(Payment.amount)).where(
-        and_(
-            Payment.status == 'succeeded',
-            Payment.created_at >= today_start
-        )
-    )
-    today_revenue = await session.execute(stmt_today)
-    today_amount = today_revenue.scalar() or 0
-    
-    # Week revenue
-    stmt_week = select(func.sum(Payment.amount)).where(
-        and_(
-            Payment.status == 'succeeded',
-            Payment.created_at >= week_start
-        )
-    )
-    week_revenue = await session.execute(stmt_week)
-    week_amount = week_revenue.scalar() or 0
-    
-    # Month revenue
-    stmt_month = select(func.sum(Payment.amount)).where(
-        and_(
-            Payment.status == 'succeeded',
-            Payment.created_at >= month_start
-        )
-    )
-    month_revenue = await session.execute(stmt_month)
-    month_amount = month_revenue.scalar() or 0
-    
-    # All time revenue
-    stmt_all = select(func.sum(Payment.amount)).where(Payment.status == 'succeeded')
-    all_revenue = await session.execute(stmt_all)
-    all_amount = all_revenue.scalar() or 0
-    
-    # Count of successful payments today
-    stmt_count_today = select(func.count(Payment.payment_id)).where(
-        and_(
-            Payment.status == 'succeeded',
-            Payment.created_at >= today_start
-        )
+    """Get comprehensive financial statistics.
+
+    Answered with one query over ``payment_daily_rollup`` (days x providers x
+    currencies), so the cost does not grow with the number of payments.
+    """
+    from datetime import datetime, timedelta, timezone
+
+    today = datetime.now(timezone.utc).date()
+    week_start = today - timedelta(days=7)
+    month_start = today - timedelta(days=30)
+    day = PaymentDailyRollup.day
+    amount_sum = PaymentDailyRollup.amount_sum
+
+    stmt = select(
+        func.coalesce(func.sum(amount_sum).filter(day >= today), 0),
+        func.coalesce(func.sum(amount_sum).filter(day >= week_start), 0),
+        func.coalesce(func.sum(amount_sum).filter(day >= month_start), 0),
+        func.coalesce(func.sum(amount_sum), 0),
+        func.coalesce(func.sum(PaymentDailyRollup.payments_count).filter(day >= today), 0),
     )
-    today_count = await session.execute(stmt_count_today)
-    today_payments_count = today_count.scalar() or 0
-    
+    today_amount, week_amount, month_amount, all_amount, today_payments_count = (
+        await session.execute(stmt)).one()
+
     return {
         "today_revenue": float(today_amount),
         "week_revenue": float(week_amount),
         "month_revenue": float(month_amount),
         "all_time_revenue": float(all_amount),
-        "today_payments_count": today_payments_count
+        "today_payments_count": int(today_payments_count)
     }
 
 
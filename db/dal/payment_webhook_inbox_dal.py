@@ -0,0 +1,210 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Sequence
+
+from sqlalchemy import and_, delete, func, or_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from db.models import PaymentWebhookEvent
+
+STATUS_PENDING = "pending"
+STATUS_PROCESSING = "processing"
+STATUS_DONE = "done"
+STATUS_REJECTED = "rejected"
+STATUS_FAILED = "failed"
+
+
+async def insert_webhook_event(session: AsyncSession, provider: str,
+                               event_key: str, payload: str) -> Optional[int]:
+    """Store an incoming provider event once.
+
+    Returns the new event id, or None if the same (provider, event_key) was
+    already received (a duplicate delivery).
+    """
+    stmt = (
+        pg_insert(PaymentWebhookEvent)
+        .values(provider=provider, event_key=event_key, payload=payload,
+                status=STATUS_PENDING)
+        .on_conflict_do_nothing(constraint="uq_payment_webhook_inbox_provider_key")
+        .returning(PaymentWebhookEvent.event_id)
+    )
+    result = await session.execute(stmt)
+    return result.scalar_one_or_none()
+
+
+async def claim_webhook_events(session: AsyncSession, providers: Sequence[str],
+                               limit: int,
+                               lease_seconds: int) -> List[PaymentWebhookEvent]:
+    """Lock due events of the given providers for this worker.
+
+    Uses SELECT ... FOR UPDATE SKIP LOCKED so several bot replicas can share the
+    inbox. Events stuck in ``processing`` longer than the lease (a crashed
+    worker) are claimed again.
+    """
+    if not providers:
+        return []
+    now = datetime.now(timezone.utc)
+    stale_before = now - timedelta(seconds=lease_seconds)
+    stmt = (
+        select(PaymentWebhookEvent)
+        .where(
+            PaymentWebhookEvent.provider.in_(list(providers)),
+            or_(
+                and_(
+                    PaymentWebhookEvent.status == STATUS_PENDING,
+                    PaymentWebhookEvent.next_attempt_at <= now,
+                ),
+                and_(
+                    PaymentWebhookEvent.status == STATUS_PROCESSING,
+                    PaymentWebhookEvent.claimed_at < stale_before,
+                ),
+            ),
+        )
+        .order_by(PaymentWebhookEvent.event_id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    result = await session.execute(stmt)
+    events = result.scalars().all()
+    if events:
+        await session.execute(
+            update(PaymentWebhookEvent)
+            .where(PaymentWebhookEvent.event_id.in_([e.event_id for e in events]))
+            .values(
+                status=STATUS_PROCESSING,
+                claimed_at=now,
+                attempts=PaymentWebhookEvent.attempts + 1,
+            )
+            .execution_options(synchronize_session=False)
+        )
+    return events
+
+
+def _owned_claim(event_id: int, attempt: Optional[int]):
+    """Match the event, and with ``attempt`` only while that claim still holds it."""
+    conditions = [PaymentWebhookEvent.event_id == event_id]
+    if attempt is not None:
+        conditions += [
+            PaymentWebhookEvent.status == STATUS_PROCESSING,
+            PaymentWebhookEvent.attempts == attempt,
+        ]
+    return conditions
+
+
+async def renew_webhook_event_lease(session: AsyncSession, event_id: int,
+                                    attempt: int) -> bool:
+    """Extend the lease of an event still held by the claim that made ``attempt``.
+
+    Returns False if the lease lapsed and another worker claimed the event.
+    """
+    result = await session.execute(
+        update(PaymentWebhookEvent)
+        .where(*_owned_claim(event_id, attempt))
+        .values(claimed_at=datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
+    )
+    return bool(result.rowcount)
+
+
+async def finish_webhook_event(session: AsyncSession, event_id: int, status: str,
+                               error: Optional[str] = None,
+                               attempt: Optional[int] = None) -> bool:
+    """Store the final status; with ``attempt`` only if that claim still owns the event."""
+    result = await session.execute(
+        update(PaymentWebhookEvent)
+        .where(*_owned_claim(event_id, attempt))
+        .values(
+            status=status,
+            processed_at=datetime.now(timezone.utc),
+            last_error=(error or "")[:1000] or None,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return bool(result.rowcount)
+
+
+async def schedule_webhook_event_retry(session: AsyncSession, event_id: int,
+                                       next_attempt_at: datetime,
+                                       error: str,
+                                       attempt: Optional[int] = None) -> bool:
+    result = await session.execute(
+        update(PaymentWebhookEvent)
+        .where(*_owned_claim(event_id, attempt))
+        .values(
+            status=STATUS_PENDING,
+            claimed_at=None,
+            next_attempt_at=next_attempt_at,
+            last_error=(error or "")[:1000],
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return bool(result.rowcount)
+
+
+async def release_webhook_events(session: AsyncSession,
+                                 event_ids: List[int]) -> None:
+    """Return claimed events to the pending pool without counting the attempt."""
+    if not event_ids:
+        return
+    await session.execute(
+        update(PaymentWebhookEvent)
+        .where(
+            PaymentWebhookEvent.event_id.in_(event_ids),
+            PaymentWebhookEvent.status == STATUS_PROCESSING,
+        )
+        .values(
+            status=STATUS_PENDING,
+            claimed_at=None,
+            attempts=PaymentWebhookEvent.attempts - 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def requeue_webhook_event(session: AsyncSession, event_id: int) -> bool:
+    """Schedule an already handled event to be processed again (manual replay)."""
+    result = await session.execute(
+        update(PaymentWebhookEvent)
+        .where(
+            PaymentWebhookEvent.event_id == event_id,
+            PaymentWebhookEvent.status != STATUS_PROCESSING,
+        )
+        .values(
+            status=STATUS_PENDING,
+            attempts=0,
+            claimed_at=None,
+            processed_at=None,
+            next_attempt_at=func.now(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return bool(result.rowcount)
+
+
+async def list_webhook_events(session: AsyncSession, statuses: Sequence[str],
+                              limit: int) -> List[PaymentWebhookEvent]:
+    """Most recently handled events in the given statuses, newest first."""
+    result = await session.execute(
+        select(PaymentWebhookEvent)
+        .where(PaymentWebhookEvent.status.in_(list(statuses)))
+        .order_by(PaymentWebhookEvent.event_id.desc())
+        .limit(limit))
+    return result.scalars().all()
+
+
+async def count_webhook_events_by_status(session: AsyncSession) -> dict:
+    result = await session.execute(
+        select(PaymentWebhookEvent.status, func.count(PaymentWebhookEvent.event_id))
+        .group_by(PaymentWebhookEvent.status))
+    return {status: count for status, count in result.all()}
+
+
+async def delete_processed_webhook_events(session: AsyncSession,
+                                          older_than: datetime) -> int:
+    result = await session.execute(
+        delete(PaymentWebhookEvent).where(
+            PaymentWebhookEvent.status.in_([STATUS_DONE, STATUS_REJECTED]),
+            PaymentWebhookEvent.processed_at < older_than,
+        ))
+    return result.rowcount or 0
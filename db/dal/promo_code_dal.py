@@ -6,6 +6,7 @@ from sqlalchemy import update, func, and_, or_
 from datetime import datetime, timezone
 
 from db.models import PromoCode, PromoCodeActivation, User, Payment
+from .pagination import KeysetCursor, KeysetPage, fetch_keyset_page
 
 
 async def create_promo_code(session: AsyncSession,
@@ -72,23 +73,22 @@ async def get_promo_codes_count(session: AsyncSession) -> int:
     return result.scalar_one()
 
 
-async def get_promo_activations_by_code_id(session: AsyncSession, promo_code_id: int, limit: Optional[int] = None, offset: int = 0) -> List[PromoCodeActivation]:
-    """Get activation history for a specific promo code with optional pagination."""
+async def get_promo_activations_by_code_id(session: AsyncSession, promo_code_id: int) -> List[PromoCodeActivation]:
+    """Get the full activation history for a specific promo code."""
     stmt = (select(PromoCodeActivation)
             .where(PromoCodeActivation.promo_code_id == promo_code_id)
-            .order_by(PromoCodeActivation.activated_at.desc())
-            .offset(offset))
-    if limit is not None:
-        stmt = stmt.limit(limit)
+            .order_by(PromoCodeActivation.activated_at.desc()))
     result = await session.execute(stmt)
     return result.scalars().all()
 
 
-async def count_promo_activations_by_code_id(session: AsyncSession, promo_code_id: int) -> int:
-    """Count total activations for a specific promo code."""
-    stmt = select(func.count()).select_from(PromoCodeActivation).where(PromoCodeActivation.promo_code_id == promo_code_id)
-    result = await session.execute(stmt)
-    return result.scalar_one()
+async def get_promo_activations_page(session: AsyncSession, promo_code_id: int,
+                                     cursor: KeysetCursor, page_size: int) -> KeysetPage:
+    """Get one page of the activation history for a specific promo code."""
+    stmt = select(PromoCodeActivation).where(
+        PromoCodeActivation.promo_code_id == promo_code_id)
+    return await fetch_keyset_page(session, stmt, PromoCodeActivation.activated_at,
+                                   PromoCodeActivation.activation_id, cursor, page_size)
 
 
 async def update_promo_code(session: AsyncSession, promo_id: int,
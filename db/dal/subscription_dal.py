@@ -4,6 +4,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import update, delete, func, and_, or_
 from sqlalchemy.orm import selectinload
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from datetime import datetime, timezone, timedelta
 
 from db.models import Subscription, User
@@ -128,6 +129,60 @@ async def upsert_subscription(session: AsyncSession,
         return new_sub
 
 
+SYNC_QUERY_CHUNK_SIZE = 5000
+SYNC_WRITE_CHUNK_SIZE = 1000
+
+
+async def get_subscriptions_for_sync(
+        session: AsyncSession, panel_user_uuids: List[str],
+        panel_subscription_uuids: List[str]) -> List[Subscription]:
+    """Load subscriptions linked to any of the given panel user or subscription UUIDs."""
+    subscriptions: Dict[int, Subscription] = {}
+    for key_column, values in (
+        (Subscription.panel_user_uuid, list(panel_user_uuids)),
+        (Subscription.panel_subscription_uuid, list(panel_subscription_uuids)),
+    ):
+        for start in range(0, len(values), SYNC_QUERY_CHUNK_SIZE):
+            chunk = values[start:start + SYNC_QUERY_CHUNK_SIZE]
+            result = await session.execute(
+                select(Subscription).where(key_column.in_(chunk)))
+            for sub in result.scalars().all():
+                subscriptions[sub.subscription_id] = sub
+    return list(subscriptions.values())
+
+
+async def bulk_update_subscriptions(session: AsyncSession,
+                                    rows: List[Dict[str, Any]]) -> int:
+    """Apply per-row updates keyed by subscription_id (ORM bulk UPDATE by primary key)."""
+    if not rows:
+        return 0
+    for start in range(0, len(rows), SYNC_WRITE_CHUNK_SIZE):
+        await session.execute(update(Subscription),
+                              rows[start:start + SYNC_WRITE_CHUNK_SIZE])
+    return len(rows)
+
+
+async def bulk_upsert_subscriptions_by_panel_uuid(
+        session: AsyncSession, rows: List[Dict[str, Any]]) -> int:
+    """Multi-row INSERT ... ON CONFLICT (panel_subscription_uuid) DO UPDATE.
+
+    Every row must carry panel_subscription_uuid and share the same set of keys.
+    """
+    if not rows:
+        return 0
+    update_columns = ("user_id", "panel_user_uuid", "end_date", "is_active",
+                      "status_from_panel")
+    for start in range(0, len(rows), SYNC_WRITE_CHUNK_SIZE):
+        stmt = pg_insert(Subscription).values(
+            rows[start:start + SYNC_WRITE_CHUNK_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Subscription.panel_subscription_uuid],
+            set_={col: getattr(stmt.excluded, col) for col in update_columns},
+        )
+        await session.execute(stmt)
+    return len(rows)
+
+
 async def deactivate_other_active_subscriptions(
         session: AsyncSession, panel_user_uuid: str,
         current_panel_subscription_uuid: Optional[str]):
@@ -1,14 +1,17 @@
 import logging
 import secrets
 import string
-from typing import Optional, List, Dict, Any, Tuple
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Any, Tuple, AsyncIterator, Iterable
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
-from sqlalchemy import update, delete, func, and_, or_
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import event, update, delete, func, and_, or_
 from datetime import datetime, timezone
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 
+from bot.utils.ttl_cache import TTLCache
+
 from ..models import (
     User,
     Subscription,
@@ -19,12 +22,86 @@ from ..models import (
     UserPaymentMethod,
     AdAttribution,
 )
+from .pagination import KeysetCursor, KeysetPage, estimate_row_count, fetch_keyset_page
 
 REFERRAL_CODE_ALPHABET = string.ascii_uppercase + string.digits
 REFERRAL_CODE_LENGTH = 9
 MAX_REFERRAL_CODE_ATTEMPTS = 25
 
 
+@dataclass(frozen=True)
+class UserAttributes:
+    """Snapshot of the user columns read on almost every update (gating, i18n, profile sync)."""
+    user_id: int
+    is_banned: bool
+    language_code: Optional[str]
+    channel_subscription_verified: Optional[bool]
+    channel_subscription_verified_for: Optional[int]
+    username: Optional[str]
+    first_name: Optional[str]
+    last_name: Optional[str]
+    is_bot_blocked: bool = False
+
+
+# Process-wide cache keyed by Telegram user id. Every DAL write touching these
+# columns must call _invalidate_user_attributes_on_commit(); code that commits
+# the change itself may call invalidate_user_attributes() afterwards.
+_user_attributes_cache: TTLCache[UserAttributes] = TTLCache(maxsize=10000, ttl_seconds=60)
+_PENDING_INVALIDATIONS_KEY = "user_attributes_pending_invalidation"
+
+
+def configure_user_attributes_cache(maxsize: int, ttl_seconds: float) -> None:
+    _user_attributes_cache.configure(maxsize=maxsize, ttl_seconds=ttl_seconds)
+
+
+def invalidate_user_attributes(user_id: int) -> None:
+    _user_attributes_cache.invalidate(user_id)
+
+
+def _invalidate_user_attributes_on_commit(session: AsyncSession,
+                                          user_ids: Iterable[int]) -> None:
+    """
+    Drop cached attributes now and again once ``session`` commits.
+
+    A concurrent load between the write and the commit still reads the old
+    committed row and would cache it for the full TTL; the second invalidation
+    removes that stale entry.
+    """
+    pending = session.sync_session.info.setdefault(_PENDING_INVALIDATIONS_KEY, set())
+    for user_id in user_ids:
+        pending.add(user_id)
+        invalidate_user_attributes(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_user_attributes(session: Session) -> None:
+    for user_id in session.info.pop(_PENDING_INVALIDATIONS_KEY, ()):
+        invalidate_user_attributes(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_user_attribute_invalidations(session: Session) -> None:
+    session.info.pop(_PENDING_INVALIDATIONS_KEY, None)
+
+
+def get_user_attributes_cache_stats() -> Dict[str, Any]:
+    return _user_attributes_cache.get_stats()
+
+
+def _build_user_attributes(user: User) -> UserAttributes:
+    return UserAttributes(
+        user_id=user.user_id,
+        is_banned=bool(user.is_banned),
+        language_code=user.language_code,
+        channel_subscription_verified=user.channel_subscription_verified,
+        channel_subscription_verified_for=user.channel_subscription_verified_for,
+        username=user.username,
+        first_name=user.first_name,
+        last_name=user.last_name,
+        is_bot_blocked=user.bot_blocked_at is not None,
+    )
+
+
 def _generate_referral_code_candidate() -> str:
     return "".join(
         secrets.choice(REFERRAL_CODE_ALPHABET) for _ in range(REFERRAL_CODE_LENGTH)
@@ -74,6 +151,36 @@ async def get_user_by_id(session: AsyncSession, user_id: int) -> Optional[User]:
     return result.scalar_one_or_none()
 
 
+async def get_session_user(session: AsyncSession, user_id: int) -> Optional[User]:
+    """Return the user already loaded into this session or fetch it once.
+
+    Lookups go through the session identity map, so repeated calls within the
+    same update (middlewares, handlers, services) do not issue extra SELECTs.
+    """
+    return await session.get(User, user_id)
+
+
+async def get_user_attributes(
+    session: AsyncSession, user_id: int
+) -> Optional[UserAttributes]:
+    """Read-through access to hot user attributes.
+
+    Served from the process-wide cache when possible; on a miss the row is loaded
+    into the session (see get_session_user) and cached. Unknown users are not
+    cached so that a freshly registered user is picked up immediately.
+    """
+    cached = _user_attributes_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    user = await get_session_user(session, user_id)
+    if user is None:
+        return None
+    attributes = _build_user_attributes(user)
+    _user_attributes_cache.set(user_id, attributes)
+    return attributes
+
+
 async def get_user_by_username(session: AsyncSession, username: str) -> Optional[User]:
     clean_username = username.lstrip("@").lower()
     stmt = select(User).where(func.lower(User.username) == clean_username)
@@ -117,6 +224,7 @@ async def create_user(session: AsyncSession, user_data: Dict[str, Any]) -> Tuple
     result = await session.execute(stmt)
     inserted_row = result.first()
     created = inserted_row is not None
+    _invalidate_user_attributes_on_commit(session, [user_data["user_id"]])
 
     # Fetch the user (inserted just now or pre-existing)
     user_id: int = user_data["user_id"]
@@ -152,6 +260,7 @@ async def update_user(
             setattr(user, key, value)
         await session.flush()
         await session.refresh(user)
+        _invalidate_user_attributes_on_commit(session, [user_id])
     return user
 
 
@@ -160,6 +269,7 @@ async def update_user_language(
 ) -> bool:
     stmt = update(User).where(User.user_id == user_id).values(language_code=lang_code)
     result = await session.execute(stmt)
+    _invalidate_user_attributes_on_commit(session, [user_id])
     return result.rowcount > 0
 
 
@@ -174,33 +284,47 @@ async def get_banned_users(session: AsyncSession) -> List[User]:
     return result.scalars().all()
 
 
-async def get_all_users_paginated(
-    session: AsyncSession, *, page: int = 0, page_size: int = 15
-) -> List[User]:
-    """Return a slice of users ordered by newest registration first."""
-    safe_page = max(page, 0)
-    safe_page_size = max(page_size, 1)
+async def get_users_page(
+    session: AsyncSession, cursor: KeysetCursor, page_size: int = 15
+) -> KeysetPage:
+    """Return a page of users ordered by newest registration first."""
+    return await fetch_keyset_page(session, select(User), User.registration_date,
+                                   User.user_id, cursor, page_size)
 
-    stmt = (
-        select(User)
-        .order_by(User.registration_date.desc())
-        .offset(safe_page * safe_page_size)
-        .limit(safe_page_size)
-    )
-    result = await session.execute(stmt)
+
+async def estimate_users_count(session: AsyncSession) -> int:
+    """Approximate total number of users (planner statistics, no table scan)."""
+    return await estimate_row_count(session, User.__tablename__)
+
+
+async def get_all_active_user_ids_for_broadcast(session: AsyncSession) -> List[int]:
+    result = await session.execute(_broadcast_audience_stmt("all"))
     return result.scalars().all()
 
 
-async def count_all_users(session: AsyncSession) -> int:
-    """Count total number of users."""
-    result = await session.execute(select(func.count(User.user_id)))
-    return result.scalar_one()
+async def mark_users_bot_blocked(session: AsyncSession, user_ids: List[int]) -> int:
+    """Flag users that blocked the bot (Telegram answered 403) so broadcasts skip them."""
+    if not user_ids:
+        return 0
+    stmt = (
+        update(User)
+        .where(User.user_id.in_(user_ids), User.bot_blocked_at.is_(None))
+        .values(bot_blocked_at=datetime.now(timezone.utc))
+    )
+    result = await session.execute(stmt)
+    _invalidate_user_attributes_on_commit(session, user_ids)
+    return result.rowcount or 0
 
 
-async def get_all_active_user_ids_for_broadcast(session: AsyncSession) -> List[int]:
-    stmt = select(User.user_id).where(User.is_banned == False)
+async def clear_user_bot_blocked(session: AsyncSession, user_id: int) -> bool:
+    stmt = (
+        update(User)
+        .where(User.user_id == user_id, User.bot_blocked_at.is_not(None))
+        .values(bot_blocked_at=None)
+    )
     result = await session.execute(stmt)
-    return result.scalars().all()
+    _invalidate_user_attributes_on_commit(session, [user_id])
+    return result.rowcount > 0
 
 
 async def get_all_users_with_panel_uuid(session: AsyncSession) -> List[User]:
@@ -209,6 +333,74 @@ async def get_all_users_with_panel_uuid(session: AsyncSession) -> List[User]:
     return result.scalars().all()
 
 
+SYNC_QUERY_CHUNK_SIZE = 5000
+
+
+async def get_users_for_sync(
+    session: AsyncSession,
+    telegram_ids: List[int],
+    panel_uuids: List[str],
+) -> List[User]:
+    """Load every user matching any of the given Telegram ids or panel UUIDs.
+
+    Lookups are chunked to keep IN-lists within driver parameter limits.
+    """
+    users: Dict[int, User] = {}
+    for key_column, values in (
+        (User.user_id, list(telegram_ids)),
+        (User.panel_user_uuid, list(panel_uuids)),
+    ):
+        for start in range(0, len(values), SYNC_QUERY_CHUNK_SIZE):
+            chunk = values[start:start + SYNC_QUERY_CHUNK_SIZE]
+            result = await session.execute(select(User).where(key_column.in_(chunk)))
+            for user in result.scalars().all():
+                users[user.user_id] = user
+    return list(users.values())
+
+
+async def bulk_insert_users_ignore_conflicts(
+    session: AsyncSession, rows: List[Dict[str, Any]]
+) -> List[int]:
+    """Insert users with multi-row INSERT ... ON CONFLICT DO NOTHING.
+
+    Missing registration dates and referral codes are filled in. Returns the ids
+    that were actually inserted.
+    """
+    if not rows:
+        return []
+    now = datetime.now(timezone.utc)
+    for row in rows:
+        row.setdefault("registration_date", now)
+        if not row.get("referral_code"):
+            row["referral_code"] = _generate_referral_code_candidate()
+
+    inserted_ids: List[int] = []
+    for start in range(0, len(rows), 1000):
+        chunk = rows[start:start + 1000]
+        stmt = (
+            pg_insert(User)
+            .values(chunk)
+            .on_conflict_do_nothing()
+            .returning(User.user_id)
+        )
+        result = await session.execute(stmt)
+        inserted_ids.extend(result.scalars().all())
+    _invalidate_user_attributes_on_commit(session, inserted_ids)
+    return inserted_ids
+
+
+async def bulk_update_users(
+    session: AsyncSession, rows: List[Dict[str, Any]]
+) -> int:
+    """Apply per-row updates keyed by user_id using ORM bulk UPDATE by primary key."""
+    if not rows:
+        return 0
+    for start in range(0, len(rows), 1000):
+        await session.execute(update(User), rows[start:start + 1000])
+    _invalidate_user_attributes_on_commit(session, [row["user_id"] for row in rows])
+    return len(rows)
+
+
 async def get_enhanced_user_statistics(session: AsyncSession) -> Dict[str, Any]:
     """Get comprehensive user statistics including active users, trial users, etc."""
     from datetime import datetime, timezone
@@ -275,53 +467,63 @@ async def get_enhanced_user_statistics(session: AsyncSession) -> Dict[str, Any]:
     }
 
 
-async def get_user_ids_with_active_subscription(session: AsyncSession) -> List[int]:
-    """Return non-banned user IDs who have an active subscription (paid or trial)."""
-    from datetime import datetime, timezone
+def _broadcast_audience_stmt(target: str):
+    """SELECT of reachable, non-banned user ids for a broadcast target (all/active/inactive)."""
     now = datetime.now(timezone.utc)
-
-    stmt = (
-        select(func.distinct(Subscription.user_id))
-        .join(User, Subscription.user_id == User.user_id)
-        .where(
-            and_(
-                User.is_banned == False,
-                Subscription.is_active == True,
-                Subscription.end_date > now,
+    reachable = and_(User.is_banned == False, User.bot_blocked_at.is_(None))
+
+    if target == "active":
+        return (
+            select(func.distinct(Subscription.user_id))
+            .join(User, Subscription.user_id == User.user_id)
+            .where(
+                and_(
+                    reachable,
+                    Subscription.is_active == True,
+                    Subscription.end_date > now,
+                )
             )
         )
-    )
-    result = await session.execute(stmt)
+    if target == "inactive":
+        # Subquery for users with active subscription
+        active_subs_subq = (
+            select(Subscription.user_id)
+            .where(
+                and_(
+                    Subscription.is_active == True,
+                    Subscription.end_date > now,
+                )
+            )
+        ).scalar_subquery()
+        return select(User.user_id).where(
+            and_(reachable, ~User.user_id.in_(active_subs_subq)))
+    return select(User.user_id).where(reachable)
+
+
+async def get_user_ids_with_active_subscription(session: AsyncSession) -> List[int]:
+    """Return non-banned user IDs who have an active subscription (paid or trial)."""
+    result = await session.execute(_broadcast_audience_stmt("active"))
     return result.scalars().all()
 
 
 async def get_user_ids_without_active_subscription(session: AsyncSession) -> List[int]:
     """Return non-banned user IDs who do NOT have any active subscription."""
-    from datetime import datetime, timezone
-    now = datetime.now(timezone.utc)
+    result = await session.execute(_broadcast_audience_stmt("inactive"))
+    return result.scalars().all()
 
-    # Subquery for users with active subscription
-    active_subs_subq = (
-        select(Subscription.user_id)
-        .where(
-            and_(
-                Subscription.is_active == True,
-                Subscription.end_date > now,
-            )
-        )
-    ).scalar_subquery()
 
-    stmt = (
-        select(User.user_id)
-        .where(
-            and_(
-                User.is_banned == False,
-                ~User.user_id.in_(active_subs_subq),
-            )
-        )
+async def iter_broadcast_user_ids(
+    session: AsyncSession, target: str, chunk_size: int = 1000
+) -> AsyncIterator[List[int]]:
+    """Stream broadcast recipients in chunks through a server-side cursor.
+
+    The session must stay open (and unused for anything else) while iterating.
+    """
+    result = await session.stream_scalars(
+        _broadcast_audience_stmt(target).execution_options(yield_per=chunk_size)
     )
-    result = await session.execute(stmt)
-    return result.scalars().all()
+    async for partition in result.partitions(chunk_size):
+        yield list(partition)
 
 
 async def delete_user_and_relations(session: AsyncSession, user_id: int) -> bool:
@@ -359,4 +561,5 @@ async def delete_user_and_relations(session: AsyncSession, user_id: int) -> bool
 
     await session.delete(user)
     await session.flush()
+    _invalidate_user_attributes_on_commit(session, [user_id])
     return True
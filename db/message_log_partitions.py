@@ -0,0 +1,196 @@
+import logging
+import re
+from datetime import date, datetime, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+# Sync helpers for the monthly range partitions of ``message_logs``. They run
+# on a plain Connection so the migrator can call them directly and the async
+# maintenance task through ``AsyncConnection.run_sync``.
+
+PARENT_TABLE = "message_logs"
+DEFAULT_PARTITION = "message_logs_default"
+LEGACY_PARTITION = "message_logs_legacy"
+MONTH_PARTITION_PREFIX = "message_logs_p"
+
+_PARTITION_NAME_RE = re.compile(r"^message_logs_[a-z0-9_]+$")
+_UPPER_BOUND_RE = re.compile(r"TO \('([^']+)'\)")
+
+
+def _month_start(value: datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _bound(month: date) -> str:
+    return f"'{month.isoformat()} 00:00:00+00'"
+
+
+def _quote_partition(name: str) -> str:
+    if not _PARTITION_NAME_RE.match(name):
+        raise ValueError(f"Unexpected message log partition name: {name!r}")
+    return f'"{name}"'
+
+
+def is_message_logs_partitioned(connection: Connection) -> bool:
+    return bool(connection.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+        "WHERE partrelid = to_regclass(:parent))"
+    ), {"parent": PARENT_TABLE}).scalar())
+
+
+def list_message_log_partitions(connection: Connection) -> List[Tuple[str, Optional[datetime]]]:
+    """Return ``(name, upper bound)`` for each partition; the default partition has no bound."""
+    rows = connection.execute(text(
+        """
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:parent)
+        ORDER BY c.relname
+        """
+    ), {"parent": PARENT_TABLE}).all()
+    partitions: List[Tuple[str, Optional[datetime]]] = []
+    for name, bound_expr in rows:
+        match = _UPPER_BOUND_RE.search(bound_expr or "")
+        upper = datetime.fromisoformat(match.group(1)) if match else None
+        partitions.append((name, upper))
+    return partitions
+
+
+def ensure_message_log_partitions(connection: Connection, months_ahead: int = 3,
+                                  now: Optional[datetime] = None) -> List[str]:
+    """
+    Create the default partition and monthly partitions up to ``months_ahead``.
+
+    Months already covered by an existing partition (including the legacy one
+    a converted table keeps its old rows in) are skipped. Rows that landed in
+    the default partition for a month being created are moved into it.
+    """
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT"
+    ))
+
+    current_month = _month_start(now or datetime.now(timezone.utc))
+    covered_until = max(
+        (upper for _, upper in list_message_log_partitions(connection) if upper is not None),
+        default=None,
+    )
+    month = current_month
+    if covered_until is not None:
+        month = max(month, _month_start(covered_until.astimezone(timezone.utc)))
+
+    created: List[str] = []
+    last_month = _add_months(current_month, max(months_ahead, 0))
+    while month <= last_month:
+        next_month = _add_months(month, 1)
+        name = f"{MONTH_PARTITION_PREFIX}{month:%Y%m}"
+        has_stray_rows = connection.execute(text(
+            f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} "
+            f"WHERE timestamp >= {_bound(month)} AND timestamp < {_bound(next_month)})"
+        )).scalar()
+        if has_stray_rows:
+            connection.execute(text(
+                f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+            ))
+            connection.execute(text(
+                f"""
+                WITH moved AS (
+                    DELETE FROM {DEFAULT_PARTITION}
+                    WHERE timestamp >= {_bound(month)} AND timestamp < {_bound(next_month)}
+                    RETURNING *
+                )
+                INSERT INTO {name} SELECT * FROM moved
+                """
+            ))
+            connection.execute(text(
+                f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} "
+                f"FOR VALUES FROM ({_bound(month)}) TO ({_bound(next_month)})"
+            ))
+            logging.warning(f"Message log partition {name} created from rows in the default partition.")
+        else:
+            connection.execute(text(
+                f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} "
+                f"FOR VALUES FROM ({_bound(month)}) TO ({_bound(next_month)})"
+            ))
+        created.append(name)
+        month = next_month
+    return created
+
+
+def drop_message_log_partition(connection: Connection, name: str) -> None:
+    connection.execute(text(f"DROP TABLE IF EXISTS {_quote_partition(name)}"))
+
+
+def purge_default_partition(connection: Connection, cutoff: datetime) -> int:
+    """Delete rows older than ``cutoff`` that ended up in the default partition."""
+    result = connection.execute(
+        text(f"DELETE FROM {DEFAULT_PARTITION} WHERE timestamp < :cutoff"),
+        {"cutoff": cutoff},
+    )
+    return result.rowcount or 0
+
+
+def convert_message_logs_to_partitioned(connection: Connection) -> None:
+    """
+    Turn the plain ``message_logs`` table into the partitioned one.
+
+    The existing table is not copied: it becomes the ``message_logs_legacy``
+    partition covering everything before next month, and is dropped by the
+    retention task once that bound falls out of the retention window.
+    """
+    from .models import MessageLog
+
+    legacy_indexes = connection.execute(text(
+        "SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = :table"
+    ), {"table": PARENT_TABLE}).scalars().all()
+
+    connection.execute(text(f"ALTER TABLE {PARENT_TABLE} RENAME TO {LEGACY_PARTITION}"))
+    for index_name in legacy_indexes:
+        connection.execute(text(f'ALTER INDEX "{index_name}" RENAME TO "{index_name[:55]}_legacy"'))
+    connection.execute(text(
+        f"ALTER SEQUENCE IF EXISTS message_logs_log_id_seq RENAME TO {LEGACY_PARTITION}_log_id_seq"
+    ))
+
+    MessageLog.__table__.create(connection)
+    connection.execute(text(
+        f"""
+        SELECT setval(
+            pg_get_serial_sequence('{PARENT_TABLE}', 'log_id'),
+            GREATEST((SELECT COALESCE(MAX(log_id), 0) FROM {LEGACY_PARTITION}), 1)
+        )
+        """
+    ))
+
+    connection.execute(text(
+        f"UPDATE {LEGACY_PARTITION} SET timestamp = NOW() WHERE timestamp IS NULL"
+    ))
+    connection.execute(text(f"ALTER TABLE {LEGACY_PARTITION} ALTER COLUMN timestamp SET NOT NULL"))
+    # A partition must carry the parent's (log_id, timestamp) key; ATTACH will
+    # not replace the old single-column one.
+    legacy_pkey = connection.execute(text(
+        "SELECT conname FROM pg_constraint "
+        "WHERE conrelid = to_regclass(:table) AND contype = 'p'"
+    ), {"table": LEGACY_PARTITION}).scalar()
+    if legacy_pkey:
+        connection.execute(text(f'ALTER TABLE {LEGACY_PARTITION} DROP CONSTRAINT "{legacy_pkey}"'))
+    connection.execute(text(
+        f"ALTER TABLE {LEGACY_PARTITION} ADD PRIMARY KEY (log_id, timestamp)"
+    ))
+    connection.execute(text(f"ALTER TABLE {LEGACY_PARTITION} ALTER COLUMN log_id DROP DEFAULT"))
+    connection.execute(text(f"DROP SEQUENCE IF EXISTS {LEGACY_PARTITION}_log_id_seq"))
+
+    latest = connection.execute(text(f"SELECT MAX(timestamp) FROM {LEGACY_PARTITION}")).scalar()
+    upper_month = _add_months(_month_start(datetime.now(timezone.utc)), 1)
+    if latest is not None:
+        upper_month = max(upper_month, _add_months(_month_start(latest.astimezone(timezone.utc)), 1))
+    connection.execute(text(
+        f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {LEGACY_PARTITION} "
+        f"FOR VALUES FROM (MINVALUE) TO ({_bound(upper_month)})"
+    ))
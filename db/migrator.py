@@ -5,6 +5,12 @@ from typing import Callable, List, Set
 from sqlalchemy import inspect, text
 from sqlalchemy.engine import Connection
 
+from .message_log_partitions import (
+    convert_message_logs_to_partitioned,
+    ensure_message_log_partitions,
+    is_message_logs_partitioned,
+)
+
 
 @dataclass(frozen=True)
 class Migration:
@@ -112,6 +118,167 @@ def _migration_0003_normalize_referral_codes(connection: Connection) -> None:
         )
     )
 
+
+def _migration_0004_add_panel_full_sync_time(connection: Connection) -> None:
+    inspector = inspect(connection)
+    columns: Set[str] = {
+        col["name"] for col in inspector.get_columns("panel_sync_status")
+    }
+    if "last_full_sync_time" not in columns:
+        connection.execute(
+            text(
+                "ALTER TABLE panel_sync_status ADD COLUMN last_full_sync_time TIMESTAMPTZ"
+            )
+        )
+
+
+def _migration_0005_add_user_bot_blocked_at(connection: Connection) -> None:
+    inspector = inspect(connection)
+    columns: Set[str] = {col["name"] for col in inspector.get_columns("users")}
+    if "bot_blocked_at" not in columns:
+        connection.execute(
+            text("ALTER TABLE users ADD COLUMN bot_blocked_at TIMESTAMPTZ")
+        )
+
+
+def _migration_0006_add_outbound_broadcast_id(connection: Connection) -> None:
+    inspector = inspect(connection)
+    if not inspector.has_table("outbound_messages"):
+        return
+    columns: Set[str] = {
+        col["name"] for col in inspector.get_columns("outbound_messages")
+    }
+    if "broadcast_id" not in columns:
+        connection.execute(
+            text("ALTER TABLE outbound_messages ADD COLUMN broadcast_id INTEGER")
+        )
+
+
+def _migration_0007_add_payment_daily_rollup(connection: Connection) -> None:
+    inspector = inspect(connection)
+    if not inspector.has_table("payment_daily_rollup"):
+        connection.execute(
+            text(
+                """
+                CREATE TABLE payment_daily_rollup (
+                    day DATE NOT NULL,
+                    provider VARCHAR NOT NULL,
+                    currency VARCHAR NOT NULL,
+                    payments_count INTEGER NOT NULL DEFAULT 0,
+                    amount_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+                    PRIMARY KEY (day, provider, currency)
+                )
+                """
+            )
+        )
+
+    connection.execute(text("DELETE FROM payment_daily_rollup"))
+    connection.execute(
+        text(
+            """
+            INSERT INTO payment_daily_rollup (day, provider, currency, payments_count, amount_sum)
+            SELECT (created_at AT TIME ZONE 'UTC')::date, provider, currency, COUNT(*), SUM(amount)
+            FROM payments
+            WHERE status = 'succeeded'
+            GROUP BY 1, 2, 3
+            """
+        )
+    )
+
+    # Applies the old row's contribution in reverse and the new row's forward,
+    # so any change of status, amount, provider, currency or date is handled.
+    connection.execute(
+        text(
+            """
+            CREATE OR REPLACE FUNCTION payment_daily_rollup_apply() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'UPDATE'
+                   AND OLD.status IS NOT DISTINCT FROM NEW.status
+                   AND OLD.amount IS NOT DISTINCT FROM NEW.amount
+                   AND OLD.provider IS NOT DISTINCT FROM NEW.provider
+                   AND OLD.currency IS NOT DISTINCT FROM NEW.currency
+                   AND OLD.created_at IS NOT DISTINCT FROM NEW.created_at THEN
+                    RETURN NULL;
+                END IF;
+                IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'succeeded' THEN
+                    UPDATE payment_daily_rollup
+                    SET payments_count = payments_count - 1,
+                        amount_sum = amount_sum - OLD.amount
+                    WHERE day = (COALESCE(OLD.created_at, NOW()) AT TIME ZONE 'UTC')::date
+                      AND provider = OLD.provider
+                      AND currency = OLD.currency;
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'succeeded' THEN
+                    INSERT INTO payment_daily_rollup (day, provider, currency, payments_count, amount_sum)
+                    VALUES ((COALESCE(NEW.created_at, NOW()) AT TIME ZONE 'UTC')::date,
+                            NEW.provider, NEW.currency, 1, NEW.amount)
+                    ON CONFLICT (day, provider, currency) DO UPDATE
+                    SET payments_count = payment_daily_rollup.payments_count + 1,
+                        amount_sum = payment_daily_rollup.amount_sum + EXCLUDED.amount_sum;
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+            """
+        )
+    )
+    connection.execute(text("DROP TRIGGER IF EXISTS payments_daily_rollup ON payments"))
+    # Deferred to commit time: payment transactions include panel API calls, and
+    # an immediate trigger would hold the shared rollup row lock for their whole
+    # duration, serializing payments per provider and day.
+    connection.execute(
+        text(
+            """
+            CREATE CONSTRAINT TRIGGER payments_daily_rollup
+            AFTER INSERT OR UPDATE OR DELETE ON payments
+            DEFERRABLE INITIALLY DEFERRED
+            FOR EACH ROW EXECUTE FUNCTION payment_daily_rollup_apply()
+            """
+        )
+    )
+
+
+def _migration_0008_add_hot_query_indexes(connection: Connection) -> None:
+    # Fresh databases get these from create_all; IF NOT EXISTS keeps the
+    # migration a no-op there.
+    statements = (
+        "CREATE INDEX IF NOT EXISTS ix_users_username_lower ON users (lower(username))",
+        "CREATE INDEX IF NOT EXISTS ix_users_referred_by_id ON users (referred_by_id) "
+        "WHERE referred_by_id IS NOT NULL",
+        "CREATE INDEX IF NOT EXISTS ix_subscriptions_user_active_end_date "
+        "ON subscriptions (user_id, end_date) WHERE is_active = true",
+        "CREATE INDEX IF NOT EXISTS ix_message_logs_user_id_timestamp "
+        "ON message_logs (user_id, timestamp)",
+        "CREATE INDEX IF NOT EXISTS ix_message_logs_target_user_id_timestamp "
+        "ON message_logs (target_user_id, timestamp)",
+    )
+    for statement in statements:
+        connection.execute(text(statement))
+    for table in ("users", "subscriptions", "message_logs"):
+        connection.execute(text(f"ANALYZE {table}"))
+
+
+def _migration_0009_add_keyset_pagination_indexes(connection: Connection) -> None:
+    statements = (
+        "CREATE INDEX IF NOT EXISTS ix_payments_succeeded_created_at "
+        "ON payments (created_at, payment_id) WHERE status = 'succeeded'",
+        "CREATE INDEX IF NOT EXISTS ix_users_registration_date_user_id "
+        "ON users (registration_date, user_id)",
+        "CREATE INDEX IF NOT EXISTS ix_promo_code_activations_code_activated_at "
+        "ON promo_code_activations (promo_code_id, activated_at, activation_id)",
+    )
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def _migration_0010_partition_message_logs(connection: Connection) -> None:
+    # Fresh databases already get the partitioned parent from create_all and
+    # only need their partitions.
+    if not is_message_logs_partitioned(connection):
+        convert_message_logs_to_partitioned(connection)
+    ensure_message_log_partitions(connection)
+
+
 MIGRATIONS: List[Migration] = [
     Migration(
         id="0001_add_channel_subscription_fields",
@@ -128,6 +295,41 @@ MIGRATIONS: List[Migration] = [
         description="Normalize referral codes to uppercase for consistent lookups",
         upgrade=_migration_0003_normalize_referral_codes,
     ),
+    Migration(
+        id="0004_add_panel_full_sync_time",
+        description="Remember when the last full panel reconcile finished",
+        upgrade=_migration_0004_add_panel_full_sync_time,
+    ),
+    Migration(
+        id="0005_add_user_bot_blocked_at",
+        description="Remember users who blocked the bot so broadcasts can skip them",
+        upgrade=_migration_0005_add_user_bot_blocked_at,
+    ),
+    Migration(
+        id="0006_add_outbound_broadcast_id",
+        description="Link persisted outbound messages to their broadcast",
+        upgrade=_migration_0006_add_outbound_broadcast_id,
+    ),
+    Migration(
+        id="0007_add_payment_daily_rollup",
+        description="Maintain daily revenue per provider and currency for admin statistics",
+        upgrade=_migration_0007_add_payment_daily_rollup,
+    ),
+    Migration(
+        id="0008_add_hot_query_indexes",
+        description="Index case-insensitive username lookups, referrals, active subscriptions and per-user logs",
+        upgrade=_migration_0008_add_hot_query_indexes,
+    ),
+    Migration(
+        id="0009_add_keyset_pagination_indexes",
+        description="Index the sort keys of the admin payment, user and promo activation listings",
+        upgrade=_migration_0009_add_keyset_pagination_indexes,
+    ),
+    Migration(
+        id="0010_partition_message_logs",
+        description="Range-partition message_logs by month, keeping existing rows as a legacy partition",
+        upgrade=_migration_0010_partition_message_logs,
+    ),
 ]
 
 
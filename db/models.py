@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, Float, ForeignKey, UniqueConstraint, Text, BigInteger
+from sqlalchemy import create_engine, Column, Integer, String, Boolean, Date, DateTime, Float, ForeignKey, UniqueConstraint, Text, BigInteger, Index
 from sqlalchemy.orm import relationship, DeclarativeBase
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.sql import func
@@ -29,6 +29,7 @@ class User(Base):
     channel_subscription_checked_at = Column(DateTime(timezone=True),
                                              nullable=True)
     channel_subscription_verified_for = Column(BigInteger, nullable=True)
+    bot_blocked_at = Column(DateTime(timezone=True), nullable=True)
 
     referrer = relationship("User", remote_side=[user_id], backref="referrals")
     subscriptions = relationship("Subscription",
@@ -50,6 +51,13 @@ class User(Base):
         back_populates="target_user",
         cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_users_username_lower", func.lower(username)),
+        Index("ix_users_registration_date_user_id", "registration_date", "user_id"),
+        Index("ix_users_referred_by_id", "referred_by_id",
+              postgresql_where=referred_by_id.isnot(None)),
+    )
+
     def __repr__(self):
         return f"<User(user_id={self.user_id}, username='{self.username}')>"
 
@@ -81,6 +89,11 @@ class Subscription(Base):
 
     user = relationship("User", back_populates="subscriptions")
 
+    __table_args__ = (
+        Index("ix_subscriptions_user_active_end_date", "user_id", "end_date",
+              postgresql_where=is_active == True),
+    )
+
     def __repr__(self):
         return f"<Subscription(id={self.subscription_id}, user_id={self.user_id}, panel_uuid='{self.panel_user_uuid}', ends='{self.end_date}')>"
 
@@ -117,6 +130,26 @@ class Payment(Base):
     promo_code_used = relationship("PromoCode",
                                    back_populates="payments_where_used")
 
+    __table_args__ = (
+        Index("ix_payments_succeeded_created_at", "created_at", "payment_id",
+              postgresql_where=status == "succeeded"),
+    )
+
+
+class PaymentDailyRollup(Base):
+    """Succeeded payments per UTC day, provider and currency.
+
+    Maintained by the ``payments_daily_rollup`` trigger (migration 0007), so every
+    status change is reflected without application code having to remember it.
+    """
+    __tablename__ = "payment_daily_rollup"
+
+    day = Column(Date, primary_key=True)
+    provider = Column(String, primary_key=True)
+    currency = Column(String, primary_key=True)
+    payments_count = Column(Integer, nullable=False, default=0)
+    amount_sum = Column(Float, nullable=False, default=0.0)
+
 
 class UserBilling(Base):
     __tablename__ = "user_billing"
@@ -186,12 +219,20 @@ class PromoCodeActivation(Base):
     user = relationship("User", back_populates="promo_code_activations")
     payment = relationship("Payment")
 
-    __table_args__ = (UniqueConstraint('promo_code_id',
-                                       'user_id',
-                                       name='uq_promo_user_activation'), )
+    __table_args__ = (
+        UniqueConstraint('promo_code_id', 'user_id', name='uq_promo_user_activation'),
+        Index("ix_promo_code_activations_code_activated_at", "promo_code_id",
+              "activated_at", "activation_id"),
+    )
 
 
 class MessageLog(Base):
+    """One row per logged update or admin action.
+
+    The table is range-partitioned by month on ``timestamp`` (see
+    ``db/message_log_partitions.py``), so the partition key is part of the
+    primary key.
+    """
     __tablename__ = "message_logs"
 
     log_id = Column(Integer, primary_key=True, autoincrement=True)
@@ -206,6 +247,7 @@ class MessageLog(Base):
     raw_update_preview = Column(Text, nullable=True)
     timestamp = Column(DateTime(timezone=True),
                        server_default=func.now(),
+                       primary_key=True,
                        index=True)
     is_admin_event = Column(Boolean, default=False)
     target_user_id = Column(BigInteger,
@@ -220,6 +262,12 @@ class MessageLog(Base):
                                foreign_keys=[target_user_id],
                                back_populates="message_logs_targeted")
 
+    __table_args__ = (
+        Index("ix_message_logs_user_id_timestamp", "user_id", "timestamp"),
+        Index("ix_message_logs_target_user_id_timestamp", "target_user_id", "timestamp"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
 
 class PanelSyncStatus(Base):
     __tablename__ = "panel_sync_status"
@@ -230,10 +278,21 @@ class PanelSyncStatus(Base):
     details = Column(Text, nullable=True)
     users_processed_from_panel = Column(Integer, default=0)
     subscriptions_synced = Column(Integer, default=0)
+    last_full_sync_time = Column(DateTime(timezone=True), nullable=True)
 
     __table_args__ = (UniqueConstraint('id'), )
 
 
+class PanelUserSyncState(Base):
+    __tablename__ = "panel_user_sync_state"
+
+    panel_user_uuid = Column(String, primary_key=True)
+    content_hash = Column(String(32), nullable=False)
+    synced_at = Column(DateTime(timezone=True),
+                       server_default=func.now(),
+                       nullable=False)
+
+
 class AdCampaign(Base):
     __tablename__ = "ad_campaigns"
 
@@ -264,3 +323,62 @@ class AdAttribution(Base):
 
     user = relationship("User")
     campaign = relationship("AdCampaign", back_populates="attributions")
+
+
+class OutboundMessage(Base):
+    __tablename__ = "outbound_messages"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    chat_id = Column(BigInteger, nullable=False)
+    method_name = Column(String, nullable=False)
+    payload = Column(Text, nullable=False)
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    broadcast_id = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("ix_outbound_messages_status_id", "status", "id"),
+    )
+
+
+class Broadcast(Base):
+    __tablename__ = "broadcasts"
+
+    broadcast_id = Column(Integer, primary_key=True, autoincrement=True)
+    admin_id = Column(BigInteger, nullable=True)
+    target = Column(String, nullable=False, default="all")
+    content_type = Column(String, nullable=False, default="text")
+    content_preview = Column(Text, nullable=True)
+    status = Column(String, nullable=False, default="queuing")
+    total_recipients = Column(Integer, nullable=False, default=0)
+    queued_count = Column(Integer, nullable=False, default=0)
+    sent_count = Column(Integer, nullable=False, default=0)
+    failed_count = Column(Integer, nullable=False, default=0)
+    blocked_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class PaymentWebhookEvent(Base):
+    __tablename__ = "payment_webhook_inbox"
+
+    event_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    provider = Column(String, nullable=False)
+    event_key = Column(String, nullable=False)
+    payload = Column(Text, nullable=False)
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    received_at = Column(DateTime(timezone=True), server_default=func.now())
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("provider", "event_key", name="uq_payment_webhook_inbox_provider_key"),
+        Index("ix_payment_webhook_inbox_status_next_attempt", "status", "next_attempt_at"),
+    )
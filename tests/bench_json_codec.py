@@ -0,0 +1,110 @@
+"""
+Micro-benchmark for bot/utils/json_codec.py on a panel ``/users`` page.
+
+Builds a response shaped like the one ``PanelApiService`` pages through during
+sync (``{"response": {"users": [...], "total": N}}``) and times decoding the raw
+bytes and encoding the object with every installed backend, next to the
+``json_codec`` functions the bot actually uses. Not collected by pytest; run:
+
+    python tests/bench_json_codec.py [--users 500] [--rounds 200]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot.utils import json_codec  # noqa: E402
+
+
+def build_users_page(users: int) -> Dict[str, Any]:
+    now = datetime(2026, 10, 1, tzinfo=timezone.utc)
+    squad = {"uuid": str(uuid.UUID(int=1)), "name": "Default-Squad"}
+    page = []
+    for index in range(users):
+        user_uuid = str(uuid.UUID(int=index + 1000))
+        created_at = now - timedelta(days=index % 400, minutes=index)
+        page.append({
+            "uuid": user_uuid,
+            "shortUuid": f"{index:08x}Ab3dE",
+            "username": f"tg_{100000000 + index}",
+            "status": ("ACTIVE", "EXPIRED", "DISABLED", "LIMITED")[index % 4],
+            "usedTrafficBytes": index * 7340032,
+            "lifetimeUsedTrafficBytes": index * 93323264,
+            "trafficLimitBytes": 0 if index % 3 else 107374182400,
+            "trafficLimitStrategy": "NO_RESET" if index % 2 else "MONTH",
+            "subLastUserAgent": "Happ/3.4.1/ios" if index % 5 else None,
+            "subLastOpenedAt": (created_at + timedelta(hours=5)).isoformat(),
+            "expireAt": (created_at + timedelta(days=30)).isoformat(),
+            "onlineAt": (now - timedelta(minutes=index % 90)).isoformat() if index % 7 else None,
+            "subRevokedAt": None,
+            "lastTrafficResetAt": None,
+            "trojanPassword": f"{index:032x}",
+            "vlessUuid": str(uuid.UUID(int=index + 50000)),
+            "ssPassword": f"{index * 31:032x}",
+            "description": f"Пользователь @user_{index} (Имя Фамилия)",
+            "tag": None,
+            "telegramId": 100000000 + index,
+            "email": None,
+            "hwidDeviceLimit": 3,
+            "createdAt": created_at.isoformat(),
+            "updatedAt": (created_at + timedelta(days=1)).isoformat(),
+            "activeInternalSquads": [squad],
+            "subscriptionUrl": f"https://sub.example.com/{index:08x}Ab3dE",
+            "happ": {"cryptoLink": f"happ://crypt4/{'A' * 120}{index}"},
+        })
+    return {"response": {"users": page, "total": users * 20}}
+
+
+def _backends() -> List[Tuple[str, Callable[[bytes], Any], Callable[[Any], Any]]]:
+    backends = [(
+        "stdlib json",
+        json.loads,
+        lambda obj: json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode(),
+    )]
+    try:
+        import orjson
+        backends.append(("orjson", orjson.loads, orjson.dumps))
+    except ImportError:
+        pass
+    try:
+        import msgspec
+        backends.append(("msgspec", msgspec.json.Decoder().decode, msgspec.json.Encoder().encode))
+    except ImportError:
+        pass
+    backends.append((
+        f"json_codec ({json_codec.JSON_BACKEND})", json_codec.loads, json_codec.dumps_bytes))
+    return backends
+
+
+def _best_ms(func: Callable[[], Any], rounds: int) -> float:
+    return min(timeit.repeat(func, number=1, repeat=rounds)) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=500, help="users per page")
+    parser.add_argument("--rounds", type=int, default=200, help="timed runs (best is reported)")
+    args = parser.parse_args()
+
+    page = build_users_page(args.users)
+    body = json.dumps(page, ensure_ascii=False).encode()
+    print(f"/users page: {args.users} users, {len(body) / 1024:.0f} KiB, best of {args.rounds} runs")
+    print(f"{'backend':<22}{'decode ms':>11}{'encode ms':>11}{'decode x':>10}")
+
+    baseline = None
+    for name, loads, dumps in _backends():
+        assert loads(body) == page, f"{name} decoded the page differently"
+        decode_ms = _best_ms(lambda: loads(body), args.rounds)
+        encode_ms = _best_ms(lambda: dumps(page), args.rounds)
+        baseline = baseline or decode_ms
+        print(f"{name:<22}{decode_ms:>11.2f}{encode_ms:>11.2f}{baseline / decode_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
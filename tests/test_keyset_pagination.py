@@ -0,0 +1,152 @@
+"""
+Keyset pagination used by the admin user list and message logs.
+
+The cursor tokens travel in Telegram callback data, so they must round-trip
+and old page-number tokens must still open a page. Walking pages over rows
+that share a sort value needs PostgreSQL (``TEST_DATABASE_URL``, see
+tests/test_hot_query_plans.py); those tests are skipped without it.
+"""
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, List
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from db.dal import message_log_dal, user_dal
+from db.dal.pagination import KeysetCursor, KeysetPage
+from db.migrator import run_database_migrations
+from db.models import Base
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+requires_database = pytest.mark.skipif(
+    not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+PAGE_SIZE = 7
+SEED_ROWS = 60
+
+
+@pytest.mark.parametrize("cursor", [
+    KeysetCursor(),
+    KeysetCursor(page=4),
+    KeysetCursor(page=1, anchor_id=1234),
+    KeysetCursor(page=3, anchor_id=987654321012, backwards=True),
+])
+def test_cursor_token_round_trip(cursor):
+    token = cursor.to_token()
+    assert ":" not in token
+    assert len(f"admin_action:users_list:{token}".encode()) <= 64
+    assert KeysetCursor.from_token(token) == (
+        cursor if cursor.anchor_id is not None else KeysetCursor())
+
+
+@pytest.mark.parametrize("token", [None, "", "0", "5", "17", "abc", "2.", "2.x", "2.n", "x.n5"])
+def test_legacy_and_malformed_tokens_open_first_page(token):
+    assert KeysetCursor.from_token(token) == KeysetCursor()
+
+
+def test_negative_page_number_is_clamped():
+    assert KeysetCursor.from_token("-3.n5") == KeysetCursor(page=0, anchor_id=5)
+
+
+def test_page_cursors():
+    first = KeysetPage(items=[1, 2], cursor=KeysetCursor(), has_prev=False,
+                       has_next=True, first_id=20, last_id=19)
+    assert first.next_cursor() == KeysetCursor(page=1, anchor_id=19)
+    assert first.prev_cursor() == KeysetCursor()
+
+    third = KeysetPage(items=[1, 2], cursor=KeysetCursor(page=2, anchor_id=19),
+                       has_prev=True, has_next=True, first_id=18, last_id=17)
+    assert third.prev_cursor() == KeysetCursor(page=1, anchor_id=18, backwards=True)
+
+
+SEED_STATEMENTS = (
+    # Groups of five users registered in the same instant.
+    f"""
+    INSERT INTO users (user_id, first_name, language_code, registration_date)
+    SELECT g, 'User ' || g, 'ru',
+           TIMESTAMPTZ '2026-10-01 12:00:00+00' - ((g / 5) || ' minutes')::interval
+    FROM generate_series(1, {SEED_ROWS}) AS g
+    """,
+    # Log ids that do not follow time, with runs of equal timestamps.
+    f"""
+    INSERT INTO message_logs (log_id, user_id, event_type, content, timestamp)
+    SELECT 1000 + (g * 37) % 101, g, 'message', 'seed',
+           NOW() - ((g % 6) || ' seconds')::interval
+    FROM generate_series(1, {SEED_ROWS}) AS g
+    """,
+)
+
+PAGED_QUERIES: List[tuple] = [
+    ("users", user_dal.get_users_page, "user_id",
+     "SELECT user_id FROM users ORDER BY registration_date DESC, user_id DESC"),
+    ("message_logs", message_log_dal.get_message_logs_page, "log_id",
+     "SELECT log_id FROM message_logs ORDER BY timestamp DESC, log_id DESC"),
+]
+
+
+async def _walk(session: AsyncSession,
+                get_page: Callable[[AsyncSession, KeysetCursor, int], Awaitable[KeysetPage]],
+                id_key: str) -> tuple:
+    """Page to the end and back, passing cursors through their callback tokens."""
+    forward: List[List[Any]] = []
+    page = await get_page(session, KeysetCursor(), PAGE_SIZE)
+    forward.append([getattr(row, id_key) for row in page.items])
+    while page.has_next:
+        assert len(forward) <= SEED_ROWS, "paging forwards did not terminate"
+        cursor = KeysetCursor.from_token(page.next_cursor().to_token())
+        page = await get_page(session, cursor, PAGE_SIZE)
+        forward.append([getattr(row, id_key) for row in page.items])
+
+    backward: List[List[Any]] = [forward[-1]]
+    while page.has_prev:
+        assert len(backward) <= SEED_ROWS, "paging backwards did not terminate"
+        cursor = KeysetCursor.from_token(page.prev_cursor().to_token())
+        page = await get_page(session, cursor, PAGE_SIZE)
+        backward.append([getattr(row, id_key) for row in page.items])
+    backward.reverse()
+    return forward, backward, page.cursor
+
+
+async def _walk_all() -> dict:
+    engine = create_async_engine(TEST_DATABASE_URL)
+    walks = {}
+    try:
+        async with engine.connect() as connection:
+            transaction = await connection.begin()
+            try:
+                await connection.run_sync(Base.metadata.create_all)
+                await connection.run_sync(run_database_migrations)
+                for statement in SEED_STATEMENTS:
+                    await connection.execute(text(statement))
+                session = AsyncSession(bind=connection)
+                for name, get_page, id_key, ordered_sql in PAGED_QUERIES:
+                    expected = list((await connection.execute(text(ordered_sql))).scalars())
+                    walks[name] = (expected, *await _walk(session, get_page, id_key))
+                await session.close()
+            finally:
+                await transaction.rollback()
+    finally:
+        await engine.dispose()
+    return walks
+
+
+@pytest.fixture(scope="module")
+def keyset_walks() -> dict:
+    return asyncio.run(_walk_all())
+
+
+@requires_database
+@pytest.mark.parametrize("name", [name for name, *_ in PAGED_QUERIES])
+def test_paging_over_equal_sort_values_has_no_gaps_or_duplicates(keyset_walks, name):
+    expected, forward, backward, last_cursor = keyset_walks[name]
+    assert len(expected) == SEED_ROWS
+
+    seen = [row_id for page in forward for row_id in page]
+    assert seen == expected
+    assert all(len(page) == PAGE_SIZE for page in forward[:-1])
+
+    assert backward == forward
+    assert last_cursor == KeysetCursor()
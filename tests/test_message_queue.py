@@ -0,0 +1,85 @@
+"""
+Scheduling guarantees of the rate-limited MessageQueue: per-chat order, no
+overlapping sends to one chat and the per-chat interval measured from the
+actual hand-off, also across flood-wait retries.
+"""
+import asyncio
+import random
+import time
+from typing import Dict, List, Tuple
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from bot.utils.message_queue import MessageQueue, QueuedMessage
+
+
+class _RecordingQueue(MessageQueue):
+
+    def __init__(self, *args, send_delay=(0.0, 0.0), flood_once=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.send_delay = send_delay
+        self.flood_once = set(flood_once)
+        # chat_id -> [(seq, started_at, finished_at)]
+        self.sends: Dict[int, List[Tuple[int, float, float]]] = {}
+
+    async def _send_message(self, message: QueuedMessage):
+        started_at = time.monotonic()
+        seq = message.kwargs["seq"]
+        await asyncio.sleep(random.uniform(*self.send_delay))
+        if seq in self.flood_once:
+            self.flood_once.discard(seq)
+            raise TelegramRetryAfter(
+                method=SendMessage(chat_id=message.chat_id, text="x"),
+                message="Flood control exceeded",
+                retry_after=0.2,
+            )
+        self.sends.setdefault(message.chat_id, []).append(
+            (seq, started_at, time.monotonic()))
+
+
+async def _drain(queue: MessageQueue, messages: List[QueuedMessage]) -> None:
+    for message in messages:
+        await queue.add_message(message)
+    await queue.close(timeout=30)
+
+
+def _assert_chat_guarantees(queue: _RecordingQueue, expected: Dict[int, List[int]],
+                            interval: float) -> None:
+    assert {chat: [seq for seq, _, _ in sends] for chat, sends in queue.sends.items()} == expected
+    for sends in queue.sends.values():
+        for (_, prev_start, prev_end), (_, start, _) in zip(sends, sends[1:]):
+            assert start >= prev_end, "two sends to one chat overlapped"
+            assert start - prev_start >= interval - 0.01, "per-chat interval not respected"
+
+
+def test_per_chat_order_and_interval_with_busy_workers():
+    random.seed(7)
+    queue = _RecordingQueue(
+        messages_per_second=200, burst_size=20, workers=8,
+        per_chat_interval=0.05, send_delay=(0.0, 0.08))
+    messages = [
+        QueuedMessage(chat_id=chat_id, method_name="send_message", kwargs={"seq": seq})
+        for seq in range(10)
+        for chat_id in range(1, 13)
+    ]
+    asyncio.run(_drain(queue, messages))
+
+    _assert_chat_guarantees(
+        queue, {chat_id: list(range(10)) for chat_id in range(1, 13)}, 0.05)
+
+
+def test_flood_wait_retry_keeps_chat_order():
+    queue = _RecordingQueue(
+        messages_per_second=200, burst_size=20, workers=4,
+        per_chat_interval=0.02, flood_once={1})
+    messages = [
+        QueuedMessage(chat_id=chat_id, method_name="send_message", kwargs={"seq": seq})
+        for seq in range(4)
+        for chat_id in (1, 2)
+    ]
+    asyncio.run(_drain(queue, messages))
+
+    _assert_chat_guarantees(queue, {1: [0, 1, 2, 3], 2: [0, 1, 2, 3]}, 0.02)
+    assert queue.total_flood_waits == 1
+    assert len(queue) == 0
@@ -0,0 +1,92 @@
+"""
+Panel API request logging must stay lazy at the bot's default INFO level:
+successful calls neither serialize the payload nor encode the query string,
+and a full-body log that is not sampled costs nothing either.
+"""
+import asyncio
+import logging
+from unittest import mock
+
+import pytest
+
+from bot.services import panel_api_service
+from bot.services.panel_api_service import PanelApiService
+from config.settings import Settings
+
+RESPONSE_BODY = b'{"response": {"uuid": "u-1", "username": "user_1"}}'
+
+
+class _StubResponse:
+    status = 200
+    headers = {"Content-Type": "application/json; charset=utf-8"}
+
+    async def read(self) -> bytes:
+        return RESPONSE_BODY
+
+    def get_encoding(self) -> str:
+        return "utf-8"
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+class _StubSession:
+
+    def request(self, method, url, **kwargs):
+        return _StubResponse()
+
+
+@pytest.fixture
+def panel_api():
+    settings = Settings(
+        _env_file=None,
+        BOT_TOKEN="123:stub",
+        PANEL_API_URL="http://panel.invalid/api",
+        PANEL_API_LOG_FULL_RESPONSE_SAMPLE_RATE=0.1,
+    )
+    service = PanelApiService(settings)
+    with mock.patch.object(service, "_get_session", mock.AsyncMock(return_value=_StubSession())):
+        yield service
+
+
+@pytest.fixture
+def info_logging():
+    root = logging.getLogger()
+    previous_level = root.level
+    root.setLevel(logging.INFO)
+    yield
+    root.setLevel(previous_level)
+
+
+def _send(service: PanelApiService, log_full_response: bool):
+    return asyncio.run(service._send_request(
+        "PATCH",
+        "/users",
+        log_full_response=log_full_response,
+        params={"size": 500, "start": 0},
+        json={"uuid": "u-1", "description": "user_1"},
+    ))
+
+
+@pytest.mark.parametrize("log_full_response", [False, True])
+def test_no_serialization_at_info_level(panel_api, info_logging, log_full_response):
+    with mock.patch.object(panel_api_service.json_codec, "dumps") as dumps, \
+            mock.patch.object(panel_api_service, "urlencode") as urlencode, \
+            mock.patch.object(panel_api_service.random, "random", return_value=0.5):
+        result = _send(panel_api, log_full_response)
+
+    assert result == {"response": {"uuid": "u-1", "username": "user_1"}}
+    dumps.assert_not_called()
+    urlencode.assert_not_called()
+
+
+def test_sampled_full_response_is_logged(panel_api, info_logging, caplog):
+    with mock.patch.object(panel_api_service.random, "random", return_value=0.05), \
+            caplog.at_level(logging.INFO):
+        _send(panel_api, log_full_response=True)
+
+    assert "Full Response Body" in caplog.text
+    assert "size=500&start=0" in caplog.text